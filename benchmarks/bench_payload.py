@@ -0,0 +1,46 @@
+"""Benchmark serializing wagers with ebet_payload vs. EbetPayloadBuilder
+
+    python benchmarks/bench_payload.py
+"""
+import json
+import timeit
+from functools import partial
+
+from veikkaaja.payload import EbetPayloadBuilder
+from veikkaaja.veikkaus_client import BetDecision, BetTarget, VeikkausClient
+
+
+class _Game:  # pylint: disable=too-few-public-methods
+    """The payload only needs the list index of a game"""
+
+    def __init__(self, list_index: str):
+        self.list_index = list_index
+
+
+def _serialize_dict(games, bets) -> bytes:
+    """What place_bet used to send: the dict payload serialized by requests"""
+    return json.dumps(VeikkausClient.ebet_payload(games, bets)).encode()
+
+
+def main():
+    """Time both ways of serializing for a few wager sizes"""
+    builder = EbetPayloadBuilder()
+    targets = list(BetTarget)
+
+    print(f"{'selections':>10} {'ebet_payload':>14} {'builder':>14} {'speedup':>8}")
+    for size in (1, 100, 1000):
+        games = [_Game(str(1000 + index)) for index in range(size)]
+        bets = [BetDecision(targets[index % 3], 100 + index) for index in range(size)]
+
+        number = max(1, 10000 // size)
+        dict_time = timeit.timeit(
+            partial(_serialize_dict, games, bets), number=number) / number
+        builder_time = timeit.timeit(
+            partial(builder.build_bets, games, bets), number=number) / number
+
+        print(f"{size:>10} {dict_time * 1e6:>12.1f}us {builder_time * 1e6:>12.1f}us"
+              f" {dict_time / builder_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,16 @@ setuptools.setup(
         'requests',
     ],
     extras_require= {
+        'zstd': [
+            'zstandard'
+        ],
+        'arrow': [
+            'pyarrow'
+        ],
+        'pandas': [
+            'pyarrow',
+            'pandas'
+        ],
         'dev': [
             'pytest',
             'pylint',
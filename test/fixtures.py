@@ -0,0 +1,18 @@
+"""The saved API responses, loaded once per process"""
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict
+
+API_REQUESTS = Path(__file__).parent / 'api_requests'
+API_RESPONSES = Path(__file__).parent / 'api_responses'
+
+
+@lru_cache(maxsize=None)
+def saved_responses() -> Dict[str, bytes]:
+    """The saved json responses by the endpoint they were saved from,
+    e.g. 'v1/sports/1' -> b'{"id": "1", ...}'
+    """
+    return {
+        response.stem.replace('.', '/'): response.read_bytes()
+        for response in API_RESPONSES.glob('*.json')
+    }
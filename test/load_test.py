@@ -0,0 +1,133 @@
+"""Generate load on the API with concurrent clients and report the latencies
+
+Against the local stand-in server:
+
+    python -m test.load_test --threads 8 --requests 400 --latency 0.02 --jitter 0.01
+
+Each thread uses its own VeikkausClient, and each request fetches and
+parses the upcoming EBET draws.
+"""
+import argparse
+import threading
+import time
+from typing import Callable, List, NamedTuple
+
+from veikkaaja.veikkaus_client import GameTypes, VeikkausClient
+
+from .stand_in_server import StandInServer
+
+
+class LoadReport(NamedTuple):
+    """The results of a load test"""
+    requests: int
+    errors: int
+    # wall clock seconds of the whole test
+    elapsed: float
+    # the latencies of the single requests, seconds
+    p50: float
+    p99: float
+    max: float
+
+    @property
+    def throughput(self) -> float:
+        """Requests per second"""
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def __str__(self):
+        return (f"{self.requests} requests, {self.errors} errors in {self.elapsed:.2f} s: "
+                f"{self.throughput:.1f} req/s, p50 {self.p50 * 1000:.1f} ms, "
+                f"p99 {self.p99 * 1000:.1f} ms, max {self.max * 1000:.1f} ms")
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest rank percentile of the sorted values"""
+    if not values:
+        return 0.0
+    rank = min(len(values) - 1, max(0, int(round(fraction * len(values))) - 1))
+    return values[rank]
+
+
+def run_load(make_client: Callable[[], VeikkausClient],
+             operation: Callable[[VeikkausClient], bool],
+             threads: int = 4,
+             requests: int = 100) -> LoadReport:
+    """Run the operation 'requests' times spread over 'threads' clients
+
+    Arguments:
+        make_client: creates the client for each thread
+        operation: a single request with the client, returns
+                   whether the request succeeded
+        threads: the number of concurrent clients
+        requests: the total number of operations
+    """
+    clients = [make_client() for _ in range(threads)]
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = iter(range(requests))
+
+    def worker(client: VeikkausClient):
+        while True:
+            with lock:
+                if next(remaining, None) is None:
+                    return
+            started = time.perf_counter()
+            try:
+                success = operation(client)
+            except Exception:  # pylint: disable=broad-except
+                success = False
+            latency = time.perf_counter() - started
+            with lock:
+                latencies.append(latency)
+                if not success:
+                    errors[0] += 1
+
+    started = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(client,)) for client in clients]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return LoadReport(requests=len(latencies),
+                      errors=errors[0],
+                      elapsed=elapsed,
+                      p50=percentile(latencies, 0.50),
+                      p99=percentile(latencies, 0.99),
+                      max=latencies[-1] if latencies else 0.0)
+
+
+def fetch_games(client: VeikkausClient) -> bool:
+    """The default load: fetch and parse the EBET draws"""
+    return bool(client.upcoming_events(GameTypes.EBET))
+
+
+def main():
+    """Run a load test against the stand-in server"""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=None)
+    parser.add_argument('--scale', type=int, default=1)
+    args = parser.parse_args()
+
+    with StandInServer(latency=args.latency,
+                       jitter=args.jitter,
+                       error_rate=args.error_rate,
+                       rate_limit=args.rate_limit,
+                       scale=args.scale) as server:
+        with server.api_root():
+            report = run_load(lambda: VeikkausClient("stand-in", "stand-in"),
+                              fetch_games,
+                              threads=args.threads,
+                              requests=args.requests)
+    print(report)
+
+
+if __name__ == "__main__":
+    main()
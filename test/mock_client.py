@@ -4,8 +4,6 @@ This mock client does not actually send any requests
 over the network, but rather uses responses stored from
 previous valid queries to the API
 """
-import json
-from pathlib import Path
 from typing import Any, Dict, Union
 
 import requests
@@ -14,6 +12,8 @@ import responses
 from veikkaaja.endpoints import EndPoint
 from veikkaaja.veikkaus_client import VeikkausClient
 
+from .fixtures import API_REQUESTS, saved_responses
+
 
 class MockClient(VeikkausClient):
     """Do not try to actually login"""
@@ -25,33 +25,20 @@ class MockClient(VeikkausClient):
 
         Do not try to login to the API
 
-        Register all saved api responses as 'responses' as
-        available endpoints.
+        Load all saved api responses, which are registered
+        with 'responses' as available endpoints upon requests.
         """
 
-        saved_responses = (Path(__file__).parent / 'api_responses').glob('*.json')
-
         # For each saved actual json response from the real API
-        # register a callback with responses that would return
-        # the same json content that the real query would have returned.
-        for response in saved_responses:
-            # TODO: We just assume that we do not POST
-            # and GET same endpoints.
-            responses.add(
-                responses.POST,
-                EndPoint.API_ENDPOINT + "/" + response.stem.replace('.', '/'),
-                match_querystring=False,
-                json=json.loads(response.read_text()))
-            responses.add(
-                responses.GET,
-                EndPoint.API_ENDPOINT + "/" + response.stem.replace('.', '/'),
-                match_querystring=False,
-                json=json.loads(response.read_text()))
-
-    @responses.activate
+        # keep the json content that the real query would have returned.
+        self.saved_responses = {
+            EndPoint.API_ENDPOINT + "/" + endpoint: content
+            for endpoint, content in saved_responses().items()
+        }
+
     def _access_endpoint(self,
                          endpoint: EndPoint,
-                         payload: Dict[str, Any] = None,
+                         payload: Union[Dict[str, Any], bytes] = None,
                          method="GET"):
         """
         Override the common entrypoint that sends out requests
@@ -59,21 +46,41 @@ class MockClient(VeikkausClient):
         Check if we have stored a correct response from the API for this
         request and return that instead of trying to actually query
         a response from the API.
+
+        The saved responses are registered for each request separately,
+        'responses' forgets the registered responses after each request.
         """
 
         # check if we have the corresponding request/response files available
-        request_file = Path(__file__).parent / 'api_requests' / endpoint.endpoint.replace(
-            '/', '.')
+        request_file = API_REQUESTS / endpoint.endpoint.replace('/', '.')
         if request_file.exists():
             print("Found target request for {}".format(endpoint.endpoint))
             print(request_file.read_text())
         # TODO: Found a saved request, compare this request to it
 
-        # we have registered the response with 'responses'
-        # Now we just go and get it
+        with responses.RequestsMock(assert_all_requests_are_fired=False) as mock:
+            # register a callback with responses that would return
+            # the same json content that the real query would have returned.
+            for url, content in self.saved_responses.items():
+                # TODO: We just assume that we do not POST
+                # and GET same endpoints.
+                mock.add(responses.POST, url, body=content, content_type="application/json")
+                mock.add(responses.GET, url, body=content, content_type="application/json")
+
+            # we have registered the response with 'responses'
+            # Now we just go and get it
+            return self._send(endpoint, payload, method)
+
+    def _send(self,
+              endpoint: EndPoint,
+              payload: Union[Dict[str, Any], bytes] = None,
+              method="GET"):
+        """Send the request to the registered responses"""
         if method == "GET":
             response = requests.get(
                 endpoint.url, headers=self.API_HEADERS, params=payload)
+        elif method == "POST" and isinstance(payload, bytes):
+            response = requests.post(endpoint.url, headers=self.API_HEADERS, data=payload)
         elif method == "POST":
             response = requests.post(endpoint.url, headers=self.API_HEADERS, json=payload)
         else:
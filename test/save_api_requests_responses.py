@@ -3,7 +3,7 @@ endpoints and save the sent out requests and responses.
 """
 import json
 from pathlib import Path
-from typing import Any, Dict
+from typing import Any, Dict, Union
 
 import requests
 
@@ -18,8 +18,11 @@ class SavingClient(VeikkausClient):
     'api_requests/endpoint' and 'api_responsese/endpoint'
     """
 
-    def save_outgoing_request(self, endpoint: EndPoint, payload: Dict[Any, Any]):
+    def save_outgoing_request(self, endpoint: EndPoint,
+                              payload: Union[Dict[Any, Any], bytes]):
         """For testing, add and interface for saving the outgoing messages."""
+        if isinstance(payload, bytes):
+            payload = json.loads(payload)
         out_folder = Path(__file__).parent / "api_requests" / (
             endpoint.endpoint.replace('/', '.') + '.json')
         with out_folder.open('w') as file_handle:
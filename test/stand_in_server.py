@@ -0,0 +1,208 @@
+"""A local stand-in for the Veikkaus API
+
+Unlike the MockClient, the stand-in server is a real HTTP server, so the
+actual VeikkausClient, its connection pooling, concurrency and retries
+can be exercised over real sockets. The server answers with the saved
+responses under 'api_responses', and can add latency, errors and rate
+limits to the responses.
+
+    with StandInServer(latency=0.02, jitter=0.01, error_rate=0.05) as server:
+        with server.api_root():
+            client = VeikkausClient("account", "password")
+            games = client.upcoming_events(GameTypes.EBET)
+
+The login endpoint accepts any account.
+"""
+import json
+import random
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+from veikkaaja.endpoints import EndPoint
+
+from .fixtures import saved_responses
+
+DRAWS_ENDPOINT = EndPoint.games_info_endpoint().endpoint
+
+
+def scaled_draws(scale: int) -> bytes:
+    """A synthetic feed with 'scale' times the draws of the saved feed
+
+    The copies get new draw ids, list indices and event ids so that
+    they do not collide with the original draws.
+    """
+    draws = json.loads(saved_responses()[DRAWS_ENDPOINT])
+    scaled = []
+    for copy in range(scale):
+        for draw in draws:
+            draw = json.loads(json.dumps(draw))
+            if copy:
+                draw['id'] = draw['id'] + copy * 10000000
+                draw['listIndex'] = str(int(draw['listIndex']) + copy * 100000)
+                for row in draw['rows']:
+                    row['eventId'] = str(int(row['eventId']) + copy * 1000000000)
+            scaled.append(draw)
+    return json.dumps(scaled).encode()
+
+
+class TokenBucket:
+    """Allow 'rate' requests per second with bursts of 'burst' requests"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.burst = rate if burst is None else burst
+        self._tokens = self.burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> bool:
+        """Take a token if one is available"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens < 1:
+                return False
+            self._tokens -= 1
+            return True
+
+
+class StandInServer(ThreadingHTTPServer):
+    """Serve the saved API responses on a local port"""
+
+    # pylint: disable=too-many-instance-attributes
+    daemon_threads = True
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 port: int = 0,
+                 latency: float = 0.0,
+                 jitter: float = 0.0,
+                 error_rate: float = 0.0,
+                 rate_limit: Optional[float] = None,
+                 scale: int = 1,
+                 seed: Optional[int] = None):
+        """
+        Arguments:
+            port: the port to listen on, 0 picks a free port
+            latency: seconds added to each response
+            jitter: the latency varies uniformly by +- jitter seconds
+            error_rate: the fraction of requests answered with 503
+            rate_limit: (optional) requests per second before answering 429
+            scale: serve a feed of draws 'scale' times the saved feed
+            seed: (optional) seed for the latency and errors
+        """
+        super().__init__(('127.0.0.1', port), _StandInHandler)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.limiter = None if rate_limit is None else TokenBucket(rate_limit)
+        self.random = random.Random(seed)
+        self.requests = 0
+        self._lock = threading.Lock()
+
+        self.responses: Dict[str, bytes] = dict(saved_responses())
+        if scale > 1:
+            self.responses[DRAWS_ENDPOINT] = scaled_draws(scale)
+
+        self._thread: Optional[threading.Thread] = None
+
+    def count_request(self):
+        """Keep count of the received requests"""
+        with self._lock:
+            self.requests += 1
+
+    @property
+    def url(self) -> str:
+        """The root of the stand-in API"""
+        return f"http://{self.server_address[0]}:{self.server_address[1]}/api"
+
+    def start(self):
+        """Serve on a background thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop serving and close the socket"""
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    @contextmanager
+    def api_root(self):
+        """Send the EndPoint requests to the stand-in server"""
+        original = EndPoint.API_ENDPOINT
+        EndPoint.API_ENDPOINT = self.url
+        try:
+            yield self
+        finally:
+            EndPoint.API_ENDPOINT = original
+
+
+class _StandInHandler(BaseHTTPRequestHandler):
+    """Answer the requests from the saved responses"""
+
+    server: StandInServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        """Do not write every request to stderr"""
+
+    def _reply(self, status: int, body: bytes = b"{}"):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _answer(self):
+        server = self.server
+        server.count_request()
+
+        # consume the request body to keep the connection usable
+        length = int(self.headers.get('Content-Length', 0))
+        if length:
+            self.rfile.read(length)
+
+        delay = server.latency + server.random.uniform(-server.jitter, server.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+        if server.limiter is not None and not server.limiter.acquire():
+            self._reply(429)
+            return
+        if server.error_rate and server.random.random() < server.error_rate:
+            self._reply(503)
+            return
+
+        endpoint = self.path.split('?', 1)[0]
+        if endpoint.startswith('/api/'):
+            endpoint = endpoint[len('/api/'):]
+
+        if endpoint == EndPoint.login_endpoint().endpoint:
+            self._reply(200, b'{"status": "ACTIVE"}')
+            return
+
+        body = server.responses.get(endpoint)
+        if body is None:
+            self._reply(404)
+            return
+        self._reply(200, body)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """GET requests"""
+        self._answer()
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        """POST requests"""
+        self._answer()
@@ -0,0 +1,85 @@
+"""Test flagging sharp odds movements"""
+import logging
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.anomaly import AlertKind, OddsAnomalyDetector
+from veikkaaja.veikkaus_client import GameTypes
+
+from .mock_client import MockClient
+
+
+def with_odds(games, odds):
+    """Set the odds of the first competitor of the first game"""
+    # pylint: disable=protected-access
+    game = games[0]
+    game._competitors.odds[game._first] = odds
+    return games
+
+
+class TestOddsAnomalyDetector(TestCase):
+    """test the online statistics and the alerts"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.games = MockClient().upcoming_events(GameTypes.EBET)
+        self.odds = self.games[0].odds[0]
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_drop_in_window(self):
+        """a drop within the window is flagged, a slow drift is not"""
+        received = []
+        detector = OddsAnomalyDetector(on_alert=received.append, window=60.0, drop=0.2)
+        self.assertEqual(detector.update(self.games, now=1000.0), [])
+        self.assertEqual(len(detector), sum(len(game.odds) for game in self.games))
+
+        # 10 % drops, a minute apart
+        odds = self.odds
+        for minute in range(1, 3):
+            odds = int(odds * 0.9)
+            self.assertEqual(detector.update(with_odds(self.games, odds), 1000.0 + 61 * minute),
+                             [])
+
+        # two 10 % drops within the window
+        detector.update(with_odds(self.games, int(odds * 0.9)), 1200.0)
+        alerts = detector.update(with_odds(self.games, int(odds * 0.8)), 1210.0)
+        self.assertEqual(len(alerts), 1)
+        self.assertEqual(alerts[0].kind, AlertKind.DROP)
+        self.assertEqual(alerts[0].previous, odds)
+        self.assertEqual(alerts[0].game, self.games[0])
+        self.assertEqual(alerts, received)
+
+    def test_rise(self):
+        """rising odds are flagged"""
+        detector = OddsAnomalyDetector(drop=0.2)
+        detector.update(self.games, now=0.0)
+        alerts = detector.update(with_odds(self.games, int(self.odds * 1.5)), now=1.0)
+        self.assertEqual([alert.kind for alert in alerts], [AlertKind.RISE])
+
+    def test_zscore(self):
+        """a change far from the usual changes is flagged"""
+        detector = OddsAnomalyDetector(drop=0.5, z_threshold=4.0)
+        odds = [200, 202, 200, 202, 200, 202, 200, 202, 200, 230]
+        alerts = []
+        for now, value in enumerate(odds):
+            alerts.extend(detector.update(with_odds(self.games, value), now=now * 100.0))
+        self.assertEqual([alert.kind for alert in alerts], [AlertKind.ZSCORE])
+        self.assertGreater(alerts[0].zscore, 4.0)
+
+    def test_grow_and_expire(self):
+        """the arrays grow past the capacity and the expired slots are reused"""
+        detector = OddsAnomalyDetector(capacity=8)
+        detector.update(self.games, now=0.0)
+        outcomes = len(detector)
+        self.assertGreater(outcomes, 8)
+
+        detector.update(self.games[:10], now=100.0)
+        expired = detector.expire(50.0, now=100.0)
+        self.assertEqual(expired + len(detector), outcomes)
+        self.assertEqual(len(detector), sum(len(game.odds) for game in self.games[:10]))
+
+        detector.update(self.games, now=200.0)
+        self.assertEqual(len(detector), outcomes)
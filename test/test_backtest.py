@@ -0,0 +1,147 @@
+"""Test replaying strategies over recorded odds"""
+import json
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.backtest import Backtest
+from veikkaaja.columnar import OddsColumns
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.responses import MarketResult, parse_closed_draws
+
+from .fixtures import saved_responses
+
+
+def home_favourites(columns: OddsColumns, params):
+    """Bet on the home competitor when its odds are below the limit"""
+    return [
+        params['stake'] if competitor == 1 and odds <= params['max_odds'] else 0
+        for competitor, odds in zip(columns.competitor, columns.odds)
+    ]
+
+
+class TestBacktest(TestCase):
+    """test the simulated bets"""
+
+    def setUp(self):
+        self.draws = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])
+        first_close = min(draw['closeTime'] for draw in self.draws) / 1000
+        self.columns = OddsColumns()
+        self.columns.extend(self.draws, snapshot_time=first_close - 3600)
+
+        # the home competitor wins every even draw
+        self.results = [
+            MarketResult(int(draw['id']), int(row['id']), (1 if int(draw['id']) % 2 else 2,),
+                         False) for draw in self.draws for row in draw['rows']
+        ]
+
+    def test_columns(self):
+        """A row for each competitor of each market"""
+        self.assertEqual(len(self.columns),
+                         sum(len(row['competitors']) for draw in self.draws
+                             for row in draw['rows']))
+        row = self.columns.row(0)
+        self.assertEqual(row['draw_id'], int(self.draws[0]['id']))
+        self.assertEqual(row['name'], self.draws[0]['rows'][0]['competitors'][0]['name'])
+        self.assertEqual(row['draw_type'], self.draws[0]['rows'][0]['type'])
+
+    def test_non_numeric_ids(self):
+        """The ids that are not numbers are stored as -1"""
+        draw = json.loads(json.dumps(self.draws[0]))
+        draw['rows'][0]['id'] = "A"
+        draw['rows'][0]['competitors'][0]['id'] = None
+        columns = OddsColumns()
+        columns.extend([draw])
+        self.assertEqual((columns.market[0], columns.competitor[0]), (-1, -1))
+
+    def test_run(self):
+        """The profit is the sum of the winning bets"""
+        params = {'stake': 100, 'max_odds': 200}
+        report = Backtest(self.columns, self.results, bankroll=10**9).run(
+            home_favourites, params)
+
+        expected_staked = expected_returned = 0
+        for draw in self.draws:
+            for row in draw['rows']:
+                for comp in row['competitors']:
+                    odds = comp['odds']['odds']
+                    if comp['id'] == "1" and odds <= 200:
+                        expected_staked += 100
+                        if int(draw['id']) % 2:
+                            expected_returned += odds
+
+        self.assertGreater(report.bets, 0)
+        self.assertEqual(report.rejected, 0)
+        self.assertEqual(report.staked, expected_staked)
+        self.assertEqual(report.returned, expected_returned)
+        self.assertEqual(report.profit, expected_returned - expected_staked)
+        self.assertEqual(report.final_balance, 10**9 + report.profit)
+        self.assertGreaterEqual(report.max_drawdown, 0)
+
+    def test_outcome_bet_once(self):
+        """The later snapshots do not bet the same outcome again"""
+        params = {'stake': 100, 'max_odds': 200}
+        single = Backtest(self.columns, self.results, bankroll=10**9).run(
+            home_favourites, params)
+        columns = OddsColumns()
+        columns.append_columns(self.columns)
+        columns.extend(self.draws, snapshot_time=self.columns.snapshot_time[0] + 60)
+        report = Backtest(columns, self.results, bankroll=10**9).run(home_favourites, params)
+        self.assertEqual(report, single)
+
+    def test_placement_rules(self):
+        """Too small stakes, bets over the balance and late bets are rejected"""
+        backtest = Backtest(self.columns, self.results, bankroll=500)
+        report = backtest.run(home_favourites, {'stake': 100, 'max_odds': 10**6})
+        self.assertEqual(report.bets, 5)
+        self.assertGreater(report.rejected, 0)
+
+        small = backtest.run(home_favourites, {'stake': 1, 'max_odds': 10**6})
+        self.assertEqual(small.bets, 0)
+
+        late = OddsColumns()
+        late.extend(self.draws, snapshot_time=max(d['closeTime'] for d in self.draws) / 1000)
+        report = Backtest(late, self.results).run(home_favourites, {'stake': 100,
+                                                                    'max_odds': 10**6})
+        self.assertEqual(report.bets, 0)
+
+    def test_unsettled(self):
+        """Bets without results are refunded"""
+        report = Backtest(self.columns, []).run(home_favourites, {'stake': 100,
+                                                                  'max_odds': 10**6})
+        self.assertEqual(report.bets, 0)
+        self.assertGreater(report.unsettled, 0)
+        self.assertEqual(report.final_balance, 100000)
+
+    def test_sweep(self):
+        """The sweep in a process pool matches the single runs"""
+        backtest = Backtest(self.columns, self.results, bankroll=10**9)
+        grid = [{'stake': 100, 'max_odds': odds} for odds in (150, 200, 300)]
+        reports = backtest.sweep(home_favourites, grid, max_workers=2)
+        self.assertEqual(reports, [backtest.run(home_favourites, params) for params in grid])
+
+    def test_parse_closed_draws(self):
+        """The results are read from the competitors"""
+        response = [{
+            'id': "2425549",
+            'status': "RESULTS_AVAILABLE",
+            'rows': [{
+                'id': "1",
+                'competitors': [{'id': "1", 'result': "WIN"}, {'id': "2", 'result': "LOSE"}]
+            }, {
+                'id': "2",
+                'status': "CANCELLED",
+                'competitors': [{'id': "1"}, {'id': "2"}]
+            }, {
+                'id': "3",
+                'competitors': [{'id': "1"}, {'id': "2"}]
+            }]
+        }]
+        with self.assertLogs(logger, "WARNING") as logs:
+            self.assertEqual(parse_closed_draws(response), [
+                MarketResult(2425549, 1, (1,), False),
+                MarketResult(2425549, 2, (), True),
+            ])
+        self.assertIn("1 closed markets without a known winner", logs.output[0])
+        with self.assertLogs(logger, "WARNING"):
+            self.assertEqual(parse_closed_draws({'draws': response}),
+                             parse_closed_draws(response))
@@ -0,0 +1,128 @@
+"""Test parsing feeds and archives in a process pool"""
+import json
+import pickle
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from veikkaaja.bulk import (parse_archive, parse_draws, parse_games, parse_snapshot_files,
+                            parse_transaction_lists, shard)
+from veikkaaja.columnar import COLUMNS, OddsColumns
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.recorder import ArchiveReader, ArchiveRecorder
+from veikkaaja.responses import TransActionType
+from veikkaaja.veikkaus_client import parse_ebet_draws
+
+from .fixtures import saved_responses
+from .mock_client import MockClient
+from .test_recorder import saved_response
+
+
+def _market(game):
+    return (game.row_id, game.market_id, game.competitor_ids, game.competitor_names,
+            game.odds, game.draw.rule_set)
+
+
+class TestBulk(TestCase):
+    """test the parallel parsing against the sequential parsing"""
+
+    def setUp(self):
+        self.raw = saved_responses()[EndPoint.games_info_endpoint().endpoint]
+        self.draws = json.loads(self.raw)
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.directory = Path(self._directory.name)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def assertColumnsEqual(self, first: OddsColumns, second: OddsColumns):  # pylint: disable=invalid-name
+        """The rows are equal, strings decoded"""
+        self.assertEqual(len(first), len(second))
+        for index in range(len(first)):
+            self.assertEqual(first.row(index), second.row(index))
+
+    def test_shard(self):
+        """The shards cover the items in order"""
+        items = list(range(10))
+        shards = shard(items, 4)
+        self.assertEqual([len(part) for part in shards], [3, 3, 2, 2])
+        self.assertEqual([item for part in shards for item in part], items)
+        self.assertEqual(shard(items[:2], 4), [[0], [1]])
+
+    def test_parse_games(self):
+        """The games are the same as parsed in a single process"""
+        client = MockClient()
+        sequential = client.parse_draws(self.draws)
+        games = parse_games(self.draws, max_workers=2, client=client)
+        self.assertEqual([_market(game) for game in games],
+                         [_market(game) for game in sequential])
+        self.assertIs(games[0]._client, client)  # pylint: disable=protected-access
+
+    def test_pickle_game(self):
+        """The client is not pickled with the game"""
+        game = MockClient().parse_draws(self.draws)[0]
+        copy = pickle.loads(pickle.dumps(game))
+        self.assertEqual(_market(copy), _market(game))
+        self.assertIsNone(copy._client)  # pylint: disable=protected-access
+        self.assertEqual(parse_ebet_draws(self.draws)[0].home_team, game.home_team)
+
+    def test_parse_draws(self):
+        """The columns are the same as parsed in a single process"""
+        sequential = OddsColumns()
+        sequential.extend(self.draws)
+        self.assertColumnsEqual(parse_draws(self.draws, max_workers=2), sequential)
+
+        copy = pickle.loads(pickle.dumps(sequential))
+        for column, _ in COLUMNS:
+            self.assertEqual(getattr(copy, column), getattr(sequential, column))
+        self.assertEqual(copy.draw_type_code(self.draws[0]['rows'][0]['type']), 0)
+
+    def test_parse_snapshot_files(self):
+        """Each file is a snapshot"""
+        paths = []
+        for number in range(3):
+            path = self.directory / f"snapshot-{number}.json"
+            path.write_bytes(self.raw)
+            paths.append(path)
+
+        columns = parse_snapshot_files(paths, max_workers=2)
+        single = OddsColumns()
+        single.extend(self.draws)
+        self.assertEqual(len(columns), 3 * len(single))
+        self.assertEqual(set(columns.snapshot_time), {path.stat().st_mtime for path in paths})
+
+    def test_parse_archive(self):
+        """Each recorded draws response is a snapshot"""
+        recorder = ArchiveRecorder(self.directory, segment_size=1, frame_records=1)
+        draws = EndPoint.games_info_endpoint()
+        sports = EndPoint.sport_type_code_endpoint()
+        for _ in range(3):
+            recorder.record(draws, saved_response(draws))
+            recorder.record(sports, saved_response(sports))
+        recorder.close()
+
+        reader = ArchiveReader(self.directory)
+        columns = parse_archive(reader, max_workers=2)
+        sequential = OddsColumns()
+        for record in reader.records(endpoint=draws.endpoint):
+            sequential.extend(record.json(), record.timestamp)
+        self.assertEqual(len(sequential), 3 * len(parse_draws(self.draws, max_workers=1)))
+        self.assertColumnsEqual(columns, sequential)
+
+    def test_parse_transaction_lists(self):
+        """The wagers of every response in order"""
+        responses = [{
+            'transactions': [{
+                'externalId': f"{page}-{number}",
+                'id': page * 10 + number,
+                'accountingDate': 1600887480000,
+                'amount': 100,
+                'type': "BUY",
+                'product': "EBET"
+            } for number in range(3)]
+        } for page in range(5)]
+
+        wagers = parse_transaction_lists(responses, max_workers=2)
+        self.assertEqual([wager.id for wager in wagers],
+                         [page * 10 + number for page in range(5) for number in range(3)])
+        self.assertEqual(wagers[0].result, TransActionType.BUY)
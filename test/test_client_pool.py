@@ -0,0 +1,58 @@
+"""Test the pool of accounts"""
+import logging
+import threading
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.client_pool import ClientPool
+from veikkaaja.veikkaus_client import BetDecision, BetTarget, GameTypes
+
+from .stand_in_server import StandInServer
+
+ACCOUNTS = {"first": "stand-in", "second": "stand-in", "third": "stand-in"}
+
+
+class TestClientPool(TestCase):
+    """test sharing the transport and the public data"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_shared_feed(self):
+        """the draws are fetched once for all the accounts and callers"""
+        with StandInServer() as server, server.api_root(), ClientPool(ACCOUNTS) as pool:
+            self.assertEqual(len(pool), 3)
+            self.assertEqual(server.requests, 3)
+
+            results = []
+            threads = [
+                threading.Thread(
+                    target=lambda: results.append(pool.upcoming_events(GameTypes.EBET)))
+                for _ in range(6)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(server.requests, 3 + 1)
+            self.assertEqual({len(games) for games in results}, {360})
+
+            # the sessions share the connection pool
+            url = server.url
+            self.assertEqual({id(client.session.get_adapter(url))
+                              for client in pool.clients.values()}, {id(pool.adapter)})
+
+    def test_account_calls(self):
+        """the account calls go to the session of the account"""
+        with StandInServer() as server, server.api_root(), ClientPool(ACCOUNTS,
+                                                                      rate=100.0) as pool:
+            self.assertEqual(pool.balances(), {account: 1.62 for account in ACCOUNTS})
+            game = pool.upcoming_events(GameTypes.EBET)[0]
+            self.assertTrue(pool.place_bet("second", game, BetDecision(BetTarget.HOME, 100)))
+            self.assertEqual(server.requests, 3 + 3 + 1 + 1)
+            with self.assertRaises(KeyError):
+                pool.get_balance("fourth")
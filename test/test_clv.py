@@ -0,0 +1,118 @@
+"""Test the closing line value of the bets"""
+import copy
+import json
+import logging
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.clv import ClosingLines, PlacedBet
+from veikkaaja.columnar import OddsColumns
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.payload import EbetPayloadBuilder
+from veikkaaja.types import BetTarget
+from veikkaaja.veikkaus_client import parse_ebet_draws
+
+from .fixtures import saved_responses
+
+
+class TestClosingLines(TestCase):
+    """test joining the bets to the last odds before the close"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.draws = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])
+        self.games = parse_ebet_draws(self.draws)
+        self.game = self.games[0]
+        self.close = self.game.close_time.timestamp()
+        self.closed = []
+        self.lines = ClosingLines(on_clv=self.closed.append)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_clv_at_close(self):
+        """the bets get the CLV when their market closes, against the last odds"""
+        self.lines.observe(self.games, now=self.close - 600)
+        home = self.game.home_odds
+        wager = EbetPayloadBuilder().build_selections([(self.game.list_index, BetTarget.HOME,
+                                                        100)])
+        self.assertEqual(self.lines.add_wager(wager), [])
+
+        # the home odds drop before the close, the odds after the close are ignored
+        competitors = self.game._competitors  # pylint: disable=protected-access
+        position = self.game._position(1)  # pylint: disable=protected-access
+        competitors.odds[position] = int(home) - 20
+        self.lines.observe(self.games, now=self.close - 60)
+        competitors.odds[position] = int(home) - 50
+        self.lines.observe(self.games, now=self.close + 60)
+
+        self.assertEqual(self.lines.close(now=self.close - 1), [])
+        results = self.lines.close(now=self.close)
+        self.assertEqual(results, self.closed)
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].bet.reference, wager.request_id)
+        self.assertEqual(results[0].closing_odds, home - 20)
+        self.assertAlmostEqual(results[0].clv, home / (home - 20) - 1)
+
+        # a bet joined after the close gets its CLV right away
+        late = self.lines.add_bets(
+            [PlacedBet(int(self.game.row_id), int(self.game.market_id), 1, int(home) - 20, 300)])
+        self.assertEqual(late[0].clv, 0.0)
+        summary = self.lines.summary
+        self.assertEqual((summary.bets, summary.staked, summary.beat_rate), (2, 400, 0.5))
+        self.assertAlmostEqual(summary.weighted_clv, results[0].clv * 100 / 400)
+
+    def test_columns_and_expire(self):
+        """the recorded snapshots give the same closing odds, the closed rows are forgotten"""
+        columns = OddsColumns()
+        columns.extend(self.draws, snapshot_time=self.close - 600)
+        self.lines.observe_columns(columns)
+        row_id, market = int(self.game.row_id), int(self.game.market_id)
+        self.assertEqual(self.lines.row_id(self.game.list_index), row_id)
+        self.assertEqual(self.lines.current_odds(row_id, market, 1), self.game.home_odds)
+
+        last_close = max(game.close_time.timestamp() for game in self.games)
+        self.assertEqual(self.lines.expire(max_age=0.0, now=self.close + 1),
+                         len([game for game in self.games
+                              if game.close_time.timestamp() < self.close + 1]))
+        self.assertEqual(self.lines.current_odds(row_id, market, 1), 0)
+        self.lines.expire(max_age=0.0, now=last_close + 1)
+        self.assertEqual(len(self.lines), 0)
+
+    def test_markets_of_a_draw(self):
+        """the markets (rows) of a draw keep their own odds"""
+        draw = copy.deepcopy(self.draws[0])
+        one_x_two = draw['rows'][0]
+        one_x_two.update(type='1X2', description='')
+        one_x_two['competitors'][0]['odds']['odds'] = 3800
+        handicap = copy.deepcopy(one_x_two)
+        handicap.update(id='2', type='AWAY_HANDICAP')
+        handicap['competitors'][0]['odds']['odds'] = 4300
+        draw['rows'].append(handicap)
+        games = parse_ebet_draws([draw])
+        row_id, close = int(draw['id']), draw['closeTime'] / 1000
+
+        self.lines.observe(games, now=close - 60)
+        self.assertEqual(self.lines.current_odds(row_id, 1, 1), 3800)
+        self.assertEqual(self.lines.current_odds(row_id, 2, 1), 4300)
+        self.assertEqual(self.lines.market(row_id, 1), 1)
+        # a wager bets on the first market of the draw
+        draw['rows'].reverse()
+        lines = ClosingLines()
+        lines.observe(parse_ebet_draws([draw]), now=close - 60)
+        self.assertEqual(lines.market(row_id, 1), 2)
+        draw['rows'].reverse()
+
+        columns = OddsColumns()
+        columns.extend([draw], snapshot_time=close - 600)
+        lines = ClosingLines()
+        lines.observe_columns(columns)
+        self.assertEqual(lines.current_odds(row_id, 1, 1), 3800)
+        self.assertEqual(lines.current_odds(row_id, 2, 1), 4300)
+
+        results = self.lines.add_bets([PlacedBet(row_id, 1, 1, 4000, 100),
+                                       PlacedBet(row_id, 2, 1, 4000, 100)])
+        self.assertEqual(results, [])
+        results = self.lines.close(now=close)
+        self.assertEqual([result.closing_odds for result in results], [3800, 4300])
@@ -2,7 +2,7 @@
 
 from unittest import TestCase
 
-from veikkaaja.veikkaus_client import EBETType, GameTypes
+from veikkaaja.veikkaus_client import BetDecision, EBETType, GameTypes, parse_ebet_draws
 
 from .mock_client import MockClient
 
@@ -37,3 +37,91 @@ class TestEbetBetting(TestCase):
                 self.assertEqual(game.away_odds, 250.0)
 
         self.assertTrue(found_edinburgh_stanraer_game)
+
+    def test_markets(self):
+        """Each row of a draw is a market of its own"""
+        client = MockClient()
+        games = client.upcoming_events(GameTypes.EBET)
+
+        # every row is parsed into a separate game
+        self.assertEqual(len(games), 360)
+        self.assertEqual(len({id(game) for game in games}), 360)
+
+        over_under = [game for game in games if game.draw_type == EBETType.OVER_UNDER]
+        self.assertEqual(len(over_under), 1)
+        self.assertEqual(over_under[0].competitor_names, ["Yli 2,5 maalia", "Alle 2,5 maalia"])
+        self.assertEqual(over_under[0].odds, [121, 375])
+        self.assertEqual(over_under[0].draw_odds, 0.0)
+
+        outrights = [
+            game for game in games if game.draw_type == EBETType.OUTRIGHT_SHORT_TERM
+        ]
+        self.assertTrue(all(len(game.competitor_ids) > 3 for game in outrights))
+        last = outrights[0].competitor_ids[-1]
+        self.assertGreater(outrights[0].competitor_odds(last), 0)
+
+    def test_draw_with_many_rows(self):
+        """The rows of a draw are separate markets with their own competitors and odds"""
+
+        def competitor(number, name, odds, handicap=None):
+            comp = {'id': str(number), 'name': name, 'odds': {'odds': odds}}
+            if handicap is not None:
+                comp['handicap'] = handicap
+            return comp
+
+        draw = {
+            'id': "2800001", 'listIndex': "7001", 'status': "OPEN",
+            'closeTime': 1636740000000,
+            'rows': [{
+                'id': "1", 'type': "1X2", 'status': "OPEN", 'eventId': "101200001",
+                'competitors': [competitor(1, "Koti", 3800, "0.00"),
+                                competitor(2, "Tasapeli", 340),
+                                competitor(3, "Vieras", 175)]
+            }, {
+                'id': "2", 'type': "AWAY_HANDICAP", 'status': "OPEN",
+                'eventId': "101200001",
+                'competitors': [competitor(1, "Koti +1", 4300, "1.00"),
+                                competitor(2, "Tasapeli", 410),
+                                competitor(3, "Vieras -1", 150)]
+            }, {
+                'id': "3", 'type': "OVER_UNDER", 'status': "OPEN", 'eventId': "101200001",
+                'competitors': [competitor(1, "Yli 2,5 maalia", 190, "2.50"),
+                                competitor(2, "Alle 2,5 maalia", 185)]
+            }]
+        }
+        one_x_two, handicap, over_under = parse_ebet_draws([draw])
+
+        self.assertIs(one_x_two.draw, handicap.draw)
+        self.assertEqual([game.market_id for game in (one_x_two, handicap, over_under)],
+                         ["1", "2", "3"])
+        self.assertEqual([game.draw_type for game in (one_x_two, handicap, over_under)],
+                         [EBETType.ONE_X_TWO, EBETType.AWAY_HANDICAP, EBETType.OVER_UNDER])
+        self.assertEqual(one_x_two.odds, [3800, 340, 175])
+        self.assertEqual(handicap.odds, [4300, 410, 150])
+        self.assertEqual(one_x_two.competitor_odds(1), 3800.0)
+        self.assertEqual(handicap.competitor_odds(1), 4300.0)
+        self.assertEqual(handicap.competitor_names, ["Koti +1", "Tasapeli", "Vieras -1"])
+        self.assertEqual(over_under.competitor_ids, [1, 2])
+        self.assertEqual([game.handicap for game in (one_x_two, handicap, over_under)],
+                         ["0.00", "1.00", "2.50"])
+
+    def test_shared_draw_information(self):
+        """The rule sets of the draws are shared"""
+        client = MockClient()
+        games = client.upcoming_events(GameTypes.EBET)
+
+        rule_sets = {id(game.draw.rule_set) for game in games}
+        self.assertLess(len(rule_sets), 10)
+        self.assertTrue(all(game.min_stake == game.draw.rule_set.min_stake for game in games))
+        self.assertEqual(games[0].close_time, games[0].draw.close_time)
+
+    def test_bet_on_competitor(self):
+        """Any competitor of any market can be bet on by its id"""
+        client = MockClient()
+        games = client.upcoming_events(GameTypes.EBET)
+        outright = next(
+            game for game in games if game.draw_type == EBETType.OUTRIGHT_SHORT_TERM)
+        target = outright.competitor_ids[-1]
+
+        payload = client.ebet_payload([outright], [BetDecision(target, 100)])
+        self.assertEqual(payload['boards'][0]['selections'][0]['competitors'], [target])
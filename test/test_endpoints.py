@@ -0,0 +1,192 @@
+"""Test the declared endpoints and their request policies"""
+import json
+import logging
+import threading
+import time
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.endpoints import (ENDPOINTS, NO_RETRY, EndPoint, Priority, RequestGate,
+                                 RetryPolicy)
+from veikkaaja.responses import ResponseType, Wager, parse_response
+from veikkaaja.veikkaus_client import GameTypes, VeikkausClient
+
+from .fixtures import saved_responses
+from .stand_in_server import StandInServer
+
+
+class TestEndPoints(TestCase):
+    """test the endpoint registry"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_interned(self):
+        """the same endpoint is the same instance"""
+        self.assertIs(EndPoint.games_info_endpoint(),
+                      EndPoint.games_info_endpoint(GameTypes.EBET))
+        self.assertIsNot(EndPoint.games_info_endpoint(GameTypes.SPORT),
+                         EndPoint.games_info_endpoint())
+        self.assertIs(EndPoint.sport_categories_endpoint(1),
+                      EndPoint.get('sport_categories', sport_id=1))
+        self.assertEqual(EndPoint.sport_tournament_info_endpoint(1, 2, 3).endpoint,
+                         "v1/sports/1/categories/2/tournaments/3")
+
+    def test_url_follows_the_root(self):
+        """the interned endpoints are sent to the current API root"""
+        endpoint = EndPoint.sport_type_code_endpoint()
+        self.assertEqual(endpoint.url, "https://www.veikkaus.fi/api/v1/sports")
+        with StandInServer() as server, server.api_root():
+            self.assertEqual(endpoint.url, f"{server.url}/v1/sports")
+        self.assertEqual(endpoint.url, "https://www.veikkaus.fi/api/v1/sports")
+
+    def test_policies(self):
+        """the account data is not shared, the login and the wagers are not retried"""
+        self.assertFalse(EndPoint.account_info_endpoint().cacheable)
+        self.assertFalse(EndPoint.place_wager_test_endpoint().cacheable)
+        self.assertTrue(EndPoint.games_info_endpoint().cacheable)
+        self.assertEqual(EndPoint.login_endpoint().retry, NO_RETRY)
+        self.assertFalse(EndPoint.place_wager_endpoint().idempotent)
+        self.assertEqual(EndPoint.place_wager_endpoint().retry, NO_RETRY)
+        self.assertEqual(EndPoint.place_wager_endpoint().priority, Priority.WAGER)
+        self.assertEqual(EndPoint.sport_type_code_endpoint().ttl, 3600.0)
+        for name, spec in ENDPOINTS.items():
+            self.assertIn(spec.method, ("GET", "POST"), name)
+        self.assertEqual(RetryPolicy(backoff=0.1).delay(0), 0.0)
+        self.assertAlmostEqual(RetryPolicy(backoff=0.1).delay(3), 0.4)
+        with self.assertRaises(ValueError):
+            EndPoint("v1/sports", ENDPOINTS['sport_types']._replace(retry=RetryPolicy(0)))
+
+    def test_parse(self):
+        """the declared parser reads the response"""
+        endpoint = EndPoint.account_betting_history()
+        data = {
+            'transactions': [{
+                'id': 1,
+                'externalId': "abc",
+                'product': "EBET",
+                'type': "BUY",
+                'amount': -100,
+                'accountingDate': 1637000000000
+            }]
+        }
+        wagers = endpoint.parse(data)
+        self.assertEqual(len(wagers), 1)
+        self.assertIsInstance(wagers[0], Wager)
+        self.assertEqual(parse_response(data, ResponseType.TRANSACTION_LIST), wagers)
+        with self.assertRaises(ValueError):
+            sports = json.loads(saved_responses()["v1/sports"])
+            EndPoint.sport_type_code_endpoint().parse(sports)
+
+    def test_retries(self):
+        """the failed requests are retried as the endpoint declares"""
+        with StandInServer() as server, server.api_root():
+            client = VeikkausClient("stand-in", "stand-in")
+            server.error_rate = 1.0
+            self.assertEqual(client.sport_types(), [])
+            # login and three attempts
+            self.assertEqual(server.requests, 1 + 3)
+
+            self.assertFalse(client.place_bets([], [], test=True))
+            self.assertEqual(server.requests, 1 + 3 + 2)
+
+            server.error_rate = 0.0
+            self.assertTrue(client.sport_types())
+
+    def test_backoff_outside_gate(self):
+        """a request waiting to be retried does not hold its place in the gate"""
+        gate = RequestGate(limit=1)
+        with StandInServer() as server, server.api_root():
+            client = VeikkausClient("stand-in", "stand-in", gate=gate)
+            server.error_rate = 1.0
+            retrying = threading.Thread(target=client.sport_types)
+            retrying.start()
+            time.sleep(0.05)
+            started = time.monotonic()
+            with gate.admit(Priority.WAGER):
+                waited = time.monotonic() - started
+            retrying.join()
+        self.assertLess(waited, 0.1)
+
+
+class TestRequestGate(TestCase):
+    """test ordering the requests by priority"""
+
+    def test_priority_order(self):
+        """the waiting requests are admitted by priority, then in order"""
+        gate = RequestGate(limit=1)
+        admitted = []
+        threads = []
+
+        def request(priority, name):
+            with gate.admit(priority):
+                admitted.append(name)
+
+        with gate.admit(Priority.REFERENCE):
+            for priority, name in ((Priority.REFERENCE, "sports"),
+                                   (Priority.ODDS, "odds"),
+                                   (Priority.WAGER, "wager"),
+                                   (Priority.ODDS, "odds 2")):
+                thread = threading.Thread(target=request, args=(priority, name))
+                thread.start()
+                threads.append(thread)
+                # queue the requests in a known order
+                time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(admitted, ["wager", "odds", "odds 2", "sports"])
+
+    def test_client_gate(self):
+        """the client sends the requests through the gate"""
+        gate = RequestGate(limit=2)
+        with StandInServer(latency=0.01) as server, server.api_root():
+            client = VeikkausClient("stand-in", "stand-in", gate=gate)
+            threads = [
+                threading.Thread(target=client.upcoming_events, args=(GameTypes.EBET, ))
+                for _ in range(4)
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(server.requests, 1 + 4)
+        # every request left the gate
+        with gate.admit(Priority.WAGER), gate.admit(Priority.WAGER):
+            pass
+
+    def test_rate(self):
+        """the requests are spaced to the rate of the gate"""
+        gate = RequestGate(limit=4, rate=50.0)
+        started = time.monotonic()
+        for _ in range(6):
+            with gate.admit(Priority.ODDS):
+                pass
+        self.assertGreaterEqual(time.monotonic() - started, 5 / 50.0)
+
+    def test_rate_priority(self):
+        """the requests waiting for the rate are still admitted by priority"""
+        gate = RequestGate(limit=4, rate=10.0)
+        admitted = []
+        threads = []
+
+        def request(priority, name):
+            with gate.admit(priority):
+                admitted.append(name)
+
+        with gate.admit(Priority.ODDS):
+            pass
+        for priority, name in ((Priority.ODDS, "odds"), (Priority.ODDS, "odds 2"),
+                               (Priority.WAGER, "wager")):
+            thread = threading.Thread(target=request, args=(priority, name))
+            thread.start()
+            threads.append(thread)
+            time.sleep(0.02)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(admitted, ["wager", "odds", "odds 2"])
@@ -0,0 +1,92 @@
+"""Test exporting the parsed responses to Arrow, pandas and Parquet"""
+import json
+import tempfile
+import unittest
+from datetime import datetime
+from pathlib import Path
+
+from veikkaaja import export
+from veikkaaja.columnar import OddsColumns
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.responses import MarketResult, TransActionType, Wager
+from veikkaaja.veikkaus_client import GameTypes, parse_ebet_draws
+
+from .fixtures import saved_responses
+
+
+@unittest.skipIf(export.pyarrow is None, "The optional 'pyarrow' package is not installed.")
+class TestExport(unittest.TestCase):
+    """test the exported tables"""
+
+    def setUp(self):
+        self.draws = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])
+        self.columns = OddsColumns()
+        self.columns.extend(self.draws, snapshot_time=1636700000.0)
+
+    def test_columns_not_copied(self):
+        """the arrays are shared with Arrow and the strings are dictionary encoded"""
+        table = export.to_arrow(self.columns, copy=False)
+        self.assertEqual(table.num_rows, len(self.columns))
+        self.assertEqual(table.column('odds').to_pylist(), self.columns.odds.tolist())
+        odds = table.column('odds').chunk(0)
+        self.assertEqual(odds.buffers()[1].address,
+                         self.columns.odds.buffer_info()[0])
+        # the shared arrays are frozen while the table is alive
+        with self.assertRaises(BufferError):
+            self.columns.extend(self.draws)
+
+        names = table.column('name').chunk(0)
+        self.assertEqual(names.dictionary.to_pylist(), self.columns.names)
+        self.assertEqual(table.column('status').to_pylist()[0], "OPEN")
+
+    def test_live_columns(self):
+        """by default the arrays are copied and the columns can still be extended"""
+        table = export.to_arrow(self.columns)
+        odds = table.column('odds').chunk(0)
+        self.assertNotEqual(odds.buffers()[1].address,
+                            self.columns.odds.buffer_info()[0])
+        self.columns.extend(self.draws, snapshot_time=1636700060.0)
+        self.assertEqual(table.num_rows * 2, len(self.columns))
+        self.assertEqual(table.column('odds').to_pylist(),
+                         self.columns.odds.tolist()[:table.num_rows])
+
+    def test_games(self):
+        """the games are exported like the columns of the raw draws"""
+        games = parse_ebet_draws(self.draws)
+        table = export.to_arrow(games)
+        self.assertEqual(table.num_rows, len(self.columns))
+
+        def rows(table):
+            return sorted(zip(*(table.column(column).to_pylist()
+                                for column in ('draw_id', 'market', 'competitor', 'odds',
+                                               'name', 'draw_type', 'close_time'))))
+
+        self.assertEqual(rows(table), rows(export.to_arrow(self.columns)))
+
+    def test_pandas_and_parquet(self):
+        """the tables convert to data frames and round trip through Parquet"""
+        history = [
+            Wager(TransActionType.BUY, -100, datetime(2021, 11, 12, 18), "11", 1,
+                  GameTypes.EBET),
+            Wager(TransActionType.WIN, 250, datetime(2021, 11, 12, 21), "11", 2,
+                  GameTypes.EBET),
+        ]
+        results = [MarketResult(1, 1, (1, ), False), MarketResult(2, 1, (), True)]
+        if export.pandas is not None:
+            frame = export.to_pandas(history)
+            self.assertEqual(frame['amount'].tolist(), [-100, 250])
+            self.assertEqual(str(frame['result'].dtype), "category")
+
+        with tempfile.TemporaryDirectory() as directory:
+            for name, data in (("games", self.columns), ("history", history),
+                               ("results", results)):
+                path = Path(directory) / f"{name}.parquet"
+                export.write_parquet(data, path)
+                self.assertEqual(export.pyarrow.parquet.read_table(path).to_pylist(),
+                                 export.to_arrow(data).to_pylist())
+
+    def test_unknown(self):
+        """only the parsed responses are exported"""
+        self.assertEqual(export.to_arrow([]).num_rows, 0)
+        with self.assertRaises(TypeError):
+            export.to_arrow([object()])
@@ -0,0 +1,135 @@
+"""Test publishing the changes of the feed"""
+import asyncio
+import json
+import logging
+import threading
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.feed import FeedPublisher, GameClosed, GameOpened, OddsChanged, StatusChanged
+from veikkaaja.veikkaus_client import EBETType, GameTypes, parse_ebet_draws
+
+from .fixtures import saved_responses
+from .mock_client import MockClient
+
+
+class TestFeedPublisher(TestCase):
+    """test the events between polls"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.draws = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])
+        self.games = parse_ebet_draws(self.draws)
+        self.publisher = FeedPublisher()
+        self.publisher.publish(self.games)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def changed_games(self):
+        """Change the odds of the first draw, suspend the second, drop the third"""
+        draws = json.loads(json.dumps(self.draws))
+        draws[0]['rows'][0]['competitors'][0]['odds']['odds'] += 10
+        draws[1]['rows'][0]['status'] = "SUSPENDED"
+        del draws[2]
+        return parse_ebet_draws(draws)
+
+    def test_events(self):
+        """One event for each change"""
+        events = self.publisher.publish(self.changed_games())
+        self.assertEqual(sorted(type(event).__name__ for event in events),
+                         ["GameClosed", "OddsChanged", "StatusChanged"])
+
+        odds = next(event for event in events if isinstance(event, OddsChanged))
+        self.assertEqual(odds.game.row_id, self.draws[0]['id'])
+        self.assertEqual(odds.odds[0], odds.previous[0] + 10)
+        status = next(event for event in events if isinstance(event, StatusChanged))
+        self.assertEqual((status.previous, status.status), ("OPEN", "SUSPENDED"))
+        closed = next(event for event in events if isinstance(event, GameClosed))
+        self.assertEqual(closed.game.row_id, self.draws[2]['id'])
+
+        self.assertEqual(self.publisher.publish(self.changed_games()), [])
+
+    def test_filters(self):
+        """The subscribers only receive the matching events"""
+        received = {name: [] for name in ('all', 'row', 'sport', 'type', 'odds', 'other')}
+        changed = next(game for game in self.games if game.row_id == self.draws[0]['id'])
+        self.publisher.subscribe(received['all'].append)
+        self.publisher.subscribe(received['row'].append, row_id=changed.row_id)
+        self.publisher.subscribe(received['sport'].append, sport_id=changed.sport_id)
+        self.publisher.subscribe(received['type'].append, draw_type=changed.draw_type)
+        self.publisher.subscribe(received['odds'].append, events=[OddsChanged])
+        self.publisher.subscribe(received['other'].append, row_id=changed.row_id,
+                                 sport_id="-1")
+
+        self.publisher.publish(self.changed_games())
+        self.assertEqual(len(received['all']), 3)
+        self.assertEqual([type(event) for event in received['row']], [OddsChanged])
+        self.assertIn(OddsChanged, [type(event) for event in received['sport']])
+        self.assertTrue(all(event.game.draw_type == changed.draw_type
+                            for event in received['type']))
+        self.assertEqual(len(received['odds']), 1)
+        self.assertEqual(received['other'], [])
+
+        with self.assertRaises(ValueError):
+            self.publisher.subscribe(print, team="Arsenal")
+
+    def test_unsubscribe(self):
+        """No events after unsubscribing"""
+        received = []
+        subscription = self.publisher.subscribe(received.append, draw_type=EBETType.ONE_X_TWO)
+        self.publisher.unsubscribe(subscription)
+        self.publisher.publish(self.changed_games())
+        self.assertEqual(received, [])
+
+    def test_queue(self):
+        """The events are put to an asyncio queue"""
+
+        async def consume():
+            queue = asyncio.Queue()
+            self.publisher.subscribe(queue=queue, events=(GameOpened, OddsChanged))
+            self.publisher.publish(self.changed_games())
+            return await asyncio.wait_for(queue.get(), 1.0)
+
+        event = asyncio.run(consume())
+        self.assertIsInstance(event, OddsChanged)
+
+    def test_poll(self):
+        """The client is polled for the games"""
+        publisher = FeedPublisher(MockClient())
+        received = []
+        publisher.subscribe(received.append, events=(GameOpened,))
+        events = publisher.poll(GameTypes.EBET)
+        self.assertEqual(len(events), len(self.games))
+        self.assertEqual(len(received), len(self.games))
+
+    def test_failing_subscriber_and_poll(self):
+        """A raising callback or poll does not stop the others"""
+
+        def failing(event):
+            raise RuntimeError(f"cannot handle {event}")
+
+        received = []
+        self.publisher.subscribe(failing)
+        self.publisher.subscribe(received.append)
+        self.assertEqual(len(self.publisher.publish(self.changed_games())), 3)
+        self.assertEqual(len(received), 3)
+
+        stop = threading.Event()
+
+        class FailingClient(MockClient):
+            """Raise on the first poll"""
+            polls = 0
+
+            def upcoming_events(self, game_type, taxonomy=None, where=None):
+                self.polls += 1
+                if self.polls == 1:
+                    raise ConnectionError("connection reset")
+                stop.set()
+                return super().upcoming_events(game_type, taxonomy, where)
+
+        client = FailingClient()
+        FeedPublisher(client).run(0.0, stop)
+        self.assertEqual(client.polls, 2)
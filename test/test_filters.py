@@ -0,0 +1,43 @@
+"""Test filtering the draws while they are parsed"""
+from datetime import timedelta
+from unittest import TestCase
+
+from veikkaaja.filters import GameFilter
+from veikkaaja.veikkaus_client import EBETType, GameTypes
+
+from .mock_client import MockClient
+
+
+class TestGameFilter(TestCase):
+    """test the filters against filtering the parsed games"""
+
+    def setUp(self):
+        self.client = MockClient()
+        self.games = self.client.upcoming_events(GameTypes.EBET)
+
+    def test_pushdown(self):
+        """the filtered markets are the matching markets of the whole feed"""
+        first_close = self.games[0].close_time
+        for where in (GameFilter(sport_ids=[1], draw_types=[EBETType.ONE_X_TWO]),
+                      GameFilter(draw_types=["12"], closes_before=first_close + timedelta(days=1)),
+                      GameFilter(closes_after=first_close + timedelta(days=2)),
+                      GameFilter(statuses=["CLOSED"]),
+                      GameFilter()):
+            games = self.client.upcoming_events(GameTypes.EBET, where=where)
+            expected = [game for game in self.games if where.matches(game)]
+            self.assertEqual([(game.row_id, game.market_id, game.odds) for game in games],
+                             [(game.row_id, game.market_id, game.odds) for game in expected],
+                             where)
+
+        self.assertEqual(len(self.client.upcoming_events(
+            GameTypes.EBET, where=GameFilter(sport_ids=["1"], draw_types=["1X2"]))), 181)
+
+    def test_not_decoded(self):
+        """the competitors of the skipped markets are not decoded"""
+        games = self.client.upcoming_events(GameTypes.EBET,
+                                            where=GameFilter(sport_ids=[1],
+                                                             draw_types=[EBETType.ONE_X_TWO]))
+        competitors = games[0]._competitors  # pylint: disable=protected-access
+        self.assertEqual(len(competitors), sum(len(game.competitor_ids) for game in games))
+        self.assertLess(len(competitors),
+                        len(self.games[0]._competitors))  # pylint: disable=protected-access
@@ -0,0 +1,86 @@
+"""Test the local account ledger"""
+from datetime import datetime, timedelta
+from unittest import TestCase
+
+from veikkaaja.ledger import AccountLedger
+from veikkaaja.responses import TransActionType, Wager
+from veikkaaja.veikkaus_client import BetDecision, BetTarget, GameTypes
+
+from .mock_client import MockClient
+
+
+class CountingClient(MockClient):
+    """Count the requests"""
+
+    def __init__(self):
+        super().__init__()
+        self.requests = []
+
+    def _access_endpoint(self, endpoint, payload=None, method="GET"):
+        self.requests.append(endpoint.endpoint)
+        return super()._access_endpoint(endpoint, payload, method)
+
+
+def transaction(number: int, result: TransActionType, amount: int, minutes: float = 1.0):
+    """A transaction 'minutes' from now"""
+    return Wager(result=result,
+                 amount=amount,
+                 accounting_date=datetime.now() + timedelta(minutes=minutes),
+                 external_id=str(number),
+                 id=number,
+                 product=GameTypes.EBET)
+
+
+class TestAccountLedger(TestCase):
+    """test keeping the balance locally"""
+
+    def setUp(self):
+        self.client = CountingClient()
+        self.ledger = AccountLedger(self.client)
+
+    def test_single_fetch(self):
+        """The balance is fetched once for many reads"""
+        for _ in range(10):
+            self.assertTrue(self.ledger.can_afford(162))
+        self.assertFalse(self.ledger.can_afford(163))
+        self.assertEqual(self.client.requests, ["v1/players/self/account"])
+
+    def test_bets(self):
+        """Accepted wagers are deducted, a rejected wager refreshes the balance"""
+        self.assertEqual(self.ledger.balance, 162)
+        self.ledger.record_wager(100, accepted=True)
+        self.assertEqual(self.ledger.balance, 62)
+        self.ledger.record_wager(100, accepted=False)
+        self.assertEqual(self.ledger.balance, 162)
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_test_bets(self):
+        """The bets on the test endpoint cost nothing"""
+        game = self.client.upcoming_events(GameTypes.EBET)[0]
+        self.assertEqual(self.ledger.balance, 162)
+        self.assertTrue(self.client.place_bet(game, BetDecision(BetTarget.HOME, 100), test=True))
+        self.assertEqual(self.ledger.balance, 162)
+
+    def test_interval(self):
+        """The balance is fetched again after the interval"""
+        ledger = AccountLedger(self.client, reconcile_interval=0.0)
+        self.assertEqual(ledger.balance, 162)
+        self.assertEqual(ledger.balance, 162)
+        self.assertEqual(len(self.client.requests), 2)
+
+    def test_transactions(self):
+        """Wins are added, our purchases confirmed, other purchases refresh"""
+        self.assertEqual(self.ledger.balance, 162)
+        self.ledger.record_wager(100, accepted=True)
+        self.ledger.record_transactions([
+            transaction(1, TransActionType.BUY, 100),
+            transaction(2, TransActionType.WIN, 250),
+            transaction(3, TransActionType.WIN, 1000, minutes=-10),
+        ])
+        self.ledger.record_transactions([transaction(2, TransActionType.WIN, 250)])
+        self.assertEqual(self.ledger.balance, 162 - 100 + 250)
+        self.assertEqual(len(self.client.requests), 1)
+
+        self.ledger.record_transactions([transaction(4, TransActionType.BUY, 500)])
+        self.assertEqual(self.ledger.balance, 162)
+        self.assertEqual(len(self.client.requests), 2)
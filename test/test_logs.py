@@ -0,0 +1,87 @@
+"""Test the non-blocking logging pipeline"""
+import io
+import json
+import logging
+import queue
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.logs import (NiceFormatter, NonBlockingQueueHandler, SamplingFilter,
+                            disable_queue_logging, enable_queue_logging)
+
+
+class TestLogs(TestCase):
+    """test the queued, structured and sampled logging"""
+
+    def tearDown(self):
+        disable_queue_logging()
+
+    def test_structured(self):
+        """The records are written as json by the listener"""
+        stream = io.StringIO()
+        enable_queue_logging(structured=True, stream=stream)
+        logger.info("Response OK from %s", "v1/sports",
+                    extra={'event': 'response_ok', 'request_id': 'abc-1', 'elapsed_ms': 1.5})
+        disable_queue_logging()
+
+        record = json.loads(stream.getvalue())
+        self.assertEqual(record['message'], "Response OK from v1/sports")
+        self.assertEqual(record['event'], 'response_ok')
+        self.assertEqual(record['request_id'], 'abc-1')
+        self.assertEqual(record['elapsed_ms'], 1.5)
+        self.assertEqual(record['level'], 'INFO')
+
+    def test_structured_exception(self):
+        """The traceback formatted before queueing is written in the json"""
+        stream = io.StringIO()
+        enable_queue_logging(structured=True, stream=stream)
+        try:
+            raise ValueError("bad odds")
+        except ValueError:
+            logger.exception("Parsing failed")
+        disable_queue_logging()
+
+        record = json.loads(stream.getvalue())
+        self.assertEqual(record['message'], "Parsing failed")
+        self.assertIn("ValueError: bad odds", record['exception'])
+
+    def test_sampling(self):
+        """Only every Nth record of sampled events is written"""
+        stream = io.StringIO()
+        enable_queue_logging(structured=True, sample={'response_ok': 10}, stream=stream)
+        for _ in range(25):
+            logger.info("Response OK", extra={'event': 'response_ok'})
+        logger.info("Not sampled")
+        disable_queue_logging()
+
+        self.assertEqual(len(stream.getvalue().splitlines()), 4)
+
+    def test_restores_handlers(self):
+        """Disabling the pipeline returns the original handlers"""
+        handlers = list(logger.handlers)
+        enable_queue_logging()
+        self.assertNotEqual(logger.handlers, handlers)
+        disable_queue_logging()
+        self.assertEqual(logger.handlers, handlers)
+
+    def test_full_queue_drops(self):
+        """A full queue drops records instead of blocking"""
+        handler = NonBlockingQueueHandler(queue.Queue(maxsize=1))
+        record = logging.LogRecord('veikkaaja', logging.INFO, __file__, 0, "msg", (), None)
+        handler.handle(record)
+        handler.handle(record)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_colored_events(self):
+        """The human readable format colors request events"""
+        formatter = NiceFormatter(fmt="%(current_time)s | %(message)s")
+        record = logging.LogRecord('veikkaaja', logging.INFO, __file__, 0, "Sending", (), None)
+        self.assertNotIn("\033[", formatter.format(record))
+        record.event = 'sending'
+        self.assertTrue(formatter.format(record).startswith("\033[93m"))
+
+    def test_sampling_filter(self):
+        """Records without an event pass the filter"""
+        sampler = SamplingFilter({'response_ok': 2})
+        record = logging.LogRecord('veikkaaja', logging.INFO, __file__, 0, "msg", (), None)
+        self.assertTrue(all(sampler.filter(record) for _ in range(3)))
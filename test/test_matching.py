@@ -0,0 +1,86 @@
+"""Test matching team names"""
+import json
+from unittest import TestCase
+
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.matching import TeamMatcher, normalize
+from veikkaaja.veikkaus_client import EBETType, GameTypes
+
+from .fixtures import saved_responses
+from .mock_client import MockClient
+
+
+class TestTeamMatcher(TestCase):
+    """test the trigram index"""
+
+    def setUp(self):
+        self.games = MockClient().upcoming_events(GameTypes.EBET)
+        self.matcher = TeamMatcher()
+        self.matcher.add_games(self.games)
+
+    def test_match_markets_only(self):
+        """Only the teams of the 1X2 and 12 markets are added"""
+        teams = {
+            normalize(name)
+            for game in self.games if game.draw_type in (EBETType.ONE_X_TWO, EBETType.ONE_TWO)
+            for name in (game.home_team, game.away_team)
+        }
+        self.assertEqual({normalize(name) for name in self.matcher.names}, teams)
+        over_under = next(game for game in self.games
+                          if game.draw_type == EBETType.OVER_UNDER)
+        match = self.matcher.best(over_under.competitor_names[0])
+        self.assertTrue(match is None or match.score < 1.0)
+        twelve = next(game for game in self.games if game.draw_type == EBETType.ONE_TWO)
+        self.assertEqual(self.matcher.best(twelve.competitor_names[1]).score, 1.0)
+
+    def test_away_teams(self):
+        """The away teams of the 1X2 markets are added, the draw is not"""
+        game = next(game for game in self.games if game.away_team == "Stranraer")
+        self.assertEqual(game.draw_type, EBETType.ONE_X_TWO)
+        match = self.matcher.best("Stranraer")
+        self.assertEqual(match.score, 1.0)
+        self.assertIn(game.event_id, match.keys)
+        self.assertNotIn(normalize("Tasapeli"), {normalize(name) for name in self.matcher.names})
+
+    def test_normalize(self):
+        """Case, accents and punctuation do not matter"""
+        self.assertEqual(normalize("  Atlético-Madrid "), "atletico madrid")
+        self.assertEqual(normalize("KuPS"), normalize("kups"))
+
+    def test_abbreviated_name(self):
+        """The abbreviated Veikkaus name is the best match"""
+        game = next(game for game in self.games if game.home_team == "Edinburgh C")
+        match = self.matcher.best("Edinburgh City")
+        self.assertEqual(match.name, "Edinburgh C")
+        self.assertIn(game.event_id, match.keys)
+
+    def test_exact_names(self):
+        """Every added name matches itself"""
+        matches = [game for game in self.games
+                   if game.draw_type in (EBETType.ONE_X_TWO, EBETType.ONE_TWO)]
+        for game in matches[:50]:
+            match = self.matcher.best(game.home_team.upper())
+            self.assertEqual(normalize(match.name), normalize(game.home_team))
+            self.assertEqual(match.score, 1.0)
+
+    def test_top_k(self):
+        """At most k matches, best first"""
+        matches = self.matcher.query("Edinburgh City", k=3, min_score=0.0)
+        self.assertLessEqual(len(matches), 3)
+        self.assertEqual(matches, sorted(matches, key=lambda match: -match.score))
+        self.assertEqual(self.matcher.query("", k=3), [])
+        self.assertIsNone(self.matcher.best("qqqqqq"))
+
+    def test_incremental(self):
+        """Names added later are found, duplicates are merged"""
+        size = len(self.matcher)
+        tournament = json.loads(saved_responses()[EndPoint.sport_tournament_info_endpoint(
+            1, 2, 1).endpoint])
+        self.matcher.add_teams(tournament)
+        self.matcher.add_teams(tournament)
+        self.assertGreater(len(self.matcher), size)
+
+        team = tournament['teams'][0]
+        match = self.matcher.best(team['name'])
+        self.assertEqual(match.score, 1.0)
+        self.assertIn(team['id'], match.keys)
@@ -0,0 +1,73 @@
+"""Test the precompiled wager payloads"""
+import json
+from unittest import TestCase
+
+from veikkaaja.payload import EbetPayloadBuilder
+from veikkaaja.veikkaus_client import (BetDecision, BetTarget, EBETType, GameTypes,
+                                       VeikkausClient)
+
+from .mock_client import MockClient
+
+
+class TestPayloadBuilder(TestCase):
+    """test that the builder matches VeikkausClient.ebet_payload"""
+
+    def setUp(self):
+        client = MockClient()
+        games = client.upcoming_events(GameTypes.EBET)
+        self.games = [game for game in games if game.draw_type == EBETType.ONE_X_TWO][:3]
+        self.bets = [
+            BetDecision(BetTarget.HOME, 100),
+            BetDecision(BetTarget.X, 250),
+            BetDecision(BetTarget.AWAY, 30)
+        ]
+
+    def test_matches_ebet_payload(self):
+        """The serialized wager has the same content as the dict payload"""
+        wager = EbetPayloadBuilder().build_bets(self.games, self.bets)
+
+        body = json.loads(wager.body)
+        self.assertEqual(body.pop('requestId'), wager.request_id)
+        self.assertEqual(body, VeikkausClient.ebet_payload(self.games, self.bets))
+        self.assertEqual(wager.price, 380)
+        self.assertEqual(wager.size, 3)
+
+    def test_request_id(self):
+        """Every wager gets a new idempotency key unless one is given"""
+        builder = EbetPayloadBuilder()
+        first = builder.build_bets(self.games, self.bets)
+        second = builder.build_bets(self.games, self.bets)
+        self.assertNotEqual(first.request_id, second.request_id)
+
+        given = builder.build_selections([("6752", 1, 100)], request_id="retry-1")
+        self.assertEqual(json.loads(given.body)['requestId'], "retry-1")
+        self.assertEqual(json.loads(given.body)['boards'][0]['selections'][0], {
+            "listIndex": "6752",
+            "competitors": [1],
+            "stake": 100
+        })
+
+    def test_mismatching_arrays(self):
+        """Selection arrays have to line up"""
+        with self.assertRaises(ValueError):
+            EbetPayloadBuilder().build(["1", "2"], [BetTarget.HOME], [100])
+
+    def test_stakes_in_cents(self):
+        """Fractional stakes are not truncated silently"""
+        with self.assertRaises(TypeError):
+            EbetPayloadBuilder().build(["1"], [BetTarget.HOME], [1.5])
+
+    def test_bounded_encoding_cache(self):
+        """The encoded list indices do not grow without bound"""
+        builder = EbetPayloadBuilder()
+        builder.MAX_ENCODED = 10
+        for list_index in range(25):
+            builder.build([str(list_index)], [BetTarget.HOME], [100])
+        self.assertLessEqual(len(builder._encoded_indices), 10)  # pylint: disable=protected-access
+        wager = builder.build(["24"], [BetTarget.HOME], [100])
+        self.assertEqual(json.loads(wager.body)['boards'][0]['selections'][0]['listIndex'], "24")
+
+    def test_place_bets(self):
+        """The bulk wager is accepted by the (mocked) test endpoint"""
+        client = MockClient()
+        self.assertTrue(client.place_bets(self.games, self.bets, test=True))
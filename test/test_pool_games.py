@@ -0,0 +1,119 @@
+"""Test the Vakio and Moniveto system bets"""
+import itertools
+import json
+from unittest import TestCase
+
+from veikkaaja.pool_games import SystemBet, parse_pool_draws, pool_payload
+from veikkaaja.types import GameTypes
+
+
+def pool_draws(game_type: GameTypes, matches: int):
+    """A draw response with the given number of matches"""
+    return [{
+        "gameName": game_type.value,
+        "listIndex": "1",
+        "id": "52210",
+        "name": "Vakio",
+        "status": "OPEN",
+        "closeTime": 1636804800000,
+        "gameRuleSet": {
+            "basePrice": 10,
+            "stakeInterval": 5,
+            "minStake": 10,
+            "maxStake": 100000
+        },
+        "rows": [{
+            "id": str(index + 1),
+            "status": "OPEN",
+            "eventId": str(101149600 + index),
+            "sportId": "1",
+            "competitors": [{
+                "id": "1",
+                "name": f"Home {index}"
+            }, {
+                "id": "2",
+                "name": f"Away {index}"
+            }]
+        } for index in range(matches)]
+    }]
+
+
+class TestPoolGames(TestCase):
+    """test parsing, expanding and pricing the systems"""
+
+    def test_parse(self):
+        """The matches of the draw are parsed in order"""
+        draw = parse_pool_draws(pool_draws(GameTypes.SPORT, 13), GameTypes.SPORT)[0]
+        self.assertEqual(len(draw.rows), 13)
+        self.assertEqual(draw.rows[2].number, 3)
+        self.assertEqual(draw.rows[2].home_team, "Home 2")
+        self.assertEqual(draw.min_stake, 10)
+
+    def test_full_system(self):
+        """A full system plays every combination"""
+        system = SystemBet.sport(["1", "1X", "X2", "12X"] + ["1"] * 9)
+        self.assertEqual(system.row_count(), 12)
+        self.assertEqual(system.price(25), 300)
+
+        rows = [system.decode(packed) for packed in system.rows()]
+        expected = list(
+            itertools.product(["1"], ["1", "X"], ["X", "2"], ["1", "X", "2"], *[["1"]] * 9))
+        self.assertEqual(sorted(rows), sorted(expected))
+
+    def test_reduced_system(self):
+        """A reduced system plays only the rows within the limits"""
+        selections = ["1X2"] * 8
+        limits = {"1": (3, 5), "X": (0, 2)}
+        system = SystemBet.sport(selections, limits=limits)
+
+        expected = [
+            row for row in itertools.product("1X2", repeat=8)
+            if 3 <= row.count("1") <= 5 and row.count("X") <= 2
+        ]
+        rows = [system.decode(packed) for packed in system.rows()]
+        self.assertEqual(sorted(rows), sorted(expected))
+        self.assertEqual(system.row_count(), len(expected))
+
+    def test_win_probability(self):
+        """The probability of a correct row is summed over the played rows"""
+        probabilities = [{"1": 0.5, "X": 0.3, "2": 0.2}] * 4
+        system = SystemBet.sport(["1X", "1", "12", "X2"], limits={"1": (2, 2)})
+
+        expected = 0.0
+        for packed in system.rows():
+            probability = 1.0
+            for match, outcome in enumerate(system.decode(packed)):
+                probability *= probabilities[match][outcome]
+            expected += probability
+        self.assertAlmostEqual(system.win_probability(probabilities), expected)
+
+    def test_multiscore(self):
+        """Moniveto systems pick the goals of both teams"""
+        system = SystemBet.multiscore([([0, 1], [1]), ([2], [0, 1, 2])])
+        self.assertEqual(system.row_count(), 6)
+
+        reduced = SystemBet.multiscore([([0, 1], [1]), ([2], [0, 1, 2])], limits={"X": (0, 0)})
+        self.assertEqual(reduced.row_count(), 2)
+
+        draw = parse_pool_draws(pool_draws(GameTypes.MULTISCORE, 2), GameTypes.MULTISCORE)[0]
+        payload = json.loads(pool_payload(draw, system, 20))
+        self.assertEqual(payload['price'], 120)
+        self.assertEqual(payload['boards'][0]['selections'][0], {
+            "homeScores": [0, 1],
+            "awayScores": [1]
+        })
+
+    def test_payload(self):
+        """Full systems are sent as one board, reduced ones as a board per row"""
+        draw = parse_pool_draws(pool_draws(GameTypes.SPORT, 3), GameTypes.SPORT)[0]
+
+        payload = json.loads(pool_payload(draw, SystemBet.sport(["1", "1X", "12X"]), 10))
+        self.assertEqual(payload['gameName'], "SPORT")
+        self.assertEqual(payload['price'], 60)
+        self.assertEqual(len(payload['boards']), 1)
+        self.assertEqual(payload['boards'][0]['selections'][2], {"outcomes": ["1", "X", "2"]})
+
+        reduced = SystemBet.sport(["1", "1X", "12X"], limits={"1": (2, 2)})
+        payload = json.loads(pool_payload(draw, reduced, 10))
+        self.assertEqual(len(payload['boards']), reduced.row_count())
+        self.assertEqual(payload['price'], 10 * reduced.row_count())
@@ -0,0 +1,74 @@
+"""Test sizing the stakes of simultaneous bets"""
+from unittest import TestCase
+
+from veikkaaja.portfolio import expected_growth, heuristic_kelly, market_kelly
+from veikkaaja.veikkaus_client import BetTarget, EBETType, GameTypes
+
+from .mock_client import MockClient
+
+
+class TestPortfolio(TestCase):
+    """test the Kelly stakes"""
+
+    def setUp(self):
+        games = MockClient().upcoming_events(GameTypes.EBET)
+        self.games = [game for game in games if game.draw_type == EBETType.ONE_X_TWO]
+
+    def test_single_outcome(self):
+        """A single outcome gets the classic Kelly stake"""
+        fractions = market_kelly([0.6, 0.4], [2.0, 1.5])
+        self.assertAlmostEqual(fractions[0], 0.2)
+        self.assertEqual(fractions[1], 0.0)
+
+    def test_exclusive_outcomes(self):
+        """The exclusive outcomes maximize the expected growth"""
+        probabilities, odds = [0.5, 0.3, 0.2], [2.2, 3.6, 3.4]
+        fractions = market_kelly(probabilities, odds)
+        self.assertTrue(all(fraction >= 0 for fraction in fractions))
+        best = expected_growth(probabilities, odds, fractions)
+        for index in range(3):
+            for delta in (-0.01, 0.01):
+                moved = list(fractions)
+                moved[index] = max(0.0, moved[index] + delta)
+                self.assertLessEqual(expected_growth(probabilities, odds, moved), best + 1e-12)
+
+    def test_no_edge(self):
+        """No bets without an edge"""
+        self.assertEqual(market_kelly([0.4, 0.3, 0.3], [2.0, 3.0, 3.0]), [0.0, 0.0, 0.0])
+
+    def test_heuristic_kelly(self):
+        """The stakes obey the bankroll and the draw rules"""
+        # the model thinks the home teams are 10% more likely than the odds say
+        probabilities = [{
+            BetTarget.HOME: min(0.95, 110 / game.home_odds),
+            BetTarget.X: 0.0,
+            BetTarget.AWAY: 0.0
+        } for game in self.games]
+
+        portfolio = heuristic_kelly(self.games, probabilities, bankroll=1000.0, max_exposure=0.5)
+        self.assertGreater(len(portfolio.bets), 0)
+        self.assertLessEqual(portfolio.exposure, 50000)
+        self.assertEqual(portfolio.exposure, sum(bet.amount for bet in portfolio.bets))
+        for game, bet in zip(portfolio.games, portfolio.bets):
+            rules = game.draw.rule_set
+            self.assertEqual(bet.target, BetTarget.HOME)
+            self.assertGreaterEqual(bet.amount, rules.min_stake)
+            self.assertLessEqual(bet.amount, rules.max_stake)
+            self.assertEqual(bet.amount % rules.stake_interval, 0)
+
+    def test_one_market_per_event(self):
+        """Only one market of the same event is bet"""
+        game = self.games[0]
+        probabilities = [{BetTarget.HOME: 0.9}, {BetTarget.AWAY: 0.9}]
+        portfolio = heuristic_kelly([game, game], probabilities, bankroll=100.0, kelly_fraction=0.1)
+        self.assertEqual(len(portfolio.bets), 1)
+
+    def test_excluded_events(self):
+        """The markets of events excluded by each other are not bet together"""
+        first, second, third = self.games[:3]
+        first.excluded_events = (str(second.event_id),)
+        probabilities = [{BetTarget.HOME: 0.9}] * 3
+        portfolio = heuristic_kelly([first, second, third], probabilities, bankroll=100.0,
+                                    kelly_fraction=0.1)
+        self.assertEqual(len(portfolio.bets), 2)
+        self.assertIn(third, portfolio.games)
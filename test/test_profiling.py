@@ -0,0 +1,69 @@
+"""Test profiling the client methods"""
+import logging
+import pstats
+import tempfile
+import tracemalloc
+from pathlib import Path
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.profiling import Profiler
+from veikkaaja.veikkaus_client import GameTypes, VeikkausClient
+
+from .mock_client import MockClient
+
+
+class TestProfiler(TestCase):
+    """test the reports of the Profiler"""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.directory = Path(self._directory.name)
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+        self._directory.cleanup()
+
+    def test_reports(self):
+        """the methods are timed and sampled, the reports are written"""
+        original = VeikkausClient.upcoming_events
+        client = MockClient()
+        with Profiler(self.directory, interval=0.0005, deterministic=True) as profiler:
+            self.assertIsNot(VeikkausClient.upcoming_events, original)
+            for _ in range(10):
+                client.upcoming_events(GameTypes.EBET)
+
+        self.assertIs(VeikkausClient.upcoming_events, original)
+        self.assertFalse(tracemalloc.is_tracing())
+
+        self.assertEqual(profiler.methods['upcoming_events'].calls, 10)
+        self.assertEqual(profiler.methods['parse_draws'].calls, 10)
+        self.assertGreater(profiler.methods['upcoming_events'].samples, 0)
+        self.assertGreater(profiler.methods['upcoming_events'].seconds,
+                           profiler.methods['parse_draws'].seconds)
+
+        report = profiler.report_directory
+        methods = (report / "methods.txt").read_text(encoding='utf-8')
+        self.assertIn("upcoming_events", methods)
+        self.assertIn("parse_draws", methods)
+
+        folded = (report / "cpu.folded").read_text(encoding='utf-8').splitlines()
+        self.assertTrue(folded)
+        stack, count = folded[0].rsplit(" ", 1)
+        self.assertIn("veikkaus_client:upcoming_events", stack)
+        self.assertGreater(int(count), 0)
+
+        self.assertTrue((report / "memory.txt").read_text(encoding='utf-8'))
+        stats = pstats.Stats(str(report / "cpu.pstats"))
+        self.assertTrue(stats.total_calls)
+
+    def test_single_profiler(self):
+        """the client methods are wrapped by one profiler at a time"""
+        with Profiler(self.directory, memory=False):
+            with self.assertRaises(RuntimeError):
+                Profiler(self.directory).start()
+        with Profiler(self.directory, memory=False) as profiler:
+            pass
+        self.assertFalse((profiler.report_directory / "memory.txt").exists())
@@ -0,0 +1,101 @@
+"""Test recording requests and responses to an archive"""
+import json
+import tempfile
+from datetime import timedelta
+from pathlib import Path
+from unittest import TestCase
+
+import requests
+
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.recorder import ArchiveReader, ArchiveRecorder
+
+from .fixtures import API_RESPONSES
+
+
+def saved_response(endpoint: EndPoint, method="GET", payload=None) -> requests.Response:
+    """A response built from the saved API responses"""
+    response = requests.Response()
+    response.status_code = 200
+    response._content = (API_RESPONSES /  # pylint: disable=protected-access
+                         (endpoint.endpoint.replace('/', '.') + '.json')).read_bytes()
+    response.elapsed = timedelta(milliseconds=20)
+    if method == "GET":
+        response.request = requests.Request(method, endpoint.url, params=payload).prepare()
+    else:
+        response.request = requests.Request(method, endpoint.url, json=payload).prepare()
+    return response
+
+
+class TestRecorder(TestCase):
+    """test writing and reading back the archive"""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.directory = Path(self._directory.name)
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_round_trip(self):
+        """Every recorded pair can be read back"""
+        recorder = ArchiveRecorder(self.directory, frame_records=2)
+        sports = EndPoint.sport_type_code_endpoint()
+        draws = EndPoint.games_info_endpoint()
+        wager = EndPoint.place_wager_test_endpoint()
+
+        recorder.record(sports, saved_response(sports, payload={'lang': 'fi'}))
+        recorder.record(draws, saved_response(draws, payload={'game-names': 'EBET'}))
+        recorder.record(wager, saved_response(wager, "POST", payload={'price': 100}))
+        recorder.close()
+
+        reader = ArchiveReader(self.directory)
+        records = list(reader.records())
+        self.assertEqual(len(records), 3)
+        self.assertEqual(len(reader.index(reader.segments()[0])), 2)
+
+        self.assertEqual(records[0].url, sports.url + "?lang=fi")
+        self.assertEqual(len(records[1].json()), 360)
+        self.assertEqual(records[2].method, "POST")
+        self.assertEqual(json.loads(records[2].request_body), {'price': 100})
+
+        only_draws = list(reader.records(endpoint="sport-open-games"))
+        self.assertEqual([record.endpoint for record in only_draws], [draws.endpoint])
+        self.assertEqual(reader.latest("v1/sports").status, 200)
+        self.assertEqual(list(reader.records(start=records[2].timestamp + 10)), [])
+
+    def test_rolling_segments(self):
+        """A new segment is started once the previous is full"""
+        recorder = ArchiveRecorder(self.directory, segment_size=1, frame_records=1)
+        sports = EndPoint.sport_type_code_endpoint()
+        for _ in range(3):
+            recorder.record(sports, saved_response(sports))
+        recorder.close()
+
+        reader = ArchiveReader(self.directory)
+        self.assertEqual(len(reader.segments()), 3)
+        self.assertEqual(len(list(reader.records())), 3)
+
+    def test_decoded_by_writer(self):
+        """The recording thread does not decode the response body"""
+
+        class UndecodedResponse(requests.Response):
+            """A response failing the decoding on the caller thread"""
+
+            @property
+            def text(self):
+                raise AssertionError("decoded on the caller thread")
+
+        sports = EndPoint.sport_type_code_endpoint()
+        response = UndecodedResponse()
+        response.__dict__.update(saved_response(sports).__dict__)
+        response._content = '{"name": "Jääkiekko"}'.encode('latin-1')  # pylint: disable=protected-access
+        response.encoding = 'latin-1'
+
+        recorder = ArchiveRecorder(self.directory)
+        recorder.record(sports, response)
+        recorder.close()
+
+        records = list(ArchiveReader(self.directory).records())
+        self.assertEqual(recorder.dropped, 0)
+        self.assertEqual(records[0].json(), {'name': 'Jääkiekko'})
@@ -0,0 +1,129 @@
+"""Test firing bets before the close time"""
+import json
+import logging
+import threading
+import time
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.scheduler import BetScheduler, FireStatus
+from veikkaaja.veikkaus_client import BetDecision, BetTarget, EBETType, parse_ebet_draws
+
+from .fixtures import saved_responses
+from .mock_client import MockClient
+
+
+def closing_games(seconds: float, odds_change: int = 0):
+    """The saved draws, closing in 'seconds'"""
+    draws = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])[:20]
+    close_time = int((time.time() + seconds) * 1000)
+    for draw in draws:
+        draw['closeTime'] = close_time
+        for row in draw['rows']:
+            for comp in row['competitors']:
+                comp['odds']['odds'] += odds_change
+    return [game for game in parse_ebet_draws(draws) if game.draw_type == EBETType.ONE_X_TWO]
+
+
+class CountingClient(MockClient):
+    """Count the wagers and keep-alive requests"""
+
+    def __init__(self):
+        super().__init__()
+        self.wagers = []
+        self.keep_alives = 0
+
+    def send_wager(self, wager, test=True):
+        self.wagers.append(wager)
+        return super().send_wager(wager, test)
+
+    def keep_alive(self):
+        self.keep_alives += 1
+        return super().keep_alive()
+
+
+class TestBetScheduler(TestCase):
+    """test the timer loop"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.client = CountingClient()
+        self.bet = BetDecision(BetTarget.HOME, 100)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_fire_on_time(self):
+        """The prebuilt wager is sent at close time - lead"""
+        game = closing_games(0.3)[0]
+        done = threading.Event()
+        with BetScheduler(self.client, lead=0.2, on_fired=lambda fired: done.set()) as scheduler:
+            scheduled = scheduler.schedule(game, self.bet)
+            self.assertEqual(scheduler.pending(), 1)
+            self.assertTrue(done.wait(2.0))
+
+        fired = scheduler.fired[0]
+        self.assertEqual(fired.status, FireStatus.SENT)
+        self.assertEqual(self.client.wagers, [scheduled.wager])
+        self.assertGreaterEqual(time.time(), scheduled.fire_at)
+        self.assertLess(fired.lag_ms, 50)
+        self.assertEqual(fired.odds, game.home_odds)
+        self.assertEqual(scheduler.pending(), 0)
+
+    def test_odds_dropped(self):
+        """The bet is not sent if the odds in the latest snapshot dropped"""
+        game = closing_games(0.2)[0]
+        with BetScheduler(self.client, lead=0.1) as scheduler:
+            scheduler.schedule(game, self.bet)
+            scheduler.update_snapshot(closing_games(0.2, odds_change=-5))
+            time.sleep(0.3)
+
+        self.assertEqual(scheduler.fired[0].status, FireStatus.ODDS_DROPPED)
+        self.assertEqual(self.client.wagers, [])
+
+    def test_closed_and_cancelled(self):
+        """Bets on closed games and cancelled bets are not sent"""
+        closed, cancelled = closing_games(-1.0)[:2]
+        with BetScheduler(self.client, lead=0.0) as scheduler:
+            scheduled = scheduler.schedule(cancelled, self.bet, lead=-10.0)
+            self.assertTrue(scheduler.cancel(scheduled))
+            scheduler.schedule(closed, self.bet)
+            time.sleep(0.1)
+            self.assertFalse(scheduler.cancel(scheduled))
+
+        self.assertEqual([fired.status for fired in scheduler.fired], [FireStatus.CLOSED])
+        self.assertEqual(self.client.wagers, [])
+
+    def test_warm_connection(self):
+        """The session is kept open while bets are waiting"""
+        game = closing_games(0.5)[0]
+        with BetScheduler(self.client, lead=0.1, keepalive=0.1, warmup=None) as scheduler:
+            scheduler.schedule(game, self.bet)
+            time.sleep(0.5)
+        self.assertGreaterEqual(self.client.keep_alives, 2)
+        self.assertEqual(scheduler.fired[0].status, FireStatus.SENT)
+
+    def test_failed_send(self):
+        """A wager raising is FAILED and the later bets still fire"""
+
+        class FailingClient(CountingClient):
+            """Raise on the first wager"""
+
+            def send_wager(self, wager, test=True):
+                if not self.wagers:
+                    self.wagers.append(wager)
+                    raise ConnectionError("connection reset")
+                return super().send_wager(wager, test)
+
+        client = FailingClient()
+        first, second = closing_games(0.2)[:2]
+        with BetScheduler(client, lead=0.1) as scheduler:
+            scheduler.schedule(first, self.bet)
+            scheduler.schedule(second, self.bet, lead=0.05)
+            time.sleep(0.3)
+
+        self.assertEqual([fired.status for fired in scheduler.fired],
+                         [FireStatus.FAILED, FireStatus.SENT])
+        self.assertEqual(len(client.wagers), 2)
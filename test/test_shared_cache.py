@@ -0,0 +1,103 @@
+"""Test sharing the responses between processes"""
+import logging
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.shared_cache import SharedCache
+from veikkaaja.veikkaus_client import GameTypes, VeikkausClient
+
+from .stand_in_server import StandInServer
+
+
+def slow_count(cache_path: str, counter_path: str) -> int:
+    """Count the computations in a file, in a worker process"""
+
+    def compute():
+        with open(counter_path, 'a', encoding='utf-8') as counter:
+            counter.write("x")
+        time.sleep(0.2)
+        return 42
+
+    return SharedCache(cache_path).get_or_compute("answer", compute)
+
+
+class TestSharedCache(TestCase):
+    """test the single-flight cache"""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.directory = Path(self._directory.name)
+        self.path = self.directory / "cache.sqlite"
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+        self._directory.cleanup()
+
+    def test_threads(self):
+        """Concurrent callers compute the value once"""
+        cache = SharedCache(self.path)
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return {'value': 1}
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_compute("key", compute)))
+            for _ in range(8)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'value': 1}] * 8)
+
+    def test_processes(self):
+        """Concurrent processes compute the value once"""
+        counter = self.directory / "counter"
+        counter.write_text("", encoding='utf-8')
+        SharedCache(self.path)
+        with ProcessPoolExecutor(max_workers=4) as executor:
+            results = list(
+                executor.map(slow_count, [str(self.path)] * 4, [str(counter)] * 4))
+        self.assertEqual(results, [42] * 4)
+        self.assertEqual(counter.read_text(encoding='utf-8'), "x")
+
+    def test_freshness(self):
+        """Stale values, failures and errors are computed again"""
+        cache = SharedCache(self.path, ttl=0.05)
+        self.assertEqual(cache.get_or_compute("key", lambda: 1), 1)
+        self.assertEqual(cache.get_or_compute("key", lambda: 2), 1)
+        time.sleep(0.06)
+        self.assertEqual(cache.get_or_compute("key", lambda: 3), 3)
+
+        self.assertIsNone(cache.get_or_compute("missing", lambda: None))
+        self.assertEqual(cache.get_or_compute("missing", lambda: 4), 4)
+
+        with self.assertRaises(ZeroDivisionError):
+            cache.get_or_compute("error", lambda: 1 / 0)
+        self.assertEqual(cache.get_or_compute("error", lambda: 5), 5)
+
+    def test_clients(self):
+        """The clients share the public responses, not the account"""
+        cache = SharedCache(self.path, ttl=60.0)
+        with StandInServer() as server, server.api_root():
+            clients = [VeikkausClient("stand-in", "stand-in", cache=cache) for _ in range(3)]
+            logins = server.requests
+            games = [client.upcoming_events(GameTypes.EBET) for client in clients]
+            self.assertEqual(server.requests, logins + 1)
+            self.assertEqual([len(client_games) for client_games in games], [360] * 3)
+
+            for client in clients:
+                self.assertEqual(client.get_balance(), 1.62)
+            self.assertEqual(server.requests, logins + 1 + 3)
@@ -0,0 +1,121 @@
+"""Test the paper trading client"""
+import copy
+import json
+import logging
+from datetime import timedelta
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.ledger import AccountLedger
+from veikkaaja.responses import MarketResult, TransActionType
+from veikkaaja.simulated_client import SimulatedVeikkausClient
+from veikkaaja.veikkaus_client import BetDecision, BetTarget, GameTypes, parse_ebet_draws
+
+from .fixtures import saved_responses
+
+
+class TestSimulatedClient(TestCase):
+    """test accepting and settling the simulated wagers"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        draws = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])
+        games = parse_ebet_draws(draws)
+        self.before = games[0].close_time - timedelta(hours=1)
+        self.after = games[-1].close_time + timedelta(hours=1)
+        # the home competitor wins every market
+        self.results = [
+            MarketResult(int(game.row_id), int(game.market_id), (1, ), False) for game in games
+        ]
+        self.client = SimulatedVeikkausClient([(self.before, games), (self.after, games)],
+                                              balance=10000)
+        self.games = self.client.upcoming_events(GameTypes.EBET)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_stake_rules(self):
+        """the wagers are checked against the rules of the draw"""
+        game = self.games[0]
+        self.assertTrue(self.client.place_bet(game, BetDecision(BetTarget.HOME, 100)))
+        # the test wagers do not change the balance
+        self.assertEqual(self.client.get_balance(), 100.0)
+
+        rules = game.draw.rule_set
+        for stake in (rules.min_stake - rules.stake_interval, rules.min_stake + 1,
+                      rules.max_stake + rules.stake_interval, 20000):
+            self.assertFalse(self.client.place_bet(game, BetDecision(BetTarget.HOME, stake)),
+                             stake)
+        self.assertFalse(self.client.place_bet(game, BetDecision(99, 100)))
+
+    def test_place_and_settle(self):
+        """the stake is taken when placed and the wins are paid after the close"""
+        game = self.games[0]
+        self.assertTrue(
+            self.client.place_bets(self.games[:2], [
+                BetDecision(BetTarget.HOME, 100),
+                BetDecision(BetTarget.AWAY, 200),
+            ], test=False))
+        self.assertEqual(self.client.balance, 10000 - 300)
+        self.assertEqual([wager.result for wager in self.client.get_betting_history()],
+                         [TransActionType.BUY])
+
+        # the results are not used before the close time
+        self.assertEqual(self.client.add_results(self.results), [])
+
+        # the draws are closed in the next snapshot
+        self.assertFalse(self.client.place_bet(self.client.upcoming_events(GameTypes.EBET)[0],
+                                               BetDecision(BetTarget.HOME, 100), test=False))
+        win = 100 * game.home_odds // 100
+        self.assertEqual([settled.payout for settled in self.client.settled], [win, 0])
+        self.assertEqual(self.client.balance, 10000 - 300 + win)
+        self.assertEqual([(wager.result, wager.amount)
+                          for wager in self.client.get_betting_history()],
+                         [(TransActionType.WIN, win), (TransActionType.BUY, -300)])
+        self.assertIn(self.results[0], self.client.closed_games(game.close_time.date()))
+
+    def test_repeated_request(self):
+        """a wager is placed once for its request id"""
+        wager = self.client.payload_builder.build_bets(self.games[:1],
+                                                       [BetDecision(BetTarget.HOME, 100)])
+        ledger = AccountLedger(self.client, reconcile_interval=None)
+        self.assertEqual(ledger.balance, 10000)
+        self.assertTrue(self.client.send_wager(wager, test=False))
+        self.assertTrue(self.client.send_wager(wager, test=False))
+        self.assertEqual(self.client.balance, 10000 - 100)
+        self.assertEqual(ledger.balance, 10000 - 100)
+
+    def test_draw_with_markets(self):
+        """the wagers do not tell the market, only the first market of a draw is bet"""
+        draw = json.loads(saved_responses()[EndPoint.games_info_endpoint().endpoint])[0]
+        handicap = copy.deepcopy(draw['rows'][0])
+        handicap['id'] = '2'
+        draw['rows'].append(handicap)
+        client = SimulatedVeikkausClient([(self.before, parse_ebet_draws([draw]))])
+        games = client.upcoming_events(GameTypes.EBET)
+        self.assertEqual(len(games), 2)
+        self.assertTrue(games[0].primary)
+        self.assertFalse(games[1].primary)
+        with self.assertRaises(ValueError):
+            client.place_bet(games[1], BetDecision(BetTarget.HOME, 100), test=False)
+        self.assertEqual(client.balance, 100000)
+        self.assertTrue(client.place_bet(games[0], BetDecision(BetTarget.HOME, 100),
+                                         test=False))
+        self.assertEqual(client.balance, 100000 - 100)
+
+    def test_many_bets(self):
+        """thousands of bets are placed and settled"""
+        client = SimulatedVeikkausClient([(self.before, self.games)], results=self.results,
+                                         balance=10**9)
+        games = client.upcoming_events(GameTypes.EBET)
+        bet = BetDecision(BetTarget.HOME, 100)
+        for _ in range(10):
+            for game in games:
+                self.assertTrue(client.place_bet(game, bet, test=False))
+        self.assertEqual(client.balance, 10**9 - 100 * 10 * len(games))
+        settled = client.settle(self.after)
+        self.assertEqual(len(settled), 10 * len(games))
+        self.assertEqual(client.balance,
+                         10**9 + sum(bet.payout for bet in settled) - 1000 * len(games))
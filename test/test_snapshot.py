@@ -0,0 +1,69 @@
+"""Test saving the games to a mapped snapshot"""
+import logging
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.snapshot import GameSnapshot, LiveGames, write_snapshot
+from veikkaaja.veikkaus_client import GameTypes
+
+from .mock_client import MockClient
+
+
+class TestSnapshot(TestCase):
+    """test writing and mapping the snapshots"""
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+        self.path = Path(self._directory.name) / "ebet.snapshot"
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.client = MockClient()
+        self.games = self.client.upcoming_events(GameTypes.EBET)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+        self._directory.cleanup()
+
+    def test_round_trip(self):
+        """the mapped games are equal to the saved games"""
+        self.games[0].league = "Valioliiga"
+        write_snapshot(self.path, self.games, created=1234.5)
+        with GameSnapshot(self.path) as snapshot:
+            self.assertEqual(snapshot.created, 1234.5)
+            self.assertEqual(len(snapshot), len(self.games))
+            for saved, mapped in zip(self.games, snapshot):
+                self.assertEqual(saved.draw, mapped.draw)
+                self.assertEqual(saved.odds, mapped.odds)
+                self.assertEqual(saved.competitor_ids, mapped.competitor_ids)
+                self.assertEqual(saved.competitor_names, mapped.competitor_names)
+                self.assertEqual(saved.home_odds, mapped.home_odds)
+                self.assertEqual(
+                    (saved.market_id, saved.event_id, saved.status, saved.sport_id,
+                     saved.draw_type, saved.league, saved.handicap, saved.excluded_events),
+                    (mapped.market_id, mapped.event_id, mapped.status, mapped.sport_id,
+                     mapped.draw_type, mapped.league, mapped.handicap, mapped.excluded_events))
+            self.assertIs(snapshot[0], snapshot[0])
+            self.assertEqual(snapshot[-1].row_id, self.games[-1].row_id)
+            self.assertEqual(len(snapshot.markets['draw']), len(self.games))
+
+    def test_not_a_snapshot(self):
+        """other files are rejected"""
+        self.path.write_bytes(b"{}" * 100)
+        with self.assertRaises(ValueError):
+            GameSnapshot(self.path)
+
+    def test_live_games(self):
+        """the snapshot is used until the refresh"""
+        live = LiveGames(self.client, self.path)
+        self.assertEqual(len(live.games), 0)
+        self.assertTrue(live.refresh())
+        self.assertEqual(len(live.games), len(self.games))
+        self.assertNotIsInstance(live.games, GameSnapshot)
+
+        restarted = LiveGames(self.client, self.path)
+        self.assertIsInstance(restarted.games, GameSnapshot)
+        self.assertEqual(len(restarted.games), len(self.games))
+        self.assertEqual(restarted.updated, live.updated)
+        self.assertEqual(restarted.games[0].list_index, self.games[0].list_index)
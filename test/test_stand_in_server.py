@@ -0,0 +1,59 @@
+"""Test the real client against the local stand-in server"""
+import logging
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.veikkaus_client import GameTypes, VeikkausClient
+
+from .load_test import fetch_games, percentile, run_load
+from .stand_in_server import StandInServer
+
+
+class TestStandInServer(TestCase):
+    """test serving the saved responses over HTTP"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_upcoming_events(self):
+        """The client logs in and parses the served draws"""
+        with StandInServer(scale=2) as server, server.api_root():
+            client = VeikkausClient("stand-in", "stand-in")
+            self.assertIsNotNone(client.session)
+            self.assertEqual(len(client.upcoming_events(GameTypes.EBET)), 720)
+            self.assertEqual(client.get_balance(), 1.62)
+
+    def test_errors_and_rate_limit(self):
+        """Failing and rate limited requests are reported as failures"""
+        with StandInServer(error_rate=1.0) as server, server.api_root():
+            client = VeikkausClient("stand-in", "stand-in")
+            self.assertIsNone(client.session)
+
+        with StandInServer(rate_limit=1) as server, server.api_root():
+            client = VeikkausClient("stand-in", "stand-in")
+            self.assertEqual(client.sport_types(), [])
+
+    def test_load(self):
+        """The load harness reports every request"""
+        with StandInServer(latency=0.002, jitter=0.001, seed=1) as server, server.api_root():
+            report = run_load(lambda: VeikkausClient("stand-in", "stand-in"),
+                              fetch_games,
+                              threads=3,
+                              requests=9)
+            self.assertEqual(server.requests, 3 + 9)
+
+        self.assertEqual(report.requests, 9)
+        self.assertEqual(report.errors, 0)
+        self.assertGreater(report.throughput, 0)
+        self.assertLessEqual(report.p50, report.p99)
+
+    def test_percentile(self):
+        """Nearest rank percentiles"""
+        values = [float(value) for value in range(1, 101)]
+        self.assertEqual(percentile(values, 0.5), 50.0)
+        self.assertEqual(percentile(values, 0.99), 99.0)
+        self.assertEqual(percentile([], 0.5), 0.0)
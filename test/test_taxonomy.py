@@ -0,0 +1,49 @@
+"""Test crawling the sports taxonomy"""
+import tempfile
+from pathlib import Path
+from unittest import TestCase
+
+from veikkaaja.taxonomy import Taxonomy, TaxonomyCrawler
+from veikkaaja.veikkaus_client import Game
+
+from .mock_client import MockClient
+
+
+class TestTaxonomy(TestCase):
+    """Crawl the saved responses for football in England"""
+
+    def setUp(self):
+        # the saved responses cover football, England, Valioliiga,
+        # 'responses' is not thread safe so use a single worker
+        self.taxonomy = TaxonomyCrawler(MockClient(), max_workers=1, sport_ids=[1]).crawl()
+
+    def test_crawl(self):
+        """The events of the saved tournament are indexed"""
+        self.assertEqual(len(self.taxonomy), 817)
+
+        league = self.taxonomy.league_of(99925698)
+        self.assertIsNotNone(league)
+        self.assertEqual(league.sport, "Jalkapallo")
+        self.assertEqual(league.category, "Englanti")
+        self.assertEqual(league.tournament, "Valioliiga")
+        self.assertIsNone(self.taxonomy.league_of("1"))
+
+    def test_enrich(self):
+        """Games of known events get their league filled"""
+        known, unknown = Game(None), Game(None)
+        known.event_id = "99925698"
+        unknown.event_id = "1"
+
+        self.assertEqual(self.taxonomy.enrich([known, unknown]), 1)
+        self.assertEqual(known.league, "Valioliiga")
+        self.assertEqual(unknown.league, "")
+
+    def test_snapshot(self):
+        """The taxonomy survives a round trip to disk"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / "taxonomy.json"
+            self.taxonomy.save(path)
+            loaded = Taxonomy.load(path)
+
+        self.assertEqual(loaded.events, self.taxonomy.events)
+        self.assertEqual(loaded.crawled_at, self.taxonomy.crawled_at)
@@ -0,0 +1,164 @@
+"""Test following the placed wagers"""
+import logging
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+from unittest import TestCase
+
+from veikkaaja import logger
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.responses import TransActionType, Wager
+from veikkaaja.tickets import TicketMonitor, TicketOutcome
+from veikkaaja.veikkaus_client import BetDecision, BetTarget, Draw, GameTypes
+
+from .mock_client import MockClient
+
+
+class HistoryClient(MockClient):
+    """Serve a set history and ticket details, accept the real wagers"""
+
+    def __init__(self):
+        super().__init__()
+        self.history = []
+        self.details = {}
+        self.requests = []
+
+    def _access_endpoint(self, endpoint, payload=None, method="GET"):
+        self.requests.append(endpoint.endpoint)
+        if endpoint is EndPoint.place_wager_endpoint():
+            # the real endpoint answers like the test endpoint
+            endpoint = EndPoint.place_wager_test_endpoint()
+        return super()._access_endpoint(endpoint, payload, method)
+
+    def get_betting_history(self, maximum_results=50, sort_by='TXDATE'):
+        self.requests.append("history")
+        return list(self.history)
+
+    def get_bet_event_information(self, event):
+        self.requests.append(f"details {event}")
+        return self.details.get(event, {})
+
+
+def transaction(number: int, result: TransActionType, amount: int, at: datetime):
+    """A transaction of the ticket 'number'"""
+    return Wager(result=result,
+                 amount=amount,
+                 accounting_date=at,
+                 external_id=str(number),
+                 id=len(str(number)) + amount,
+                 product=GameTypes.EBET)
+
+
+class TestTicketMonitor(TestCase):
+    """test the batched checks of the open tickets"""
+
+    def setUp(self):
+        self.level = logger.level
+        logger.setLevel(logging.CRITICAL)
+        self.client = HistoryClient()
+        self.settled = []
+        self.monitor = TicketMonitor(self.client, on_settled=self.settled.append,
+                                     min_interval=60.0, max_interval=600.0)
+        self.placed = datetime(2021, 11, 12, 18, 0)
+        self.results = self.placed + timedelta(hours=3)
+
+    def tearDown(self):
+        logger.setLevel(self.level)
+
+    def test_not_checked_before_results(self):
+        """the tickets are not checked before the results time"""
+        for number in range(100):
+            self.monitor.track(f"wager {number}", 100, [1], placed_at=self.placed,
+                               close_time=self.placed)
+        self.assertEqual(self.monitor.check(now=self.placed.timestamp()), [])
+        self.assertEqual(self.client.requests, [])
+        self.assertEqual(self.monitor.next_check(),
+                         (self.placed + timedelta(seconds=7200)).timestamp())
+
+    def test_batched_backoff(self):
+        """a check of many tickets is a single request, then the checks back off"""
+        self.monitor.observe([SimpleNamespace(draw=Draw(draw_id=1,
+                                                        results_available_time=self.results))])
+        for number in range(100):
+            self.monitor.track(f"wager {number}", 100, [1], placed_at=self.placed)
+
+        now = self.results.timestamp()
+        self.monitor.check(now)
+        self.assertEqual(self.client.requests, ["history"])
+        self.assertEqual(self.monitor.next_check(), now + 60.0)
+
+        self.monitor.check(now + 30.0)
+        self.assertEqual(len(self.client.requests), 1)
+        self.monitor.check(now + 60.0)
+        self.assertEqual(self.monitor.next_check(), now + 60.0 + 120.0)
+        self.assertEqual(len(self.client.requests), 2)
+
+        for _ in range(10):
+            now = self.monitor.next_check()
+            self.monitor.check(now)
+        self.assertEqual(self.monitor.next_check(), now + 600.0)
+
+    def test_settled_from_history(self):
+        """the purchases are linked to the tickets and the wins settle them"""
+        first = self.monitor.track("first", 100, [1], placed_at=self.placed,
+                                   close_time=self.placed)
+        second = self.monitor.track("second", 200, [1], placed_at=self.placed,
+                                    close_time=self.placed)
+        self.client.history = [
+            transaction(11, TransActionType.BUY, -100, self.placed + timedelta(seconds=1)),
+            transaction(12, TransActionType.BUY, -200, self.placed + timedelta(seconds=1)),
+            transaction(11, TransActionType.WIN, 250, self.results),
+        ]
+        events = self.monitor.check(now=self.results.timestamp() + 7200)
+        self.assertEqual(first.external_id, "11")
+        self.assertEqual(second.external_id, "12")
+        self.assertEqual([(event.ticket, event.outcome, event.amount) for event in events],
+                         [(first, TicketOutcome.WON, 250)])
+        self.assertEqual(events, self.settled)
+        self.assertEqual(self.monitor.open_tickets, [second])
+
+        # the ticket not settled by the history is settled from its details
+        self.assertIn("details 12", self.client.requests)
+        self.client.details["12"] = {'status': "LOST"}
+        events = self.monitor.check(now=self.monitor.next_check())
+        self.assertEqual([event.outcome for event in events], [TicketOutcome.LOST])
+        self.assertEqual(self.monitor.open_tickets, [])
+        self.assertIsNone(self.monitor.next_check())
+
+    def test_older_purchase_not_linked(self):
+        """a purchase made long before the ticket was placed is not its purchase"""
+        ticket = self.monitor.track("new", 200, [1], placed_at=self.placed,
+                                    close_time=self.placed)
+        earlier = self.placed - timedelta(days=2)
+        self.client.history = [
+            transaction(21, TransActionType.BUY, -200, earlier),
+            transaction(21, TransActionType.WIN, 1000, earlier + timedelta(hours=3)),
+        ]
+        self.assertEqual(self.monitor.record_history(self.client.history), [])
+        self.assertIsNone(ticket.external_id)
+        self.assertEqual(self.monitor.open_tickets, [ticket])
+
+    def test_expired(self):
+        """the tickets the history moved past are given up"""
+        ticket = self.monitor.track("lost", 100, [1], placed_at=self.placed,
+                                    close_time=self.placed)
+        expires = ticket.results_at.timestamp() + self.monitor.expire_after
+        self.assertEqual(self.monitor.check(now=expires - 1), [])
+        events = self.monitor.check(now=expires)
+        self.assertEqual([(event.ticket, event.outcome, event.amount) for event in events],
+                         [(ticket, TicketOutcome.EXPIRED, 0)])
+        self.assertEqual(events, self.settled)
+        self.assertEqual(self.monitor.open_tickets, [])
+
+    def test_real_wagers_tracked(self):
+        """the wagers to the real endpoint are tracked, the test wagers are not"""
+        game = self.client.upcoming_events(GameTypes.EBET)[0]
+        self.assertTrue(self.client.place_bet(game, BetDecision(BetTarget.HOME, 100)))
+        self.assertEqual(self.monitor.open_tickets, [])
+
+        self.assertTrue(
+            self.client.place_bet(game, BetDecision(BetTarget.HOME, 100), test=False))
+        tickets = self.monitor.open_tickets
+        self.assertEqual(len(tickets), 1)
+        # the draw in the fixture wager response
+        self.assertEqual(tickets[0].draw_ids, (2801227, ))
+        self.assertEqual(tickets[0].price, 100)
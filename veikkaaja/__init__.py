@@ -3,12 +3,21 @@ veikkaaja module, here we set up the logging
 
 export VEIKKAAJA_DEBUG=1 environment variable to
 set the log level to logging.DEBUG.
+
+export VEIKKAAJA_LOG_QUEUE=1 to format and write the log
+records on a background thread, and VEIKKAAJA_LOG_JSON=1
+to write them as json, see veikkaaja.logs.
+
+export VEIKKAAJA_PROFILE=<directory> to profile the client methods
+until the program exits, see veikkaaja.profiling.
 """
+import importlib
 import logging
 import logging.handlers
 import os
 import sys
-from datetime import datetime
+
+from veikkaaja.logs import NiceFormatter, enable_queue_logging
 
 __version__ = "0.1.3"
 
@@ -25,13 +34,6 @@ if not LOGGING_INITIALIZED:
     except ValueError:
         pass
 
-    class NiceFormatter(logging.Formatter):
-        """Format: [  INFO ] 2020-10-17 10:42:41 | The message."""
-
-        def format(self, record):
-            record.current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            return super().format(record)
-
     # pylint: disable=invalid-name
     sys_out_handler = logging.StreamHandler(sys.stdout)
     sys_out_handler.setFormatter(
@@ -39,4 +41,17 @@ if not LOGGING_INITIALIZED:
 
     logger.addHandler(sys_out_handler)
 
+    def _env_flag(name: str) -> bool:
+        try:
+            return int(os.environ.get(name, 0)) > 0
+        except ValueError:
+            return False
+
+    if _env_flag('VEIKKAAJA_LOG_QUEUE') or _env_flag('VEIKKAAJA_LOG_JSON'):
+        enable_queue_logging(structured=_env_flag('VEIKKAAJA_LOG_JSON'))
+
     LOGGING_INITIALIZED = True
+
+    if os.environ.get('VEIKKAAJA_PROFILE', "") not in ("", "0"):
+        # the profiler loads the client, only import it when profiling
+        importlib.import_module('veikkaaja.profiling').profile_from_environment()
@@ -0,0 +1,235 @@
+"""Flag sharp odds movements as the polls arrive
+
+The OddsAnomalyDetector keeps running statistics of the odds of every
+outcome of the feed, so each poll is compared to the history without
+going through it again:
+
+    detector = OddsAnomalyDetector(on_alert=print, window=60.0, drop=0.2)
+    while True:
+        detector.update(client.upcoming_events(GameTypes.EBET))
+        time.sleep(10)
+
+An outcome is a competitor of a market of a draw, (row_id, market_id,
+competitor). For each outcome the detector keeps, in flat preallocated
+arrays:
+
+    - the exponentially weighted mean and variance of the log changes of
+      the odds, for the z-score of a change
+    - the last 'samples' odds and their times, for the highest and lowest
+      odds of the last 'window' seconds
+
+Only the outcomes whose odds changed are updated, each in constant time.
+"""
+import math
+import time
+from array import array
+from enum import Enum
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from veikkaaja import logger
+
+# the time of the empty entries of the ring buffers
+_UNSET = float('-inf')
+
+
+class AlertKind(Enum):
+    """Why the change was flagged"""
+    # the odds dropped from the highest odds of the window
+    DROP = "DROP"
+    # the odds rose from the lowest odds of the window
+    RISE = "RISE"
+    # the change is far from the usual changes of the outcome
+    ZSCORE = "ZSCORE"
+
+
+class OddsAlert(NamedTuple):
+    """A flagged change of the odds of an outcome"""
+    kind: AlertKind
+    game: Any
+    competitor: int
+    # in hundredths, the odds the change is measured from
+    previous: float
+    odds: float
+    # relative change, e.g. -0.2 for a 20 % drop
+    change: float
+    zscore: float
+    # unix time of the poll
+    time: float
+
+
+class OddsAnomalyDetector:
+    """Online statistics of the odds of each outcome, alerts on sharp moves"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 on_alert: Optional[Callable[[OddsAlert], Any]] = None,
+                 *,
+                 window: float = 60.0,
+                 drop: float = 0.2,
+                 z_threshold: float = 4.0,
+                 alpha: float = 0.1,
+                 samples: int = 16,
+                 capacity: int = 4096):
+        """
+        Arguments:
+            on_alert: (optional) called with each alert
+            window: seconds to look back for the highest and lowest odds
+            drop: flag the odds changing this fraction within the window
+            z_threshold: flag a change this many deviations from the mean change
+            alpha: the weight of the newest change in the mean and variance
+            samples: the odds kept for the window of each outcome
+            capacity: outcomes to allocate room for, the arrays grow when needed
+        """
+        self.on_alert = on_alert
+        self.window = window
+        self.drop = drop
+        self.z_threshold = z_threshold
+        self.alpha = alpha
+        self.samples = samples
+        # the changes before the variance is trusted for z-scores
+        self.warmup = 5
+
+        # (row id, market id, competitor) -> slot
+        self._slots: Dict[Tuple[Any, Any, int], int] = {}
+        self._free: List[int] = []
+        self._capacity = 0
+        self._last = array('d')
+        self._seen = array('d')
+        self._mean = array('d')
+        self._variance = array('d')
+        self._count = array('L')
+        # ring buffers, 'samples' entries for each slot
+        self._head = array('L')
+        self._times = array('d')
+        self._odds = array('d')
+        self._grow(capacity)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _grow(self, capacity: int):
+        """Allocate room for 'capacity' outcomes"""
+        added = capacity - self._capacity
+        for values in (self._last, self._seen, self._mean, self._variance):
+            values.extend(array('d', [0.0]) * added)
+        self._count.extend(array('L', [0]) * added)
+        self._head.extend(array('L', [0]) * added)
+        self._times.extend(array('d', [_UNSET]) * (added * self.samples))
+        self._odds.extend(array('d', [0.0]) * (added * self.samples))
+        self._free.extend(range(capacity - 1, self._capacity - 1, -1))
+        self._capacity = capacity
+
+    def _slot(self, key: Tuple[Any, Any, int]) -> int:
+        if not self._free:
+            self._grow(self._capacity * 2)
+        slot = self._slots[key] = self._free.pop()
+        self._count[slot] = 0
+        self._mean[slot] = 0.0
+        self._variance[slot] = 0.0
+        self._head[slot] = 0
+        start = slot * self.samples
+        self._times[start:start + self.samples] = array('d', [_UNSET]) * self.samples
+        return slot
+
+    def update(self, games: Iterable[Any], now: Optional[float] = None) -> List[OddsAlert]:
+        """Update the statistics with a poll of the feed and return the alerts
+
+        Arguments:
+            games: the games of a poll, e.g. the result of parse_draws()
+            now: (optional) unix time of the poll, by default now
+        """
+        now = time.time() if now is None else now
+        alerts: List[OddsAlert] = []
+        slots = self._slots
+        last, seen = self._last, self._seen
+        for game in games:
+            row_id, market_id = game.row_id, game.market_id
+            for competitor, odds in zip(game.competitor_ids, game.odds):
+                if odds <= 0:
+                    continue
+                key = (row_id, market_id, competitor)
+                slot = slots.get(key)
+                if slot is None:
+                    slot = self._slot(key)
+                    last[slot] = odds
+                    self._record(slot, odds, now)
+                elif odds != last[slot]:
+                    self._change(slot, game, competitor, odds, now, alerts)
+                seen[slot] = now
+
+        for alert in alerts:
+            logger.info("Odds %s %s: %s %s -> %s (%+.1f %%, z %.1f)", alert.kind.value,
+                        alert.game.list_index, alert.competitor, alert.previous,
+                        alert.odds, alert.change * 100, alert.zscore)
+            if self.on_alert is not None:
+                self.on_alert(alert)
+        return alerts
+
+    def _record(self, slot: int, odds: float, now: float):
+        """Add the odds to the ring buffer of the slot"""
+        index = slot * self.samples + self._head[slot]
+        self._times[index] = now
+        self._odds[index] = odds
+        self._head[slot] = (self._head[slot] + 1) % self.samples
+
+    def _change(self,  # pylint: disable=too-many-arguments,too-many-positional-arguments,too-many-locals
+                slot: int, game: Any, competitor: int, odds: float, now: float,
+                alerts: List[OddsAlert]):
+        """Update the statistics of the slot with changed odds"""
+        previous = self._last[slot]
+        change = math.log(odds / previous)
+
+        # the z-score against the changes before this one
+        count = self._count[slot]
+        mean, variance = self._mean[slot], self._variance[slot]
+        zscore = 0.0
+        if count >= self.warmup and variance > 0.0:
+            zscore = (change - mean) / math.sqrt(variance)
+        difference = change - mean
+        increment = self.alpha * difference
+        self._mean[slot] = mean + increment
+        self._variance[slot] = (1 - self.alpha) * (variance + difference * increment)
+        self._count[slot] = count + 1
+
+        # the extremes of the window before this change, including the odds
+        # that were in effect at the start of the window
+        since = now - self.window
+        start = slot * self.samples
+        highest, lowest = previous, previous
+        before, before_time = previous, _UNSET
+        for index in range(start, start + self.samples):
+            recorded = self._times[index]
+            if recorded >= since:
+                value = self._odds[index]
+                highest = max(highest, value)
+                lowest = min(lowest, value)
+            elif recorded > before_time:
+                before, before_time = self._odds[index], recorded
+        highest = max(highest, before)
+        lowest = min(lowest, before)
+
+        self._last[slot] = odds
+        self._record(slot, odds, now)
+
+        if odds <= highest * (1 - self.drop):
+            alerts.append(OddsAlert(AlertKind.DROP, game, competitor, highest, odds,
+                                    odds / highest - 1, zscore, now))
+        elif odds >= lowest * (1 + self.drop):
+            alerts.append(OddsAlert(AlertKind.RISE, game, competitor, lowest, odds,
+                                    odds / lowest - 1, zscore, now))
+        elif abs(zscore) >= self.z_threshold:
+            alerts.append(OddsAlert(AlertKind.ZSCORE, game, competitor, previous, odds,
+                                    odds / previous - 1, zscore, now))
+
+    def expire(self, max_age: float, now: Optional[float] = None) -> int:
+        """Forget the outcomes not seen in 'max_age' seconds, e.g. the closed games
+
+        Returns:
+            the number of forgotten outcomes
+        """
+        now = time.time() if now is None else now
+        expired = [key for key, slot in self._slots.items() if now - self._seen[slot] > max_age]
+        for key in expired:
+            self._free.append(self._slots.pop(key))
+        return len(expired)
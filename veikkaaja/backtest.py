@@ -0,0 +1,230 @@
+"""Replay betting strategies over recorded odds
+
+The snapshots of the EBET feed (e.g. recorded with the ArchiveRecorder)
+are loaded into OddsColumns, a row for each outcome of each snapshot.
+A strategy is a function of all the rows at once, it returns the stake
+in cents for each row (0 for no bet):
+
+    def favourites(columns, params):
+        return [params['stake'] if 150 <= odds <= params['max_odds'] else 0
+                for odds in columns.odds]
+
+    backtest = Backtest.from_archive(ArchiveReader("archive"), bankroll=100000)
+    report = backtest.run(favourites, {'stake': 100, 'max_odds': 180})
+    reports = backtest.sweep(favourites, [{'stake': 100, 'max_odds': odds}
+                                          for odds in range(160, 260, 10)])
+
+The bets are placed in the order of the snapshots, like a live client
+would place them: an outcome is bet once, at the first snapshot whose
+stake is placed, the stakes of the later snapshots on the same outcome
+are ignored. The stakes are rounded to the 'stakeInterval' and capped
+to the 'maxStake' of the draw, bets below the 'minStake', bets after the
+close time and bets exceeding the balance are rejected. A bet is settled
+at the close time of its draw against the results from
+VeikkausClient.closed_games(). Bets on markets without a known result
+are refunded and counted as unsettled.
+
+The strategy and its parameters have to be picklable (a module level
+function) to sweep the parameters in a process pool.
+"""
+import heapq
+from concurrent.futures import ProcessPoolExecutor
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence,
+                    Set, Tuple)
+
+from veikkaaja.bulk import parse_archive
+from veikkaaja.columnar import OddsColumns
+from veikkaaja.portfolio import round_stake
+from veikkaaja.recorder import ArchiveReader
+from veikkaaja.responses import MarketResult, parse_closed_draws, results_by_market
+
+# returns the stake in cents for each row of the columns
+Strategy = Callable[[OddsColumns, Any], Sequence[int]]
+
+RESULTS_ENDPOINT = "ebet-results/"
+
+
+class BacktestReport(NamedTuple):
+    """The outcome of a single backtest run, the amounts in cents"""
+    params: Any
+    bets: int
+    # stakes outside the stake rules, after the close time or over the balance
+    rejected: int
+    # bets on markets without a result, refunded
+    unsettled: int
+    staked: int
+    returned: int
+    profit: int
+    # profit per staked
+    roi: float
+    # the largest drop of the balance from its peak, open bets valued at their stake
+    max_drawdown: int
+    final_balance: int
+
+
+class Backtest:
+    """Simulate the placement and settlement of the bets of a strategy"""
+
+    def __init__(self,
+                 columns: OddsColumns,
+                 results: Iterable[MarketResult],
+                 bankroll: int = 100000):
+        """
+        Arguments:
+            columns: the recorded odds
+            results: the results of the closed markets
+            bankroll: the starting balance in cents
+        """
+        self.columns = columns
+        self.results: Dict[Tuple[int, int], MarketResult] = results_by_market(list(results))
+        self.bankroll = bankroll
+
+    @classmethod
+    def from_archive(cls,  # pylint: disable=too-many-arguments
+                     reader: ArchiveReader,
+                     results: Iterable[MarketResult] = (),
+                     *,
+                     start: Optional[float] = None,
+                     end: Optional[float] = None,
+                     bankroll: int = 100000,
+                     max_workers: Optional[int] = 1) -> 'Backtest':
+        """Load the recorded EBET snapshots and results
+
+        The results recorded from EndPoint.closed_games_by_day are joined
+        with the given results.
+
+        Arguments:
+            reader: the archive of the recorded responses
+            results: (optional) results known otherwise
+            start: (optional) unix time of the first snapshot
+            end: (optional) unix time of the last snapshot
+            bankroll: the starting balance in cents
+            max_workers: the number of processes parsing the archive segments,
+                         None for the number of CPUs
+        """
+        columns = parse_archive(reader, start, end, max_workers)
+        all_results = list(results)
+        for record in reader.records(start, end, RESULTS_ENDPOINT):
+            if record.status == 200:
+                all_results.extend(parse_closed_draws(record.json()))
+        return cls(columns, all_results, bankroll)
+
+    def run(self, strategy: Strategy, params: Any = None) -> BacktestReport:
+        """Evaluate the strategy on every row and simulate its bets"""
+        stakes = strategy(self.columns, params)
+        if len(stakes) != len(self.columns):
+            raise ValueError("The strategy has to return a stake for every row")
+        return self.simulate(stakes, params)
+
+    def simulate(self,  # pylint: disable=too-many-locals
+                 stakes: Sequence[int],
+                 params: Any = None) -> BacktestReport:
+        """Place and settle the stakes, one for each row of the columns
+
+        Each outcome (draw, market, competitor) is bet at most once, at the
+        earliest snapshot with a stake that is not rejected.
+        """
+        columns = self.columns
+        snapshot_time, close_time = columns.snapshot_time, columns.close_time
+        draw_id, market, competitor = columns.draw_id, columns.market, columns.competitor
+        odds = columns.odds
+        min_stake, max_stake = columns.min_stake, columns.max_stake
+        stake_interval = columns.stake_interval
+        results = self.results
+
+        placed = sorted((row for row, stake in enumerate(stakes) if stake > 0),
+                        key=snapshot_time.__getitem__)
+
+        balance = peak = self.bankroll
+        open_stakes = max_drawdown = 0
+        bets = rejected = unsettled = staked = returned = 0
+        # (close time, stake, payout) of the bets waiting for their result
+        pending: List[Tuple[float, int, int]] = []
+        # (draw id, market, competitor) of the outcomes already bet
+        outcomes: Set[Tuple[int, int, int]] = set()
+
+        def settle(until: float):
+            nonlocal balance, open_stakes, peak, max_drawdown
+            while pending and pending[0][0] <= until:
+                _, stake, payout = heapq.heappop(pending)
+                balance += payout
+                open_stakes -= stake
+                equity = balance + open_stakes
+                peak = max(peak, equity)
+                max_drawdown = max(max_drawdown, peak - equity)
+
+        for row in placed:
+            outcome = (draw_id[row], market[row], competitor[row])
+            if outcome in outcomes:
+                continue
+            now = snapshot_time[row]
+            settle(now)
+            stake = round_stake(stakes[row], min_stake[row], max_stake[row],
+                                stake_interval[row])
+            if not stake or now >= close_time[row] or stake > balance:
+                rejected += 1
+                continue
+            outcomes.add(outcome)
+
+            result = results.get((draw_id[row], market[row]))
+            if result is None:
+                unsettled += 1
+                continue
+
+            bets += 1
+            staked += stake
+            if result.cancelled:
+                payout = stake
+            elif competitor[row] in result.winners:
+                payout = stake * odds[row] // 100
+            else:
+                payout = 0
+            returned += payout
+            balance -= stake
+            open_stakes += stake
+            heapq.heappush(pending, (close_time[row], stake, payout))
+
+        settle(float('inf'))
+        profit = returned - staked
+        return BacktestReport(params=params,
+                              bets=bets,
+                              rejected=rejected,
+                              unsettled=unsettled,
+                              staked=staked,
+                              returned=returned,
+                              profit=profit,
+                              roi=profit / staked if staked else 0.0,
+                              max_drawdown=max_drawdown,
+                              final_balance=balance)
+
+    def sweep(self,
+              strategy: Strategy,
+              grid: Iterable[Any],
+              max_workers: Optional[int] = None) -> List[BacktestReport]:
+        """Run the strategy for each parameter set of the grid in a process pool
+
+        The backtest is sent to each worker process once.
+
+        Arguments:
+            strategy: a picklable strategy
+            grid: the parameter sets
+            max_workers: (optional) the number of processes, by default the number of CPUs
+        """
+        with ProcessPoolExecutor(max_workers=max_workers,
+                                 initializer=_init_worker,
+                                 initargs=(self,)) as executor:
+            futures = [executor.submit(_run_in_worker, strategy, params) for params in grid]
+            return [future.result() for future in futures]
+
+
+_WORKER_BACKTEST: Optional[Backtest] = None
+
+
+def _init_worker(backtest: Backtest):
+    global _WORKER_BACKTEST  # pylint: disable=global-statement
+    _WORKER_BACKTEST = backtest
+
+
+def _run_in_worker(strategy: Strategy, params: Any) -> BacktestReport:
+    assert _WORKER_BACKTEST is not None, "The worker was not initialized"
+    return _WORKER_BACKTEST.run(strategy, params)
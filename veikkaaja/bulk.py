@@ -0,0 +1,176 @@
+"""Parse large feeds and archives on all cores
+
+VeikkausClient.parse_draws() and the transaction list parsing run on a
+single core. When reprocessing hundreds of recorded snapshots, the
+functions in this module shard the work over a process pool:
+
+    columns = parse_archive(ArchiveReader("recordings"))
+    columns = parse_snapshot_files(sorted(Path("snapshots").glob("*.json")))
+    games = parse_games(draws, client=client)
+
+The workers return compact results: OddsColumns, whose arrays pickle as
+raw bytes, or Games without the client (attached again in this process).
+The draws of an already decoded response have to be pickled to the
+workers, so the speedup is largest for files and archives, for which
+only the paths are sent.
+
+With max_workers=1 the parsing runs in this process.
+"""
+import gzip
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, TypeVar, Union
+
+from veikkaaja.columnar import OddsColumns
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.recorder import ArchiveReader
+from veikkaaja.responses import Wager, parse_transaction_list
+from veikkaaja.veikkaus_client import Game, VeikkausClient, parse_ebet_draws
+
+Item = TypeVar('Item')
+Result = TypeVar('Result')
+
+# shards per worker, smaller shards balance the load better
+SHARDS_PER_WORKER = 4
+
+
+def shard(items: Sequence[Item], count: int) -> List[Sequence[Item]]:
+    """Split the items into at most 'count' contiguous shards of equal size"""
+    count = max(1, min(count, len(items)))
+    size, extra = divmod(len(items), count)
+    shards = []
+    start = 0
+    for index in range(count):
+        end = start + size + (1 if index < extra else 0)
+        shards.append(items[start:end])
+        start = end
+    return shards
+
+
+def _map(function: Callable[[Item], Result],
+         items: Sequence[Item],
+         max_workers: Optional[int]) -> List[Result]:
+    """Map the function over the items in a process pool, keeping the order"""
+    if max_workers == 1 or len(items) <= 1:
+        return [function(item) for item in items]
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(function, items))
+
+
+def _workers(max_workers: Optional[int]) -> int:
+    # the default of the ProcessPoolExecutor
+    return max_workers or os.cpu_count() or 1
+
+
+def _merge(parts: Iterable[OddsColumns]) -> OddsColumns:
+    columns = OddsColumns()
+    for part in parts:
+        columns.append_columns(part)
+    return columns
+
+
+def _draw_columns(draws: Sequence[Dict[str, Any]]) -> OddsColumns:
+    columns = OddsColumns()
+    columns.extend(draws)
+    return columns
+
+
+def parse_draws(data: List[Dict[str, Any]], max_workers: Optional[int] = None) -> OddsColumns:
+    """Parse the outcomes of the draws in parallel
+
+    Arguments:
+        data: the response of EndPoint.games_info_endpoint
+        max_workers: (optional) the number of processes, by default the number of CPUs
+    """
+    shards = shard(data, _workers(max_workers) * SHARDS_PER_WORKER)
+    return _merge(_map(_draw_columns, shards, max_workers))
+
+
+def parse_games(data: List[Dict[str, Any]],
+                max_workers: Optional[int] = None,
+                client: Optional[VeikkausClient] = None) -> List[Game]:
+    """Parse the draws into Games in parallel, the same as VeikkausClient.parse_draws()
+
+    Arguments:
+        data: the response of EndPoint.games_info_endpoint
+        max_workers: (optional) the number of processes, by default the number of CPUs
+        client: (optional) the client to attach to the games for placing bets
+    """
+    shards = shard(data, _workers(max_workers) * SHARDS_PER_WORKER)
+    games = [game for part in _map(parse_ebet_draws, shards, max_workers) for game in part]
+    if client is not None:
+        for game in games:
+            game.attach(client)
+    # the shards are in the order of the data, a stable sort gives the sequential order
+    return sorted(games, key=lambda game: game.draw.close_time)
+
+
+def _read_snapshot(path: Path) -> OddsColumns:
+    opener = gzip.open if path.suffix == '.gz' else open
+    with opener(path, 'rt', encoding='utf-8') as handle:
+        draws = json.load(handle)
+    columns = OddsColumns()
+    columns.extend(draws, snapshot_time=path.stat().st_mtime)
+    return columns
+
+
+def parse_snapshot_files(paths: Iterable[Union[str, Path]],
+                         max_workers: Optional[int] = None) -> OddsColumns:
+    """Parse saved draws responses, a json file (or .json.gz) for each snapshot
+
+    The modification time of each file is used as the snapshot time.
+
+    Arguments:
+        paths: the snapshot files, in the order of the rows in the result
+        max_workers: (optional) the number of processes, by default the number of CPUs
+    """
+    return _merge(_map(_read_snapshot, [Path(path) for path in paths], max_workers))
+
+
+class _SegmentTask:
+    """Parse the recorded draws of a single archive segment"""
+
+    def __init__(self, start: Optional[float], end: Optional[float]):
+        self.start = start
+        self.end = end
+
+    def __call__(self, segment: Path) -> OddsColumns:
+        endpoint = EndPoint.games_info_endpoint().endpoint
+        columns = OddsColumns()
+        for record in ArchiveReader.segment_records(segment, self.start, self.end, endpoint):
+            if record.status == 200 and record.endpoint == endpoint:
+                columns.extend(record.json(), record.timestamp)
+        return columns
+
+
+def parse_archive(reader: ArchiveReader,
+                  start: Optional[float] = None,
+                  end: Optional[float] = None,
+                  max_workers: Optional[int] = None) -> OddsColumns:
+    """Parse the EBET snapshots recorded by the ArchiveRecorder, a segment per task
+
+    Arguments:
+        reader: the archive
+        start: (optional) unix time of the first snapshot
+        end: (optional) unix time of the last snapshot
+        max_workers: (optional) the number of processes, by default the number of CPUs
+    """
+    return _merge(_map(_SegmentTask(start, end), reader.segments(), max_workers))
+
+
+def _transactions(responses: Sequence[Dict[str, Any]]) -> List[Wager]:
+    return [wager for response in responses for wager in parse_transaction_list(response)]
+
+
+def parse_transaction_lists(responses: Sequence[Dict[str, Any]],
+                            max_workers: Optional[int] = None) -> List[Wager]:
+    """Parse the responses of EndPoint.account_betting_history in parallel
+
+    Arguments:
+        responses: the decoded responses
+        max_workers: (optional) the number of processes, by default the number of CPUs
+    """
+    shards = shard(responses, _workers(max_workers) * SHARDS_PER_WORKER)
+    return [wager for part in _map(_transactions, shards, max_workers) for wager in part]
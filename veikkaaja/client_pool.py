@@ -0,0 +1,194 @@
+"""Several accounts over a shared transport and a shared feed
+
+The ClientPool logs in a VeikkausClient for each account. The clients
+have their own sessions (cookies), but they send their requests over a
+single connection pool and through a single RequestGate, which limits
+the requests in flight and the request rate of all the accounts
+together:
+
+    pool = ClientPool({"first.account": "password", "second.account": "password"},
+                      limit=4, rate=5.0)
+    games = pool.upcoming_events(GameTypes.EBET)
+    pool.place_bet("second.account", games[0], BetDecision(BetTarget.HOME, 100))
+    pool.balances()
+
+The public data is fetched and parsed once for all the accounts: the
+draws are shared for 'feed_ttl' seconds and concurrent callers wait for
+the same request, the taxonomy is crawled once. The calls of an account
+(balance, history, wagers) go to the session of the account.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import (Any, Callable, Dict, Hashable, Iterable, List, Mapping, Optional,
+                    Tuple, Union)
+
+from requests.adapters import HTTPAdapter
+
+from veikkaaja import logger
+from veikkaaja.endpoints import RequestGate
+from veikkaaja.filters import GameFilter
+from veikkaaja.payload import PreparedWager
+from veikkaaja.recorder import ArchiveRecorder
+from veikkaaja.responses import MarketResult
+from veikkaaja.shared_cache import SharedCache
+from veikkaaja.taxonomy import Taxonomy, TaxonomyCrawler
+from veikkaaja.types import BetDecision, GameTypes
+from veikkaaja.veikkaus_client import Game, VeikkausClient, Wager
+
+
+class ClientPool:
+    """An authenticated client for each account, sharing the transport and the feed"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 accounts: Union[Mapping[str, str], Iterable[Tuple[str, str]]],
+                 *,
+                 limit: int = 8,
+                 rate: Optional[float] = None,
+                 connections: int = 10,
+                 feed_ttl: float = 10.0,
+                 recorder: Optional[ArchiveRecorder] = None,
+                 cache: Optional[SharedCache] = None):
+        """Log in each account, concurrently
+
+        Arguments:
+            accounts: the password of each account name
+            limit: the most requests in flight over all the accounts
+            rate: (optional) the most requests started per second over all the accounts
+            connections: the connections kept open to the API
+            feed_ttl: seconds the fetched public data is shared
+            recorder: (optional) record the requests of every client
+            cache: (optional) share the public responses with the other processes too
+        """
+        items = list(accounts.items() if isinstance(accounts, Mapping) else accounts)
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=connections)
+        self.gate = RequestGate(limit, rate)
+        self.feed_ttl = feed_ttl
+
+        def log_in(item: Tuple[str, str]) -> VeikkausClient:
+            return VeikkausClient(item[0], item[1], recorder=recorder, cache=cache,
+                                  gate=self.gate, adapter=self.adapter)
+
+        with ThreadPoolExecutor(max_workers=max(1, min(limit, len(items)))) as executor:
+            self.clients: Dict[str, VeikkausClient] = dict(
+                zip((account for account, _ in items), executor.map(log_in, items)))
+        for account, client in self.clients.items():
+            if not client.session:
+                logger.error("Account %s is not logged in", account)
+
+        # key -> (monotonic fetch time, value) of the shared public data
+        self._shared: Dict[Hashable, Tuple[float, Any]] = {}
+        # a lock for each key, the concurrent callers wait for a single fetch
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._locks_lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.clients)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        """Close the sessions and the connections"""
+        for client in self.clients.values():
+            if client.session:
+                client.session.close()
+        self.adapter.close()
+
+    def client(self, account: str) -> VeikkausClient:
+        """The client of the account"""
+        try:
+            return self.clients[account]
+        except KeyError:
+            raise KeyError(f"No account {account} in the pool") from None
+
+    @property
+    def public(self) -> Optional[VeikkausClient]:
+        """The client used for the public data, the first one logged in"""
+        return next((client for client in self.clients.values() if client.session), None)
+
+    def _fetch_shared(self, key: Hashable, fetch: Callable[[VeikkausClient], Any],
+                      ttl: float) -> Any:
+        """The shared value of the key, fetched by a single caller when stale"""
+        with self._locks_lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            fetched = self._shared.get(key)
+            if fetched is not None and time.monotonic() - fetched[0] < ttl:
+                return fetched[1]
+            client = self.public
+            if client is None:
+                logger.warning("No logged in account for fetching %s", key)
+                return None
+            value = fetch(client)
+            self._shared[key] = (time.monotonic(), value)
+            return value
+
+    def upcoming_events(self, game_type: GameTypes,
+                        taxonomy: Optional[Taxonomy] = None,
+                        where: Optional[GameFilter] = None) -> List[Any]:
+        """The upcoming games, fetched and parsed once for all the accounts
+
+        The games are shared, bet on them with the account calls of the pool.
+        The whole feed is parsed for the accounts, 'where' filters the
+        shared games.
+        """
+        games = self._fetch_shared(('upcoming_events', game_type),
+                                   lambda client: client.upcoming_events(game_type),
+                                   self.feed_ttl)
+        if not games:
+            return []
+        if taxonomy is not None:
+            taxonomy.enrich(games)
+        if where is not None:
+            return [game for game in games if where.matches(game)]
+        return list(games)
+
+    def closed_games(self, day: date) -> List[MarketResult]:
+        """The results of the markets closed on the day, fetched once"""
+        return list(
+            self._fetch_shared(('closed_games', day), lambda client: client.closed_games(day),
+                               self.feed_ttl) or [])
+
+    def taxonomy(self, refresh: bool = False) -> Optional[Taxonomy]:
+        """The sports taxonomy, crawled once
+
+        Arguments:
+            refresh: crawl the taxonomy again
+        """
+        if refresh:
+            self._shared.pop('taxonomy', None)
+        return self._fetch_shared('taxonomy', lambda client: TaxonomyCrawler(client).crawl(),
+                                  float('inf'))
+
+    def get_balance(self, account: str, balance="usableBalance"):
+        """The balance of the account, see VeikkausClient.get_balance()"""
+        return self.client(account).get_balance(balance)
+
+    def balances(self, balance="usableBalance") -> Dict[str, float]:
+        """The balance of each account"""
+        return {account: client.get_balance(balance) for account, client in self.clients.items()}
+
+    def get_betting_history(self, account: str, maximum_results=50,
+                            sort_by='TXDATE') -> List[Wager]:
+        """The betting history of the account"""
+        return self.client(account).get_betting_history(maximum_results, sort_by)
+
+    def place_bet(self, account: str, game: Game, bet: BetDecision, test=True) -> bool:
+        """Place a bet with the account, bet amount in cents"""
+        return self.client(account).place_bet(game, bet, test=test)
+
+    def place_bets(self, account: str, games: List[Game], bets: List[BetDecision],
+                   test=True) -> bool:
+        """Place several bets with a single wager of the account"""
+        return self.client(account).place_bets(games, bets, test=test)
+
+    def send_wager(self, account: str, wager: PreparedWager, test=True) -> bool:
+        """Send a prepared wager with the account"""
+        return self.client(account).send_wager(wager, test=test)
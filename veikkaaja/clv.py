@@ -0,0 +1,333 @@
+"""Closing line value of the placed bets
+
+The closing line value (CLV) of a bet compares the odds it got to the
+last odds of the market before the close time:
+
+    clv = odds taken / closing odds - 1
+
+A positive CLV beats the closing line. ClosingLines keeps the latest
+odds of every outcome seen before the close, joins the placed bets to
+them and reports the CLV of each bet once its market has closed:
+
+    lines = ClosingLines(on_clv=print)
+    lines.observe(games)                        # every poll of the feed
+    lines.add_selections(selections, reference=wager.request_id)
+    ...
+    lines.close()                               # the closed markets
+    lines.summary
+
+An outcome is a competitor of a market of a draw, (row_id, market,
+competitor): a draw can have several markets (rows), e.g. a 1X2 and a
+handicap market of the same match, with their own odds. The odds are
+kept in flat arrays indexed by a dictionary of the outcomes. The bets
+wait in a dictionary by row_id and the draws in a heap by their close
+time, so closing a draw only touches its own bets. A closed draw keeps
+its closing odds until expire(), so the bets joined late still get
+their CLV.
+"""
+import heapq
+import json
+import time
+from array import array
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Set,
+                    Tuple, Union)
+
+from veikkaaja import logger
+from veikkaaja.columnar import OddsColumns
+from veikkaaja.payload import PreparedWager, Selection
+from veikkaaja.types import competitor_id
+
+
+class PlacedBet(NamedTuple):
+    """A bet to compare to the closing line"""
+    row_id: int
+    # the id of the market (row) of the draw
+    market: int
+    competitor: int
+    # the odds taken, in hundredths
+    odds: int
+    # in cents
+    stake: int
+    # (optional) e.g. the request id of the wager
+    reference: Any = None
+
+
+class BetClv(NamedTuple):
+    """The closing line value of a bet"""
+    bet: PlacedBet
+    # in hundredths, 0 when the outcome was not seen before the close
+    closing_odds: int
+    # odds taken / closing odds - 1
+    clv: float
+
+
+class ClvSummary(NamedTuple):
+    """The closing line value of all the closed bets"""
+    bets: int
+    staked: int
+    mean_clv: float
+    # weighted by the stakes
+    weighted_clv: float
+    # the fraction of the bets with a positive CLV
+    beat_rate: float
+    # bets on outcomes without closing odds
+    missing: int
+
+
+class ClosingLines:
+    """The last odds before the close of each outcome, joined to the placed bets"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, on_clv: Optional[Callable[[BetClv], Any]] = None):
+        """
+        Arguments:
+            on_clv: (optional) called with the CLV of each bet as its market closes
+        """
+        self.on_clv = on_clv
+
+        # (row id, market, competitor) -> slot of the arrays
+        self._slots: Dict[Tuple[int, int, int], int] = {}
+        self._free: List[int] = []
+        self._odds = array('L')
+        # unix time of the odds, the later observation wins
+        self._observed = array('d')
+        # row id -> close time, the slots and the markets of the row
+        self._close_times: Dict[int, float] = {}
+        self._row_slots: Dict[int, List[int]] = {}
+        self._markets: Dict[int, List[int]] = {}
+        # row id -> the first market of the row, the one the wagers bet on
+        self._primary: Dict[int, int] = {}
+        # list index -> row id
+        self._row_ids: Dict[Union[str, int], int] = {}
+        # (close time, row id) of the open rows with bets
+        self._closing: List[Tuple[float, int]] = []
+        self._closed: Set[int] = set()
+        # row id -> the bets waiting for the close
+        self._bets: Dict[int, List[PlacedBet]] = {}
+
+        # running totals of the closed bets
+        self._count = 0
+        self._staked = 0
+        self._clv_sum = 0.0
+        self._weighted_sum = 0.0
+        self._beat = 0
+        self._missing = 0
+
+    def __len__(self):
+        return len(self._slots)
+
+    def _slot(self, row_id: int, market: int, competitor: int) -> int:
+        key = (row_id, market, competitor)
+        slot = self._slots.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+                self._odds[slot] = 0
+                self._observed[slot] = float('-inf')
+            else:
+                slot = len(self._odds)
+                self._odds.append(0)
+                self._observed.append(float('-inf'))
+            self._slots[key] = slot
+            self._row_slots.setdefault(row_id, []).append(slot)
+            markets = self._markets.setdefault(row_id, [])
+            if market not in markets:
+                markets.append(market)
+        return slot
+
+    def _record(self, row_id: int, market: int, competitor: int, odds: int,
+                observed: float):
+        slot = self._slot(row_id, market, competitor)
+        if observed >= self._observed[slot]:
+            self._odds[slot] = odds
+            self._observed[slot] = observed
+
+    def observe(self, games: Iterable[Any], now: Optional[float] = None):
+        """Record the odds of the open games of a poll
+
+        Arguments:
+            games: the games of a poll, e.g. the result of upcoming_events()
+            now: (optional) unix time of the poll, by default now
+        """
+        now = time.time() if now is None else now
+        close_times, row_ids = self._close_times, self._row_ids
+        for game in games:
+            row_id = int(game.row_id)
+            close_time = close_times.get(row_id)
+            if close_time is None:
+                close_time = close_times[row_id] = game.close_time.timestamp()
+                row_ids[game.list_index] = row_id
+                if game.draw.primary_market:
+                    self._primary[row_id] = int(game.draw.primary_market)
+            if now >= close_time or row_id in self._closed:
+                continue
+            market = int(game.market_id)
+            for competitor, odds in zip(game.competitor_ids, game.odds):
+                self._record(row_id, market, competitor, odds, now)
+
+    def observe_columns(self, columns: OddsColumns):
+        """Record the odds of recorded snapshots, in any order of the snapshots"""
+        close_times, row_ids = self._close_times, self._row_ids
+        for row_id, list_index, market, competitor, odds, snapshot_time, close_time in zip(
+                columns.draw_id, columns.list_index, columns.market, columns.competitor,
+                columns.odds, columns.snapshot_time, columns.close_time):
+            if row_id not in close_times:
+                close_times[row_id] = close_time
+                row_ids[list_index] = row_id
+            if snapshot_time < close_time and row_id not in self._closed:
+                self._record(row_id, market, competitor, odds, snapshot_time)
+
+    def row_id(self, list_index: Union[str, int]) -> Optional[int]:
+        """The row id of the draw with the list index, None if not seen"""
+        row_id = self._row_ids.get(list_index)
+        if row_id is None and isinstance(list_index, str) and list_index.isdigit():
+            # the recorded columns keep the list indices as numbers
+            row_id = self._row_ids.get(int(list_index))
+        return row_id
+
+    def market(self, row_id: int, competitor: int) -> Optional[int]:
+        """The market of the row a wager on the competitor bets on, None if not seen
+
+        The first market (row) of the draw when the games told it, else the
+        first market seen with the competitor.
+        """
+        primary = self._primary.get(row_id)
+        if primary is not None:
+            return primary if (row_id, primary, competitor) in self._slots else None
+        for market in self._markets.get(row_id, ()):
+            if (row_id, market, competitor) in self._slots:
+                return market
+        return None
+
+    def current_odds(self, row_id: int, market: int, competitor: int) -> int:
+        """The latest odds of the outcome before the close, 0 if not seen"""
+        slot = self._slots.get((row_id, market, competitor))
+        return 0 if slot is None else self._odds[slot]
+
+    def add_bets(self, bets: Iterable[PlacedBet]) -> List[BetClv]:
+        """Join the placed bets to their markets
+
+        Returns:
+            the CLV of the bets on the already closed markets
+        """
+        settled: List[BetClv] = []
+        waiting = self._bets
+        for bet in bets:
+            if bet.row_id in self._closed:
+                settled.append(self._clv(bet))
+                continue
+            row = waiting.get(bet.row_id)
+            if row is None:
+                row = waiting[bet.row_id] = []
+                close_time = self._close_times.get(bet.row_id)
+                if close_time is None:
+                    logger.warning("Bet on an unknown row %s", bet.row_id)
+                    close_time = float('inf')
+                heapq.heappush(self._closing, (close_time, bet.row_id))
+            row.append(bet)
+        self._emit(settled)
+        return settled
+
+    def add_selections(self, selections: Iterable[Selection],
+                       reference: Any = None) -> List[BetClv]:
+        """Join the bets of a wager, (list index, target, stake), at the current odds
+
+        The selections do not tell the market, a bet goes to the first
+        market of its draw, see market().
+        """
+        bets = []
+        for list_index, target, stake in selections:
+            row_id = self.row_id(list_index)
+            if row_id is None:
+                logger.warning("Bet on an unknown list index %s", list_index)
+                continue
+            competitor = competitor_id(target)
+            market = self.market(row_id, competitor)
+            if market is None:
+                logger.warning("Bet on an unknown competitor %s of %s", competitor, list_index)
+                continue
+            bets.append(
+                PlacedBet(row_id, market, competitor,
+                          self.current_odds(row_id, market, competitor), stake, reference))
+        return self.add_bets(bets)
+
+    def add_wager(self, wager: PreparedWager) -> List[BetClv]:
+        """Join the bets of a wager built with EbetPayloadBuilder, at the current odds"""
+        selections = [(selection['listIndex'], int(competitor), int(selection['stake']))
+                      for board in json.loads(wager.body)['boards']
+                      for selection in board['selections']
+                      for competitor in selection['competitors']]
+        return self.add_selections(selections, reference=wager.request_id)
+
+    def close(self, now: Optional[float] = None) -> List[BetClv]:
+        """The CLV of the bets whose markets have closed since the last call
+
+        Arguments:
+            now: (optional) unix time, by default now
+        """
+        now = time.time() if now is None else now
+        settled: List[BetClv] = []
+        closing = self._closing
+        while closing and closing[0][0] <= now:
+            _, row_id = heapq.heappop(closing)
+            self._closed.add(row_id)
+            settled.extend(self._clv(bet) for bet in self._bets.pop(row_id, []))
+        self._emit(settled)
+        return settled
+
+    def _clv(self, bet: PlacedBet) -> BetClv:
+        """The CLV of a bet on a closed market, added to the totals"""
+        closing_odds = self.current_odds(bet.row_id, bet.market, bet.competitor)
+        if not closing_odds or not bet.odds:
+            self._missing += 1
+            return BetClv(bet, closing_odds, 0.0)
+        clv = bet.odds / closing_odds - 1
+        self._count += 1
+        self._staked += bet.stake
+        self._clv_sum += clv
+        self._weighted_sum += clv * bet.stake
+        self._beat += clv > 0
+        return BetClv(bet, closing_odds, clv)
+
+    def _emit(self, settled: List[BetClv]):
+        if self.on_clv is not None:
+            for result in settled:
+                self.on_clv(result)
+
+    @property
+    def summary(self) -> ClvSummary:
+        """The CLV of the closed bets so far"""
+        count = self._count
+        return ClvSummary(bets=count,
+                          staked=self._staked,
+                          mean_clv=self._clv_sum / count if count else 0.0,
+                          weighted_clv=self._weighted_sum / self._staked if self._staked else 0.0,
+                          beat_rate=self._beat / count if count else 0.0,
+                          missing=self._missing)
+
+    def expire(self, max_age: float, now: Optional[float] = None) -> int:
+        """Forget the rows closed more than 'max_age' seconds ago
+
+        Returns:
+            the number of forgotten rows
+        """
+        now = time.time() if now is None else now
+        expired = [
+            row_id for row_id, close_time in self._close_times.items()
+            if now - close_time > max_age and row_id not in self._bets
+        ]
+        for row_id in expired:
+            self._closed.discard(row_id)
+            del self._close_times[row_id]
+            self._markets.pop(row_id, None)
+            self._primary.pop(row_id, None)
+            for slot in self._row_slots.pop(row_id, []):
+                self._free.append(slot)
+        if expired:
+            gone = set(expired)
+            self._slots = {key: slot for key, slot in self._slots.items() if key[0] not in gone}
+            self._row_ids = {
+                index: row_id for index, row_id in self._row_ids.items() if row_id not in gone
+            }
+        return len(expired)
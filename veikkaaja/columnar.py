@@ -0,0 +1,246 @@
+"""Columnar odds: every outcome of every market in flat arrays
+
+Analysing many snapshots of the EBET feed one Game at a time is slow.
+OddsColumns appends the outcomes of the raw draws straight into typed
+arrays, a single row for each competitor of each market:
+
+    columns = OddsColumns()
+    columns.extend(response.json(), snapshot_time=time.time())
+
+    columns.odds[i], columns.competitor[i], columns.draw_id[i], ...
+
+The games already parsed by upcoming_events() are added with
+extend_games(), which copies the flat competitor arrays of the games.
+
+Strings (team names, draw types, statuses, leagues) are dictionary
+encoded: the columns hold indices to the string tables 'names',
+'draw_types', 'statuses' and 'leagues'. The arrays pickle compactly, so
+the columns can be sent to worker processes as they are.
+"""
+from array import array
+from typing import Any, Dict, Iterable, List, Optional
+
+# the array columns and their typecodes
+COLUMNS = (
+    ('snapshot_time', 'd'),
+    ('draw_id', 'q'),
+    ('list_index', 'q'),
+    ('event_id', 'q'),
+    ('sport_id', 'l'),
+    ('draw_type', 'B'),
+    ('status', 'B'),
+    ('league', 'H'),
+    ('market', 'h'),
+    ('competitor', 'h'),
+    ('name', 'L'),
+    ('odds', 'L'),
+    ('close_time', 'd'),
+    ('min_stake', 'L'),
+    ('max_stake', 'L'),
+    ('stake_interval', 'L'),
+)
+
+# the dictionary encoded columns and their string tables
+STRING_TABLES = (
+    ('name', 'names'),
+    ('draw_type', 'draw_types'),
+    ('status', 'statuses'),
+    ('league', 'leagues'),
+)
+
+
+def _to_int(value: Any) -> int:
+    """The numeric ids of the API are sent as strings, -1 if not numeric"""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return -1
+
+
+class OddsColumns:
+    """The outcomes of parsed draws as parallel arrays"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self):
+        self.snapshot_time = array('d')
+        self.draw_id = array('q')
+        self.list_index = array('q')
+        self.event_id = array('q')
+        self.sport_id = array('l')
+        self.draw_type = array('B')
+        # the status of the market
+        self.status = array('B')
+        self.league = array('H')
+        # the ids are -1 when not numeric
+        self.market = array('h')
+        self.competitor = array('h')
+        self.name = array('L')
+        # in hundredths
+        self.odds = array('L')
+        # unix time in seconds
+        self.close_time = array('d')
+        self.min_stake = array('L')
+        self.max_stake = array('L')
+        self.stake_interval = array('L')
+
+        # the string tables of the dictionary encoded columns
+        self.names: List[str] = []
+        self.draw_types: List[str] = []
+        self.statuses: List[str] = []
+        self.leagues: List[str] = []
+        # string table -> the code of each string
+        self._codes: Dict[str, Dict[str, int]] = {table: {} for _, table in STRING_TABLES}
+
+    def __len__(self):
+        return len(self.odds)
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        # the code lookups are rebuilt from the string tables
+        del state['_codes']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._codes = {
+            table: {name: code for code, name in enumerate(getattr(self, table))}
+            for _, table in STRING_TABLES
+        }
+
+    def _code(self, value: str, table: List[str], codes: Dict[str, int]) -> int:
+        code = codes.get(value)
+        if code is None:
+            code = codes[value] = len(table)
+            table.append(value)
+        return code
+
+    def extend(self,  # pylint: disable=too-many-locals
+               draws: Iterable[Dict[str, Any]],
+               snapshot_time: float = 0.0):
+        """Append the outcomes of the draws in the API response
+
+        Arguments:
+            draws: the response of EndPoint.games_info_endpoint
+            snapshot_time: unix time when the draws were fetched
+        """
+        names, name_codes = self.names, self._codes['names']
+        draw_types, draw_type_codes = self.draw_types, self._codes['draw_types']
+        statuses, status_codes = self.statuses, self._codes['statuses']
+        # the feed does not tell the leagues
+        league = self._code("", self.leagues, self._codes['leagues'])
+        for entry in draws:
+            draw_id = _to_int(entry.get('id'))
+            list_index = _to_int(entry.get('listIndex'))
+            close_time = entry.get('closeTime', 0) / 1000
+            rules = entry.get('gameRuleSet', {})
+            min_stake = rules.get('minStake', 0)
+            max_stake = rules.get('maxStake', 0)
+            stake_interval = rules.get('stakeInterval', 0)
+            for row in entry.get('rows', []):
+                event_id = _to_int(row.get('eventId'))
+                sport_id = _to_int(row.get('sportId'))
+                draw_type = self._code(row.get('type', ""), draw_types, draw_type_codes)
+                status = self._code(row.get('status', ""), statuses, status_codes)
+                market = _to_int(row.get('id'))
+                for comp in row.get('competitors', []):
+                    self.snapshot_time.append(snapshot_time)
+                    self.draw_id.append(draw_id)
+                    self.list_index.append(list_index)
+                    self.event_id.append(event_id)
+                    self.sport_id.append(sport_id)
+                    self.draw_type.append(draw_type)
+                    self.status.append(status)
+                    self.league.append(league)
+                    self.market.append(market)
+                    self.competitor.append(_to_int(comp.get('id')))
+                    self.name.append(self._code(comp.get('name', ""), names, name_codes))
+                    self.odds.append(int((comp.get('odds') or {}).get('odds') or 0))
+                    self.close_time.append(close_time)
+                    self.min_stake.append(min_stake)
+                    self.max_stake.append(max_stake)
+                    self.stake_interval.append(stake_interval)
+
+    def extend_games(self,  # pylint: disable=too-many-locals
+                     games: Iterable[Any],
+                     snapshot_time: float = 0.0):
+        """Append the outcomes of parsed games, e.g. the result of upcoming_events()
+
+        The competitor ids and odds are copied from the flat arrays shared
+        by the games, only the strings are encoded one by one.
+
+        Arguments:
+            games: the EBET games
+            snapshot_time: unix time when the games were fetched
+        """
+        codes = self._codes
+        for game in games:
+            competitors, first, count = game.competitor_slice
+            if not count:
+                continue
+            draw, rules = game.draw, game.draw.rule_set
+            draw_type = game.draw_type.value if game.draw_type is not None else ""
+            for column, typecode, value in (
+                ('snapshot_time', 'd', snapshot_time),
+                ('draw_id', 'q', _to_int(draw.draw_id)),
+                ('list_index', 'q', _to_int(draw.list_index)),
+                ('event_id', 'q', _to_int(game.event_id)),
+                ('sport_id', 'l', _to_int(game.sport_id)),
+                ('draw_type', 'B', self._code(draw_type, self.draw_types,
+                                              codes['draw_types'])),
+                ('status', 'B', self._code(game.status or "", self.statuses,
+                                           codes['statuses'])),
+                ('league', 'H', self._code(game.league or "", self.leagues, codes['leagues'])),
+                ('market', 'h', _to_int(game.market_id)),
+                ('close_time', 'd', draw.close_time.timestamp()),
+                ('min_stake', 'L', rules.min_stake),
+                ('max_stake', 'L', rules.max_stake),
+                ('stake_interval', 'L', rules.stake_interval),
+            ):
+                getattr(self, column).extend(array(typecode, (value, )) * count)
+            # the competitor ids of the games are unsigned, the odds 32 bit
+            self.competitor.fromlist(competitors.ids[first:first + count].tolist())
+            self.odds.fromlist(competitors.odds[first:first + count].tolist())
+            names, name_codes = self.names, codes['names']
+            self.name.extend(
+                self._code(name, names, name_codes)
+                for name in competitors.names[first:first + count])
+
+    def append_columns(self, other: 'OddsColumns'):
+        """Append the rows of another set of columns, re-encoding its strings"""
+        maps = {
+            column: [self._code(value, getattr(self, table), self._codes[table])
+                     for value in getattr(other, table)]
+            for column, table in STRING_TABLES
+        }
+        for column, _ in COLUMNS:
+            if column in maps:
+                code_map = maps[column]
+                getattr(self, column).extend(code_map[code] for code in getattr(other, column))
+            else:
+                getattr(self, column).extend(getattr(other, column))
+
+    def select(self, rows: Iterable[int]) -> 'OddsColumns':
+        """A new set of columns with only the given rows, sharing the string tables"""
+        rows = list(rows)
+        selected = OddsColumns()
+        for column, typecode in COLUMNS:
+            values = getattr(self, column)
+            setattr(selected, column, array(typecode, (values[row] for row in rows)))
+        selected.__setstate__({table: list(getattr(self, table)) for _, table in STRING_TABLES})
+        return selected
+
+    def snapshot_times(self) -> List[float]:
+        """The distinct snapshot times in the order of the rows"""
+        return list(dict.fromkeys(self.snapshot_time))
+
+    def row(self, index: int) -> Dict[str, Any]:
+        """A single row as a dictionary, strings decoded"""
+        data = {column: getattr(self, column)[index] for column, _ in COLUMNS}
+        for column, table in STRING_TABLES:
+            data[column] = getattr(self, table)[data[column]]
+        return data
+
+    def draw_type_code(self, draw_type: str) -> Optional[int]:
+        """The code of the draw type in the 'draw_type' column, None if not present"""
+        return self._codes['draw_types'].get(draw_type)
@@ -1,22 +1,226 @@
-"""Keep the endpoints separate"""
+"""Keep the endpoints separate
 
+Each endpoint is declared once in ENDPOINTS with its request policy:
 
+    - method and path template
+    - whether it needs the session of the account
+    - whether sending it again is safe, and how it is retried
+    - how long its response can be shared, for the SharedCache
+    - the priority of its requests when the client limits the requests in flight
+    - the parser of its response
+
+VeikkausClient._access_endpoint() applies the policy, so the client
+methods only pick the endpoint. The EndPoint instances are interned,
+asking for the same endpoint again returns the same instance.
+"""
+import heapq
+import importlib
+import itertools
+import threading
+import time
+from contextlib import contextmanager
 from datetime import date
+from enum import IntEnum
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from veikkaaja.types import GameTypes
+
+
+class Priority(IntEnum):
+    """The order of the waiting requests, the lowest first"""
+    # latency critical, the odds may change
+    WAGER = 0
+    ACCOUNT = 1
+    ODDS = 2
+    # rarely changing data, e.g. the sports and tournaments
+    REFERENCE = 3
+
+
+class RetryPolicy(NamedTuple):
+    """How many times a request is sent and the delays between the attempts"""
+    attempts: int = 1
+    # seconds before the first retry, doubled for each further retry
+    backoff: float = 0.1
+    # the statuses that are retried, connection errors are always retried
+    statuses: Tuple[int, ...] = (429, 500, 502, 503, 504)
+
+    def delay(self, attempt: int) -> float:
+        """Seconds to wait before the attempt, the first attempt is 0"""
+        return self.backoff * 2**(attempt - 1) if attempt else 0.0
+
+
+NO_RETRY = RetryPolicy()
+RETRY = RetryPolicy(attempts=3, backoff=0.2)
+# checking a wager places nothing, but a late check is worth less, so retry
+# once and quickly. A real wager is never resent: a timed out wager may
+# have been placed, and the pool wagers carry no requestId at all.
+WAGER_RETRY = RetryPolicy(attempts=2, backoff=0.05)
+
 
+class EndpointSpec(NamedTuple):
+    """The declared request policy of an endpoint"""
+    method: str
+    # formatted with the parameters of the endpoint
+    template: str
+    # needs the session of the account, the responses are never shared
+    authenticated: bool = False
+    # sending the request again does not change the result
+    idempotent: bool = True
+    retry: RetryPolicy = RETRY
+    # seconds the response can be shared, None for the default of the cache
+    ttl: Optional[float] = None
+    priority: Priority = Priority.REFERENCE
+    # 'module:function' parsing the json of the response
+    parser: Optional[str] = None
 
-class EndPoint:
+
+ENDPOINTS: Dict[str, EndpointSpec] = {
+    'login':
+        EndpointSpec("POST", "bff/v1/sessions", idempotent=False, retry=NO_RETRY,
+                     priority=Priority.ACCOUNT),
+    'account_info':
+        EndpointSpec("GET", "v1/players/self/account", authenticated=True,
+                     priority=Priority.ACCOUNT),
+    'account_betting_history':
+        EndpointSpec("GET", "v1/players/self/account/transactions", authenticated=True,
+                     priority=Priority.ACCOUNT,
+                     parser="veikkaaja.responses:parse_transaction_list"),
+    'wager_information':
+        EndpointSpec("GET", "ebet-wager-details/v1/tickets/{event_id}",
+                     authenticated=True, priority=Priority.ACCOUNT),
+    'games_info':
+        EndpointSpec("GET", "sport-open-games/v1/games/{game_type}/draws",
+                     priority=Priority.ODDS),
+    'closed_games_by_day':
+        EndpointSpec("GET", "ebet-results/v1/games/EBET/draws/by-day/{day}", ttl=60.0,
+                     parser="veikkaaja.responses:parse_closed_draws"),
+    'single_event_info':
+        EndpointSpec("GET", "v1/sports/events/{event_id}", priority=Priority.ODDS),
+    'single_draw_info':
+        EndpointSpec("GET", "odj/v2/sport-games/draws/{draw_id}", priority=Priority.ODDS),
+    'place_wager_test':
+        EndpointSpec("POST", "sport-interactive-wager/v1/tickets/check",
+                     authenticated=True, retry=WAGER_RETRY, priority=Priority.WAGER),
+    'place_wager':
+        EndpointSpec("POST", "sport-interactive-wager/v1/tickets", authenticated=True,
+                     idempotent=False, retry=NO_RETRY, priority=Priority.WAGER),
+    'sport_types':
+        EndpointSpec("GET", "v1/sports", ttl=3600.0),
+    'sport_categories':
+        EndpointSpec("GET", "v1/sports/{sport_id}", ttl=3600.0),
+    'sport_tournaments':
+        EndpointSpec("GET", "v1/sports/{sport_id}/categories/{sport_category_id}",
+                     ttl=3600.0),
+    'sport_tournament_info':
+        EndpointSpec(
+            "GET",
+            "v1/sports/{sport_id}/categories/{sport_category_id}/tournaments/{tournament_id}",
+            ttl=3600.0),
+}
+
+# the endpoints that are not declared, e.g. EndPoint("some/path")
+_UNDECLARED = EndpointSpec("GET", "")
+
+_parsers: Dict[str, Callable[[Any], Any]] = {}
+
+
+class EndPoint:  # pylint: disable=too-many-public-methods
     """Container for the API endpoints"""
 
     API_ENDPOINT = "https://www.veikkaus.fi/api"
 
-    def __init__(self, endpoint_suffix: str):
+    # (name, parameters) -> the interned instance
+    _interned: Dict[Tuple[str, Tuple[Tuple[str, Any], ...]], 'EndPoint'] = {}
+    # the interned endpoints with e.g. event ids are dropped after this many
+    MAX_INTERNED = 4096
+
+    def __init__(self, endpoint_suffix: str, spec: EndpointSpec = _UNDECLARED):
         """
         Arguments:
             endpoint_suffix: the part of the endpoint url
                 that comes after the API_ENDPOINT
+            spec: (optional) the request policy, by default a GET retried like
+                  the other public endpoints
         """
+        if spec.retry.attempts < 1:
+            raise ValueError(f"The retry policy of {endpoint_suffix} has no attempts")
         self.endpoint = endpoint_suffix
-        self.url = f"{self.API_ENDPOINT}/{self.endpoint}"
+        self.spec = spec
+        self._root = ""
+        self._url = ""
+
+    @classmethod
+    def get(cls, name: str, **parameters) -> 'EndPoint':
+        """The interned endpoint declared in ENDPOINTS
+
+        Arguments:
+            name: the name of the endpoint in ENDPOINTS
+            parameters: the values for the path template
+        """
+        key = (name, tuple(sorted(parameters.items())))
+        endpoint = cls._interned.get(key)
+        if endpoint is None:
+            spec = ENDPOINTS[name]
+            if len(cls._interned) >= cls.MAX_INTERNED:
+                cls._interned.clear()
+            endpoint = cls._interned.setdefault(
+                key, cls(spec.template.format(**parameters), spec))
+        return endpoint
+
+    @property
+    def url(self) -> str:
+        """The full url, follows changes to API_ENDPOINT"""
+        if self._root is not self.API_ENDPOINT:
+            self._url = f"{self.API_ENDPOINT}/{self.endpoint}"
+            self._root = self.API_ENDPOINT
+        return self._url
+
+    @property
+    def method(self) -> str:
+        """GET or POST"""
+        return self.spec.method
+
+    @property
+    def authenticated(self) -> bool:
+        """Whether the endpoint needs the session of the account"""
+        return self.spec.authenticated
+
+    @property
+    def idempotent(self) -> bool:
+        """Whether sending the request again is safe"""
+        return self.spec.idempotent
+
+    @property
+    def retry(self) -> RetryPolicy:
+        """How the failed requests are retried"""
+        return self.spec.retry if self.spec.idempotent else NO_RETRY
+
+    @property
+    def ttl(self) -> Optional[float]:
+        """Seconds the response can be shared, None for the default of the cache"""
+        return self.spec.ttl
+
+    @property
+    def priority(self) -> Priority:
+        """The priority of the requests"""
+        return self.spec.priority
+
+    @property
+    def cacheable(self) -> bool:
+        """Whether the responses can be shared between the clients"""
+        return self.spec.method == "GET" and not self.spec.authenticated
+
+    def parse(self, data: Any) -> Any:
+        """Parse the json of a response with the declared parser"""
+        if self.spec.parser is None:
+            raise ValueError(f"No parser declared for {self.endpoint}")
+        parser = _parsers.get(self.spec.parser)
+        if parser is None:
+            # imported on first use, the parsers import the client modules
+            module, function = self.spec.parser.split(":")
+            parser = getattr(importlib.import_module(module), function)
+            _parsers[self.spec.parser] = parser
+        return parser(data)
 
     def __repr__(self):
         """Only show the endpoint"""
@@ -25,19 +229,19 @@ class EndPoint:
     @classmethod
     def login_endpoint(cls):
         """place for initializing session v1/sessions"""
-        return cls("bff/v1/sessions")
+        return cls.get('login')
 
     @classmethod
     def account_info_endpoint(cls):
         """query account information v1/players/self/account"""
-        return cls("v1/players/self/account")
+        return cls.get('account_info')
 
     @classmethod
     def account_betting_history(cls):
         """query account information v1/players/self/account
         https://github.com/VeikkausOy/sport-games-robot/issues/95
         """
-        return cls("v1/players/self/account/transactions")
+        return cls.get('account_betting_history')
 
     @classmethod
     def wager_information(cls, event_id):
@@ -54,15 +258,15 @@ class EndPoint:
 
         See https://github.com/VeikkausOy/sport-games-robot/issues/16
         """
-        return cls(f"ebet-wager-details/v1/tickets/{event_id}")
+        return cls.get('wager_information', event_id=event_id)
 
     @classmethod
-    def games_info_endpoint(cls):
+    def games_info_endpoint(cls, game_type: GameTypes = GameTypes.EBET):
         """get info of upcoming games
         Used to be 'odj/v2/sport-games/draws' but it seems
         that the 'odj' was dropped at some point
         """
-        return cls("sport-open-games/v1/games/EBET/draws")
+        return cls.get('games_info', game_type=game_type.value)
 
     @classmethod
     def closed_games_by_day(cls, day: date):
@@ -73,50 +277,109 @@ class EndPoint:
         # a specific event:  return cls("ebet-results/v1/games/EBET/draws/2425549")
         # for specific date: return cls("ebet-results/v1/games/EBET/draws/by-day/2021-11-04")
         """
-        formatted_date = day.strftime("%Y-%m-%d")
-        return cls(f"ebet-results/v1/games/EBET/draws/by-day/{formatted_date}")
+        return cls.get('closed_games_by_day', day=day.strftime("%Y-%m-%d"))
 
     @classmethod
     def single_event_info_endpoint(cls, event_id: int):
         """get info of upcoming games"""
-        return cls(f"v1/sports/events/{event_id}")
+        return cls.get('single_event_info', event_id=event_id)
 
     @classmethod
     def single_draw_info_endpoint(cls, draw_id: int):
         """get info of upcoming games"""
-        return cls(f"odj/v2/sport-games/draws/{draw_id}")
+        return cls.get('single_draw_info', draw_id=draw_id)
 
     @classmethod
     def place_wager_test_endpoint(cls):
         """check if the placed bet is valid"""
-        return cls("sport-interactive-wager/v1/tickets/check")
+        return cls.get('place_wager_test')
         # return cls("v1/sport-games/wagers/check")
 
     @classmethod
     def place_wager_endpoint(cls):
         """check if the placed bet is valid"""
-        return cls("sport-interactive-wager/v1/tickets")
+        return cls.get('place_wager')
         # return cls("v1/sport-games/wagers")
 
     @classmethod
     def sport_type_code_endpoint(cls):
         """get available sport codes"""
-        return cls("v1/sports")
+        return cls.get('sport_types')
 
     @classmethod
     def sport_categories_endpoint(cls, sport_id: int):
         """get available categories for a sport"""
-        return cls(f"v1/sports/{sport_id}")
+        return cls.get('sport_categories', sport_id=sport_id)
 
     @classmethod
     def sport_tournaments_endpoint(cls, sport_id: int, sport_category_id: int):
         """get available tournaments for sport and category"""
-        return cls(f"v1/sports/{sport_id}/categories/{sport_category_id}")
+        return cls.get('sport_tournaments', sport_id=sport_id,
+                       sport_category_id=sport_category_id)
 
     @classmethod
     def sport_tournament_info_endpoint(cls, sport_id: int, sport_category_id: int,
                                        tournament_id: int):
         """get info for a specific sport, category, and tournament."""
-        return cls(
-            f"v1/sports/{sport_id}/categories/{sport_category_id}/tournaments/{tournament_id}"
-        )
+        return cls.get('sport_tournament_info', sport_id=sport_id,
+                       sport_category_id=sport_category_id, tournament_id=tournament_id)
+
+
+class RequestGate:
+    """Limit the requests in flight, the waiting requests go in the order of priority
+
+    Shared by the clients, e.g. a wager does not wait behind a burst of
+    taxonomy requests:
+
+        gate = RequestGate(limit=4)
+        client = VeikkausClient(gate=gate)
+
+    With a 'rate', the admitted requests are also spaced to at most 'rate'
+    requests per second over all the clients of the gate. The first
+    request in the order of priority waits for its start time in the
+    queue, not in flight, so a wager arriving meanwhile still goes first.
+    """
+
+    def __init__(self, limit: int, rate: Optional[float] = None):
+        """
+        Arguments:
+            limit: the most requests in flight at a time
+            rate: (optional) the most requests started per second
+        """
+        self.limit = limit
+        self.rate = rate
+        self._in_flight = 0
+        # (priority, sequence) of the waiting requests
+        self._waiting: List[Tuple[int, int]] = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+        # monotonic time when the next request may start
+        self._next_start = 0.0
+
+    @contextmanager
+    def admit(self, priority: Priority) -> Iterator[None]:
+        """Wait for the turn of the request"""
+        entry = (int(priority), next(self._sequence))
+        with self._condition:
+            heapq.heappush(self._waiting, entry)
+            while True:
+                if self._in_flight >= self.limit or self._waiting[0] != entry:
+                    self._condition.wait()
+                    continue
+                delay = self._next_start - time.monotonic() if self.rate else 0.0
+                if delay <= 0.0:
+                    break
+                # a request with a higher priority may take the turn meanwhile
+                self._condition.wait(delay)
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            if self.rate:
+                self._next_start = time.monotonic() + 1.0 / self.rate
+            # the next request may fit in too
+            self._condition.notify_all()
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._in_flight -= 1
+                self._condition.notify_all()
@@ -0,0 +1,149 @@
+"""Export the parsed responses to Apache Arrow, pandas and Parquet
+
+Requires the optional 'pyarrow' package, and 'pandas' for to_pandas()
+(pip install veikkaaja[arrow] or veikkaaja[pandas]):
+
+    games = client.upcoming_events(GameTypes.EBET)
+    frame = to_pandas(games)
+    write_parquet(client.get_betting_history(), "history.parquet")
+
+The EBET games are exported through OddsColumns, a row for each
+competitor of each market. The arrays of OddsColumns are copied into the
+Arrow buffers by default. With to_arrow(columns, copy=False) Arrow shares
+the memory of the arrays instead, and the columns cannot be extended (an
+array with an exported buffer raises BufferError on resize) until the
+table is released. The string columns become dictionary arrays (pandas
+categoricals) over the string tables. The transactions of
+get_betting_history() and the results of closed_games() are small and
+exported a column at a time. The times are unix seconds in OddsColumns
+and timestamps otherwise.
+"""
+from array import array
+from pathlib import Path
+from typing import Any, Dict, Sequence, Union
+
+from veikkaaja.columnar import COLUMNS, STRING_TABLES, OddsColumns
+from veikkaaja.responses import MarketResult, Wager
+
+try:
+    import pyarrow  # type: ignore
+    import pyarrow.parquet  # type: ignore
+except ImportError:
+    pyarrow = None
+
+try:
+    import pandas  # type: ignore # pylint: disable=unused-import
+except ImportError:
+    pandas = None
+
+Exportable = Union[OddsColumns, Sequence[Any]]
+
+
+def _require_pyarrow():
+    if pyarrow is None:
+        raise RuntimeError("Exporting requires the 'pyarrow' package")
+
+
+def _arrow_type(values: array):
+    """The Arrow type with the memory layout of the array"""
+    if values.typecode == 'd':
+        return pyarrow.float64()
+    if values.typecode == 'f':
+        return pyarrow.float32()
+    bits = values.itemsize * 8
+    if values.typecode.isupper():
+        return getattr(pyarrow, f"uint{bits}")()
+    return getattr(pyarrow, f"int{bits}")()
+
+
+def _arrow_array(values: array, copy: bool):
+    """An Arrow array of the array, over its own buffer when not copied"""
+    buffer = pyarrow.py_buffer(values.tobytes() if copy else values)
+    return pyarrow.Array.from_buffers(_arrow_type(values), len(values), [None, buffer])
+
+
+def _columns_table(columns: OddsColumns, copy: bool):
+    tables = dict(STRING_TABLES)
+    data: Dict[str, Any] = {}
+    for column, _ in COLUMNS:
+        values = _arrow_array(getattr(columns, column), copy)
+        if column in tables:
+            values = pyarrow.DictionaryArray.from_arrays(
+                values, pyarrow.array(getattr(columns, tables[column]), pyarrow.string()))
+        data[column] = values
+    return pyarrow.table(data)
+
+
+def _transactions_table(wagers: Sequence[Wager]):
+    return pyarrow.table({
+        'external_id': pyarrow.array([wager.external_id for wager in wagers],
+                                     pyarrow.string()),
+        'id': pyarrow.array([wager.id for wager in wagers], pyarrow.int64()),
+        'accounting_date': pyarrow.array([wager.accounting_date for wager in wagers],
+                                         pyarrow.timestamp('ms')),
+        'amount': pyarrow.array([wager.amount for wager in wagers], pyarrow.int64()),
+        'result': pyarrow.array([wager.result.value for wager in wagers],
+                                pyarrow.string()).dictionary_encode(),
+        'product': pyarrow.array([wager.product.value for wager in wagers],
+                                 pyarrow.string()).dictionary_encode(),
+    })
+
+
+def _results_table(results: Sequence[MarketResult]):
+    return pyarrow.table({
+        'draw_id': pyarrow.array([result.draw_id for result in results], pyarrow.int64()),
+        'market': pyarrow.array([result.market for result in results], pyarrow.int64()),
+        'winners': pyarrow.array([list(result.winners) for result in results],
+                                 pyarrow.list_(pyarrow.int64())),
+        'cancelled': pyarrow.array([result.cancelled for result in results],
+                                   pyarrow.bool_()),
+    })
+
+
+def to_arrow(data: Exportable, copy: bool = True):
+    """An Arrow table of the parsed data
+
+    Arguments:
+        data: OddsColumns, or the result of upcoming_events(GameTypes.EBET),
+              get_betting_history() or closed_games()
+        copy: copy the arrays of OddsColumns, False to share them with the
+              table, the columns cannot be extended while the table is alive
+    """
+    _require_pyarrow()
+    if isinstance(data, OddsColumns):
+        return _columns_table(data, copy)
+    if not data:
+        return pyarrow.table({})
+
+    first = data[0]
+    if isinstance(first, Wager):
+        return _transactions_table(data)
+    if isinstance(first, MarketResult):
+        return _results_table(data)
+    if hasattr(first, 'draw') and hasattr(first, 'market_id'):
+        columns = OddsColumns()
+        columns.extend_games(data)
+        # the columns are only used by the table
+        return _columns_table(columns, copy=False)
+    raise TypeError(f"Cannot export {type(first).__name__}")
+
+
+def to_pandas(data: Exportable, copy: bool = True):
+    """A pandas DataFrame of the parsed data, see to_arrow()"""
+    if pandas is None:
+        raise RuntimeError("Exporting to pandas requires the 'pandas' package")
+    return to_arrow(data, copy).to_pandas()
+
+
+def write_parquet(data: Exportable, path: Union[str, Path], compression: str = 'zstd'):
+    """Write the parsed data to a Parquet file, see to_arrow()
+
+    Arguments:
+        data: the data to write
+        path: the Parquet file
+        compression: the compression codec of the file
+    """
+    _require_pyarrow()
+    # the table is released once written, the arrays need no copy
+    pyarrow.parquet.write_table(to_arrow(data, copy=False), str(path),
+                                compression=compression)
@@ -0,0 +1,237 @@
+"""Push the changes of the EBET feed to subscribers
+
+The FeedPublisher polls the upcoming games and compares each poll to the
+previous one, once, however many subscribers there are. The changes are
+delivered as typed events to callbacks or asyncio queues:
+
+    publisher = FeedPublisher(client)
+    publisher.subscribe(print, sport_id=1, events=(OddsChanged,))
+    publisher.subscribe(queue=asyncio_queue, league="Valioliiga")
+    publisher.run(interval=30)
+
+The subscriptions are indexed by their most selective filter (row_id,
+league, sport, draw type), so delivering an event only visits the
+subscriptions that can match it. A raising callback or a failed poll is
+logged, the other subscribers and the next polls go on.
+"""
+import asyncio
+import threading
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence,
+                    Tuple, Union)
+
+from veikkaaja import logger
+from veikkaaja.types import GameTypes
+
+
+class GameOpened(NamedTuple):
+    """A new market appeared in the feed"""
+    game: Any
+
+
+class GameClosed(NamedTuple):
+    """The market is no longer in the feed, 'game' is its last state"""
+    game: Any
+
+
+class OddsChanged(NamedTuple):
+    """The odds of a market changed, in hundredths in the order of the competitors"""
+    game: Any
+    previous: Tuple[int, ...]
+    odds: Tuple[int, ...]
+
+
+class StatusChanged(NamedTuple):
+    """The status of a market changed, e.g. from OPEN to SUSPENDED"""
+    game: Any
+    previous: str
+    status: str
+
+
+FeedEvent = Union[GameOpened, GameClosed, OddsChanged, StatusChanged]
+
+# the filters in the order of their selectivity
+_FILTERS = ('row_id', 'league', 'sport_id', 'draw_type')
+
+
+def _game_value(game, name: str) -> Optional[str]:
+    """The value of the filtered attribute as a string"""
+    value = getattr(game, name)
+    if name == 'draw_type':
+        return None if value is None else value.value
+    return str(value)
+
+
+def _filter_value(name: str, value) -> str:
+    if name == 'draw_type' and not isinstance(value, str):
+        return value.value
+    return str(value)
+
+
+class Subscription:
+    """A subscriber and its filters"""
+
+    def __init__(self,
+                 filters: Dict[str, str],
+                 events: Optional[Tuple[type, ...]],
+                 callback: Optional[Callable[[FeedEvent], Any]],
+                 queue: Optional[asyncio.Queue],
+                 loop: Optional[asyncio.AbstractEventLoop]):
+        self.filters = filters
+        self.events = events
+        self.callback = callback
+        self.queue = queue
+        self.loop = loop
+
+    def matches(self, event: FeedEvent, values: Dict[str, Optional[str]]) -> bool:
+        """Whether the event passes every filter"""
+        if self.events is not None and not isinstance(event, self.events):
+            return False
+        return all(values[name] == value for name, value in self.filters.items())
+
+    def deliver(self, event: FeedEvent):
+        """Call the callback or put the event to the queue"""
+        if self.callback is not None:
+            self.callback(event)
+        if self.queue is not None:
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.queue.put_nowait, event)
+            else:
+                self.queue.put_nowait(event)
+
+
+class FeedPublisher:
+    """Compute the changes between polls and deliver them to the subscribers"""
+
+    def __init__(self, client=None, taxonomy=None):
+        """
+        Arguments:
+            client: (optional) the VeikkausClient to poll, not needed with publish()
+            taxonomy: (optional) a crawled taxonomy for filtering by league
+        """
+        self.client = client
+        self.taxonomy = taxonomy
+        # (row id, market id) -> (game, odds, status)
+        self._state: Dict[Tuple[Any, Any], Tuple[Any, Tuple[int, ...], str]] = {}
+        # filter name -> filter value -> subscriptions
+        self._index: Dict[str, Dict[str, List[Subscription]]] = {
+            name: {} for name in _FILTERS
+        }
+        self._unfiltered: List[Subscription] = []
+        self._lock = threading.Lock()
+
+    def subscribe(self,  # pylint: disable=too-many-arguments
+                  callback: Optional[Callable[[FeedEvent], Any]] = None,
+                  queue: Optional[asyncio.Queue] = None,
+                  loop: Optional[asyncio.AbstractEventLoop] = None,
+                  events: Optional[Sequence[type]] = None,
+                  **filters) -> Subscription:
+        """Receive the events passing the filters
+
+        Arguments:
+            callback: (optional) called with each event on the polling thread
+            queue: (optional) an asyncio queue to put the events to
+            loop: (optional) the event loop of the queue, by default the running loop
+            events: (optional) the event types to receive, by default all
+            filters: any of row_id, league, sport_id and draw_type
+        """
+        unknown = set(filters) - set(_FILTERS)
+        if unknown:
+            raise ValueError(f"Unknown filters {sorted(unknown)}, use {_FILTERS}")
+        if callback is None and queue is None:
+            raise ValueError("Subscribe with a callback or a queue")
+        if queue is not None and loop is None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                loop = None
+
+        subscription = Subscription(
+            {name: _filter_value(name, value) for name, value in filters.items()},
+            None if events is None else tuple(events), callback, queue, loop)
+
+        with self._lock:
+            self._bucket(subscription).append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        """Stop delivering events to the subscription"""
+        with self._lock:
+            bucket = self._bucket(subscription)
+            if subscription in bucket:
+                bucket.remove(subscription)
+
+    def _bucket(self, subscription: Subscription) -> List[Subscription]:
+        for name in _FILTERS:
+            if name in subscription.filters:
+                return self._index[name].setdefault(subscription.filters[name], [])
+        return self._unfiltered
+
+    def poll(self, game_type: GameTypes = GameTypes.EBET) -> List[FeedEvent]:
+        """Fetch the upcoming games and publish the changes"""
+        games = self.client.upcoming_events(game_type, taxonomy=self.taxonomy)
+        if not games:
+            # a failed request is not every game closing
+            logger.warning("No games in the poll, not publishing changes")
+            return []
+        return self.publish(games)
+
+    def changes(self, games: Iterable[Any]) -> List[FeedEvent]:
+        """The events since the previous games, updating the state"""
+        events: List[FeedEvent] = []
+        previous_state = self._state
+        state = {}
+        for game in games:
+            key = (game.row_id, game.market_id)
+            odds = tuple(game.odds)
+            state[key] = (game, odds, game.status)
+
+            previous = previous_state.get(key)
+            if previous is None:
+                events.append(GameOpened(game))
+                continue
+            if previous[1] != odds:
+                events.append(OddsChanged(game, previous[1], odds))
+            if previous[2] != game.status:
+                events.append(StatusChanged(game, previous[2], game.status))
+
+        for key, previous in previous_state.items():
+            if key not in state:
+                events.append(GameClosed(previous[0]))
+
+        self._state = state
+        return events
+
+    def publish(self, games: Iterable[Any]) -> List[FeedEvent]:
+        """Deliver the changes since the previous games to the subscribers"""
+        events = self.changes(games)
+        with self._lock:
+            index = {name: dict(buckets) for name, buckets in self._index.items()}
+            unfiltered = list(self._unfiltered)
+
+        for event in events:
+            values = {name: _game_value(event.game, name) for name in _FILTERS}
+            candidates = list(unfiltered)
+            for name in _FILTERS:
+                value = values[name]
+                if value is not None and value in index[name]:
+                    candidates.extend(index[name][value])
+            for subscription in candidates:
+                if subscription.matches(event, values):
+                    try:
+                        subscription.deliver(event)
+                    except Exception:  # pylint: disable=broad-except
+                        logger.exception("Delivering %s failed", type(event).__name__)
+        return events
+
+    def run(self,
+            interval: float,
+            stop: Optional[threading.Event] = None,
+            game_type: GameTypes = GameTypes.EBET):
+        """Poll every 'interval' seconds until 'stop' is set"""
+        stop = threading.Event() if stop is None else stop
+        while not stop.is_set():
+            try:
+                self.poll(game_type)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Polling the feed failed")
+            stop.wait(interval)
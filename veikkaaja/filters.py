@@ -0,0 +1,95 @@
+"""Filter the EBET draws while they are parsed
+
+Most bots only bet on a part of the feed. A GameFilter passed to
+upcoming_events() is checked against the raw draws of the response, so
+the draws and markets it rejects are never parsed into games and their
+competitors are never decoded:
+
+    where = GameFilter(sport_ids=[1], draw_types=[EBETType.ONE_X_TWO],
+                       closes_before=datetime.now() + timedelta(hours=6))
+    games = client.upcoming_events(GameTypes.EBET, where=where)
+
+The close time is checked first, from the draw, then the sport, the
+type and the status of each market (row). Each given condition has to
+match, the conditions left out match everything.
+"""
+from datetime import datetime
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Union
+
+
+def _milliseconds(moment: Optional[datetime]) -> Optional[int]:
+    """The time as the unix milliseconds of the raw draws"""
+    return None if moment is None else int(moment.timestamp() * 1000)
+
+
+class GameFilter:
+    """Conditions on the EBET markets, checked before the markets are parsed"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 sport_ids: Optional[Iterable[Union[str, int]]] = None,
+                 draw_types: Optional[Iterable[Any]] = None,
+                 statuses: Optional[Iterable[str]] = None,
+                 closes_after: Optional[datetime] = None,
+                 closes_before: Optional[datetime] = None):
+        """
+        Arguments:
+            sport_ids: (optional) the sports of the markets, e.g. 1 for football
+            draw_types: (optional) the EBETTypes of the markets, or their values
+            statuses: (optional) the statuses of the markets, e.g. "OPEN"
+            closes_after: (optional) the earliest close time
+            closes_before: (optional) the latest close time
+        """
+        # the ids are strings in the response
+        self.sport_ids: Optional[FrozenSet[str]] = None
+        if sport_ids is not None:
+            self.sport_ids = frozenset(str(sport_id) for sport_id in sport_ids)
+        self.draw_types: Optional[FrozenSet[str]] = None
+        if draw_types is not None:
+            self.draw_types = frozenset(
+                getattr(draw_type, 'value', draw_type) for draw_type in draw_types)
+        self.statuses = None if statuses is None else frozenset(statuses)
+        self.closes_after = closes_after
+        self.closes_before = closes_before
+        self._after = _milliseconds(closes_after)
+        self._before = _milliseconds(closes_before)
+
+    def __repr__(self):
+        conditions = ", ".join(
+            f"{name}={value!r}" for name, value in (
+                ('sport_ids', self.sport_ids), ('draw_types', self.draw_types),
+                ('statuses', self.statuses), ('closes_after', self.closes_after),
+                ('closes_before', self.closes_before)) if value is not None)
+        return f"{self.__class__.__name__}({conditions})"
+
+    def accepts_draw(self, entry: Dict[str, Any]) -> bool:
+        """Whether any market of the raw draw can match, from the close time"""
+        if self._after is None and self._before is None:
+            return True
+        close_time = entry.get('closeTime', 0)
+        if self._after is not None and close_time < self._after:
+            return False
+        return self._before is None or close_time <= self._before
+
+    def accepts_row(self, row: Dict[str, Any]) -> bool:
+        """Whether the raw market (row) of an accepted draw matches"""
+        if self.sport_ids is not None and str(row.get('sportId')) not in self.sport_ids:
+            return False
+        if self.draw_types is not None and row.get('type') not in self.draw_types:
+            return False
+        return self.statuses is None or row.get('status') in self.statuses
+
+    def matches(self, game: Any) -> bool:
+        """Whether an already parsed game matches"""
+        close_time = game.close_time
+        if self.closes_after is not None and close_time < self.closes_after:
+            return False
+        if self.closes_before is not None and close_time > self.closes_before:
+            return False
+        if self.sport_ids is not None and str(game.sport_id) not in self.sport_ids:
+            return False
+        if self.draw_types is not None and (game.draw_type is None or
+                                            game.draw_type.value not in self.draw_types):
+            return False
+        return self.statuses is None or game.status in self.statuses
@@ -0,0 +1,119 @@
+"""Keep the account balance locally between the balance requests
+
+Checking the bankroll before each bet with VeikkausClient.get_balance()
+costs a request per bet. The AccountLedger fetches the balance once and
+keeps it up to date from the client's own actions:
+
+    ledger = AccountLedger(client, reconcile_interval=60)
+    if ledger.can_afford(wager.price):
+        client.send_wager(wager, test=False)
+
+    - the price of every accepted wager is deducted right away
+    - the wins in get_betting_history() results are added
+    - the purchases in the history that are not our bets, e.g. bets made
+      on the web site, mark the ledger stale
+
+The ledger is fetched again from the server 'reconcile_interval' seconds
+after the previous fetch, and on the next read after a rejected wager or
+a mismatch with the history. Bets on the test endpoint are not deducted.
+"""
+import threading
+import time
+from datetime import datetime
+from typing import Iterable, Optional, Set
+
+from veikkaaja import logger
+from veikkaaja.responses import TransActionType, Wager
+
+
+class AccountLedger:
+    """The usable balance of the account, in cents"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, client, reconcile_interval: Optional[float] = 60.0):
+        """Attach the ledger to the client
+
+        Arguments:
+            client: the VeikkausClient, its bets and history update the ledger
+            reconcile_interval: (optional) seconds before fetching the balance again,
+                                None to only fetch on a mismatch
+        """
+        self.client = client
+        self.reconcile_interval = reconcile_interval
+        self._balance = 0
+        # our deducted bets that have not been seen in the history
+        self._unconfirmed = 0
+        self._seen: Set[int] = set()
+        self._synced_at = 0.0
+        self._stale = True
+        self._lock = threading.RLock()
+        client.ledger = self
+
+    def synced(self, balance: int):
+        """The server reported the usable balance in cents"""
+        with self._lock:
+            if not self._stale and balance != self._balance:
+                logger.warning("Ledger was off by %s € from the account balance",
+                               (balance - self._balance) / 100)
+            self._balance = balance
+            self._unconfirmed = 0
+            self._synced_at = time.time()
+            self._stale = False
+
+    def refresh(self) -> int:
+        """Fetch the balance from the server"""
+        # get_balance() calls synced()
+        self.client.get_balance('usableBalance')
+        return self._balance
+
+    def _needs_refresh(self) -> bool:
+        if self._stale:
+            return True
+        if self.reconcile_interval is None:
+            return False
+        return time.time() - self._synced_at >= self.reconcile_interval
+
+    @property
+    def balance(self) -> int:
+        """The usable balance in cents, fetched if the ledger is stale"""
+        with self._lock:
+            if self._needs_refresh():
+                self.refresh()
+            return self._balance
+
+    def can_afford(self, price: int) -> bool:
+        """Whether the balance covers the price in cents"""
+        return price <= self.balance
+
+    def record_wager(self, price: int, accepted: bool):
+        """A wager was sent to the real endpoint"""
+        with self._lock:
+            if accepted:
+                self._balance -= price
+                self._unconfirmed += price
+            else:
+                # e.g. the balance did not cover the wager
+                self._stale = True
+
+    def record_transactions(self, wagers: Iterable[Wager]):
+        """Apply the transactions of the history that happened after the last fetch"""
+        with self._lock:
+            synced_at = datetime.fromtimestamp(self._synced_at)
+            for wager in wagers:
+                if wager.id in self._seen:
+                    continue
+                self._seen.add(wager.id)
+                if wager.accounting_date < synced_at:
+                    # already in the fetched balance
+                    continue
+
+                amount = abs(wager.amount)
+                if wager.result == TransActionType.WIN:
+                    self._balance += amount
+                elif wager.result == TransActionType.BUY:
+                    if amount <= self._unconfirmed:
+                        self._unconfirmed -= amount
+                    else:
+                        logger.info("A purchase of %s € not made by this client", amount / 100)
+                        self._stale = True
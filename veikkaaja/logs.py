@@ -0,0 +1,202 @@
+"""Log formatting and an optional non-blocking logging pipeline
+
+By default the 'veikkaaja' logger formats and writes its records to stdout
+in the thread that logs them. With the queue pipeline enabled, the logging
+thread only puts the record in a bounded queue, and a background listener
+formats and writes them. When the queue is full, records are dropped
+instead of blocking the caller.
+
+    from veikkaaja.logs import enable_queue_logging
+
+    enable_queue_logging(structured=True, sample={'response_ok': 100})
+
+or set the environment variables before importing veikkaaja
+
+    export VEIKKAAJA_LOG_QUEUE=1
+    export VEIKKAAJA_LOG_JSON=1
+
+The records of API requests carry an 'event' name ('sending', 'response_ok',
+'request_failed'), a 'request_id' and the request timing 'elapsed_ms'.
+The human readable output colors the records by the event name and the
+structured output writes them as json fields.
+"""
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import time
+from typing import Dict, Iterator, List, Optional, TextIO
+
+# record attributes written out by the JsonFormatter
+STRUCTURED_FIELDS = ('event', 'request_id', 'method', 'url', 'status', 'elapsed_ms')
+
+EVENT_COLORS = {
+    'sending': "\033[93m",
+    'response_ok': "\033[92m",
+    'request_failed': "\033[91m",
+}
+RESET_COLOR = "\033[0m"
+
+
+class NiceFormatter(logging.Formatter):
+    """Format: [  INFO ] 2020-10-17 10:42:41 | The message."""
+
+    def __init__(self, *args, color=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.color = color
+        self._formatted_second = -1
+        self._formatted_time = ""
+
+    def format(self, record):
+        # the timestamp has a resolution of a second, format it once per second
+        second = int(record.created)
+        if second != self._formatted_second:
+            self._formatted_time = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+            self._formatted_second = second
+        record.current_time = self._formatted_time
+
+        formatted = super().format(record)
+        color = EVENT_COLORS.get(getattr(record, 'event', None), "") if self.color else ""
+        if color:
+            return f"{color}{formatted}{RESET_COLOR}"
+        return formatted
+
+
+class JsonFormatter(logging.Formatter):
+    """Format the records as single line json objects"""
+
+    def format(self, record):
+        data = {
+            'time': record.created,
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                data[field] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # formatted by the NonBlockingQueueHandler before queueing
+            data['exception'] = record.exc_text
+        return json.dumps(data)
+
+
+class SamplingFilter(logging.Filter):
+    """Pass only every Nth record of frequent events
+
+    Arguments:
+        rates: mapping from the record 'event' to N, records
+               without a listed event are always passed
+    """
+
+    def __init__(self, rates: Dict[str, int]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._counters: Dict[str, Iterator[int]] = {
+            event: itertools.count()
+            for event in rates
+        }
+
+    def filter(self, record):
+        event = getattr(record, 'event', None)
+        counter = self._counters.get(event) if event else None
+        if counter is None:
+            return True
+        return next(counter) % self.rates[event] == 0
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """A queue handler that drops records instead of waiting for room
+
+    Unlike the standard QueueHandler, the record is not formatted
+    before it is queued, the listener thread does the formatting.
+    """
+
+    def __init__(self, record_queue: queue.Queue):
+        super().__init__(record_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # the traceback object is only valid in the logging thread
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class _Pipeline:
+    """The state of the enabled queue pipeline"""
+    listener: Optional[logging.handlers.QueueListener] = None
+    handler: Optional[NonBlockingQueueHandler] = None
+    replaced_handlers: List[logging.Handler] = []
+
+
+def enable_queue_logging(structured=False,
+                         sample: Optional[Dict[str, int]] = None,
+                         queue_size=10000,
+                         stream: Optional[TextIO] = None) -> logging.handlers.QueueListener:
+    """Move formatting and writing the 'veikkaaja' log records off the logging thread
+
+    Arguments:
+        structured: write the records as json instead of the colored text
+        sample: (optional) pass only every Nth record of these events,
+                e.g. {'response_ok': 100}
+        queue_size: the number of records kept waiting for the listener,
+                    records are dropped when the queue is full
+        stream: where to write the records, default is stdout
+    """
+    disable_queue_logging()
+
+    logger = logging.getLogger('veikkaaja')
+
+    output = logging.StreamHandler(sys.stdout if stream is None else stream)
+    if structured:
+        output.setFormatter(JsonFormatter())
+    else:
+        output.setFormatter(NiceFormatter(fmt="[%(levelname)7s ] %(current_time)s | %(message)s"))
+
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    if sample:
+        handler.addFilter(SamplingFilter(sample))
+    listener = logging.handlers.QueueListener(handler.queue, output)
+
+    _Pipeline.replaced_handlers = list(logger.handlers)
+    for replaced in _Pipeline.replaced_handlers:
+        logger.removeHandler(replaced)
+    logger.addHandler(handler)
+
+    _Pipeline.listener = listener
+    _Pipeline.handler = handler
+    listener.start()
+    return listener
+
+
+def disable_queue_logging():
+    """Flush the queued records and restore the synchronous handlers"""
+    if _Pipeline.listener is None:
+        return
+
+    logger = logging.getLogger('veikkaaja')
+    logger.removeHandler(_Pipeline.handler)
+    _Pipeline.listener.stop()
+    for handler in _Pipeline.replaced_handlers:
+        logger.addHandler(handler)
+
+    _Pipeline.listener = None
+    _Pipeline.handler = None
+    _Pipeline.replaced_handlers = []
+
+
+atexit.register(disable_queue_logging)
@@ -0,0 +1,142 @@
+"""Match team names of external data sources to the Veikkaus names
+
+The external feeds name the teams differently from the Veikkaus feed,
+e.g. "Edinburgh City" is "Edinburgh C" in the EBET draws. The TeamMatcher
+keeps an inverted index from the trigrams of the normalized names to the
+names, a query only visits the names sharing a trigram with it:
+
+    matcher = TeamMatcher()
+    matcher.add_games(client.upcoming_events(GameTypes.EBET))
+    matcher.add_teams(client.sport_tournament_info(1, 2, 1))
+
+    matcher.query("Edinburgh City", k=3)
+    # [Match(name='Edinburgh C', score=0.81, keys=('101152897',))]
+
+The score is the Dice coefficient of the trigram sets, 1.0 for names
+that are equal after normalization. New names can be added at any time.
+"""
+import heapq
+import unicodedata
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from veikkaaja.veikkaus_client import EBETType
+
+# the markets whose first and last competitors are the home and away teams
+MATCH_MARKETS = (EBETType.ONE_X_TWO, EBETType.ONE_TWO)
+
+
+class Match(NamedTuple):
+    """A candidate name for a query"""
+    name: str
+    score: float
+    # what was added with the name, e.g. the event ids of the games
+    keys: Tuple[Hashable, ...]
+
+
+def normalize(name: str) -> str:
+    """Lowercase, without accents and punctuation"""
+    decomposed = unicodedata.normalize('NFKD', name.casefold())
+    letters = ''.join(char if char.isalnum() else ' ' for char in decomposed
+                      if not unicodedata.combining(char))
+    return ' '.join(letters.split())
+
+
+def trigrams(normalized: str) -> Set[str]:
+    """The trigrams of a normalized name, padded to weigh the word starts"""
+    padded = f"  {normalized} "
+    return {padded[index:index + 3] for index in range(len(padded) - 2)}
+
+
+class TeamMatcher:
+    """A trigram index over team names"""
+
+    def __init__(self):
+        self.names: List[str] = []
+        # the trigram count of each name
+        self._sizes = array('H')
+        self._keys: List[List[Hashable]] = []
+        self._ids: Dict[str, int] = {}
+        self._postings: Dict[str, array] = {}
+
+    def __len__(self):
+        return len(self.names)
+
+    def add(self, name: str, key: Hashable = None) -> int:
+        """Add a name to the index, returns the id of the name
+
+        Arguments:
+            name: the team name
+            key: (optional) anything to return with the matches of the name
+        """
+        normalized = normalize(name)
+        name_id = self._ids.get(normalized)
+        if name_id is None:
+            name_id = self._ids[normalized] = len(self.names)
+            grams = trigrams(normalized)
+            self.names.append(name)
+            self._sizes.append(len(grams))
+            self._keys.append([])
+            for gram in grams:
+                self._postings.setdefault(gram, array('I')).append(name_id)
+
+        if key is not None and key not in self._keys[name_id]:
+            self._keys[name_id].append(key)
+        return name_id
+
+    def add_games(self, games: Iterable[Any]):
+        """Add the home and away teams of parsed EBET games, keyed by the event id
+
+        Only the 1X2 and 12 markets name the teams, the competitors of
+        e.g. the handicap, over/under and outright markets are skipped,
+        as is the draw (X) of the 1X2 markets.
+        """
+        for game in games:
+            if game.draw_type not in MATCH_MARKETS:
+                continue
+            for name in (game.home_team, game.away_team):
+                if normalize(name):
+                    self.add(name, game.event_id)
+
+    def add_teams(self, tournament: Dict[str, Any]):
+        """Add the teams of VeikkausClient.sport_tournament_info(), keyed by the team id"""
+        for team in tournament.get('teams', []) if tournament else []:
+            for name in (team.get('name'), team.get('shortName')):
+                if name:
+                    self.add(name, team.get('id'))
+
+    def query(self, name: str, k: int = 5, min_score: float = 0.3) -> List[Match]:
+        """The best matching names, best first
+
+        Arguments:
+            name: the name to look up
+            k: the maximum number of matches
+            min_score: leave out matches scoring below this
+        """
+        normalized = normalize(name)
+        if not normalized:
+            return []
+        grams = trigrams(normalized)
+
+        common: Dict[int, int] = defaultdict(int)
+        postings = self._postings
+        for gram in grams:
+            if gram in postings:
+                for name_id in postings[gram]:
+                    common[name_id] += 1
+
+        size = len(grams)
+        sizes = self._sizes
+        best = heapq.nlargest(k, ((2 * count / (size + sizes[name_id]), -name_id)
+                                  for name_id, count in common.items()))
+
+        return [
+            Match(self.names[-name_id], score, tuple(self._keys[-name_id]))
+            for score, name_id in best if score >= min_score
+        ]
+
+    def best(self, name: str, min_score: float = 0.5) -> Optional[Match]:
+        """The best match, None if no name scores at least 'min_score'"""
+        matches = self.query(name, k=1, min_score=min_score)
+        return matches[0] if matches else None
@@ -0,0 +1,145 @@
+"""Precompiled wager payloads
+
+VeikkausClient.ebet_payload() builds the nested payload dictionaries
+that are then serialized by requests. When placing hundreds of bets
+at once, the builder in this module skips the intermediate dictionaries
+and formats the payload bytes directly from a template.
+
+Each built wager carries a 'requestId', which identifies the wager e.g.
+to the ticket monitor. Sending the same PreparedWager again sends the
+same 'requestId', but the client does not rely on the API rejecting the
+duplicate: a real wager is never resent automatically.
+"""
+import json
+import operator
+import uuid
+from typing import Iterable, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from veikkaaja.types import BetDecision, BetTarget, GameTypes, competitor_id
+
+# list index, bet target (or a raw competitor id) and the stake in cents
+Selection = Tuple[Union[str, int], Union[BetTarget, int], int]
+
+
+class PreparedWager(NamedTuple):
+    """A serialized wager, ready to be sent to the API"""
+    request_id: str
+    # total price in cents
+    price: int
+    # the json payload
+    body: bytes
+    # number of bets in the wager
+    size: int
+
+
+def check_primary(games: Iterable) -> None:
+    """Raise a ValueError for a game that is not the first market of its draw
+
+    The selections name only the 'listIndex' of the draw, not the market
+    (row), so a bet on e.g. the handicap market of a draw would go to
+    the first market instead.
+    """
+    for game in games:
+        if not game.primary:
+            raise ValueError(f"Only the first market of a draw can be bet, market "
+                             f"{game.market_id} of draw {game.list_index} is not")
+
+
+def new_request_id() -> str:
+    """A unique idempotency key for a wager"""
+    return uuid.uuid4().hex
+
+
+class EbetPayloadBuilder:
+    """Serialize EBET wagers from a precompiled template
+
+    The output is the same payload as VeikkausClient.ebet_payload()
+    with an additional 'requestId':
+
+        {"gameName":"EBET","requestId":"...","price":200,"boards":[
+            {"betType":"normal","stake":100,"selections":[
+                {"listIndex":"6752","competitors":[1],"stake":100}]},
+            ...]}
+    """
+
+    _HEADER = '{"gameName":%s,"requestId":%s,"price":%d,"boards":['
+    _BOARD = ('{"betType":"normal","stake":%d,"selections":'
+              '[{"listIndex":%s,"competitors":[%d],"stake":%d}]}')
+    _FOOTER = ']}'
+    # the encoded list indices are dropped after this many
+    MAX_ENCODED = 4096
+
+    def __init__(self, game_type: GameTypes = GameTypes.EBET):
+        self._game_name = json.dumps(game_type.value)
+        # list indices repeat over bursts, keep their json encoding around
+        self._encoded_indices: dict = {}
+
+    def _encode_list_index(self, list_index: Union[str, int]) -> str:
+        """json encode the list index, the API sends them as strings"""
+        encoded = self._encoded_indices.get(list_index)
+        if encoded is None:
+            encoded = json.dumps(list_index)
+            if len(self._encoded_indices) >= self.MAX_ENCODED:
+                self._encoded_indices.clear()
+            self._encoded_indices[list_index] = encoded
+        return encoded
+
+    def build(self,
+              list_indices: Sequence[Union[str, int]],
+              targets: Sequence[Union[BetTarget, int]],
+              stakes: Sequence[int],
+              request_id: Optional[str] = None) -> PreparedWager:
+        """Serialize a wager from parallel arrays of selections
+
+        Arguments:
+            list_indices: the 'listIndex' of each bet's draw
+            targets: what to bet, either a BetTarget or a competitor id
+            stakes: the stake of each bet in cents, integers
+            request_id: (optional) idempotency key, generated if not given
+        """
+        if not len(list_indices) == len(targets) == len(stakes):
+            raise ValueError("Selection arrays have to be of equal length")
+
+        request_id = new_request_id() if request_id is None else request_id
+        encode = self._encode_list_index
+        board = self._BOARD
+
+        boards: List[str] = []
+        price = 0
+        for list_index, target, stake in zip(list_indices, targets, stakes):
+            try:
+                # %d would truncate a fractional stake
+                stake = operator.index(stake)
+            except TypeError:
+                message = f"The stake has to be an integer in cents, not {stake!r}"
+                raise TypeError(message) from None
+            boards.append(board % (stake, encode(list_index), competitor_id(target), stake))
+            price += stake
+
+        header = self._HEADER % (self._game_name, json.dumps(request_id), price)
+        body = header + ','.join(boards) + self._FOOTER
+        return PreparedWager(request_id, price, body.encode(), len(boards))
+
+    def build_selections(self,
+                         selections: Iterable[Selection],
+                         request_id: Optional[str] = None) -> PreparedWager:
+        """Serialize a wager from (list_index, target, stake) tuples"""
+        columns = tuple(zip(*selections))
+        if not columns:
+            return self.build((), (), (), request_id)
+        return self.build(columns[0], columns[1], columns[2], request_id)
+
+    def build_bets(self,
+                   games: Sequence,
+                   bets: Sequence[BetDecision],
+                   request_id: Optional[str] = None) -> PreparedWager:
+        """Serialize a wager for bets on veikkaus_client.Game objects
+
+        Only the first market of each draw can be bet, see check_primary().
+        """
+        if len(games) != len(bets):
+            raise ValueError("Number of games has to match number of bets")
+        check_primary(games)
+        return self.build([game.list_index for game in games],
+                          [bet.target for bet in bets], [bet.amount for bet in bets],
+                          request_id)
@@ -0,0 +1,381 @@
+"""Pool games: Vakio (SPORT) and Moniveto (MULTISCORE)
+
+In the pool games, a single bet row picks one outcome for each of the
+matches of the draw. A system bet picks several outcomes for some of the
+matches and plays every combination of them, e.g. the Vakio system
+
+    SystemBet.sport(["1", "1X", "X2", "12X", "1", ...])
+
+plays 1 * 2 * 2 * 3 * 1 * ... rows. A reduced system only plays the
+combinations whose number of home wins, draws and away wins are within
+the given limits.
+
+The combinations are never built as nested lists. SystemBet.rows()
+streams each combination as an integer with a fixed number of bits per
+match holding the index of the picked outcome, and rejects partial
+combinations as soon as they break the limits. The number of rows and the
+probability of a winning row are computed over the counts of home wins,
+draws and away wins, without expanding the rows at all.
+
+The payloads follow the examples of the Veikkaus reference implementation
+https://github.com/VeikkausOy/sport-games-robot
+"""
+import json
+from datetime import datetime
+from typing import (Any, Callable, Dict, Hashable, Iterator, List, NamedTuple, Optional,
+                    Sequence, Tuple)
+
+from veikkaaja.responses import parse_date
+from veikkaaja.types import GameTypes
+
+# the outcomes of a single Vakio match
+SPORT_OUTCOMES = ("1", "X", "2")
+
+
+class PoolRow(NamedTuple):
+    """A single match of a pool game draw"""
+    number: int
+    event_id: str
+    home_team: str
+    away_team: str
+    sport_id: str
+    status: str
+
+
+class PoolDraw(NamedTuple):
+    """A draw of a pool game, e.g. a single Vakio coupon"""
+    game_type: GameTypes
+    draw_id: str
+    list_index: str
+    name: str
+    status: str
+    close_time: datetime
+    base_price: int
+    min_stake: int
+    max_stake: int
+    stake_interval: int
+    rows: Tuple[PoolRow, ...]
+
+
+def parse_pool_draws(data: List[Dict[str, Any]], game_type: GameTypes) -> List[PoolDraw]:
+    """
+    Parse the draws of EndPoint.games_info_endpoint for pool games
+
+    API response:
+
+        [
+            {
+                "gameName": "SPORT",
+                "listIndex": "1",
+                "id": "52210",
+                "name": "Vakio",
+                "status": "OPEN",
+                "closeTime": 1636804800000,
+                "gameRuleSet": {
+                    "basePrice": 10,
+                    "stakeInterval": 5,
+                    "minStake": 10,
+                    "maxStake": 100000,
+                    ...
+                },
+                "rows": [
+                    {
+                        "id": "1",
+                        "status": "OPEN",
+                        "eventId": "101149646",
+                        "sportId": "1",
+                        "competitors": [
+                            {"id": "1", "name": "Arsenal"},
+                            {"id": "2", "name": "Watford"}
+                        ]
+                    },
+                    ...
+                ]
+            }
+        ]
+    """
+    draws = []
+    for entry in data:
+        rules = entry.get('gameRuleSet', {})
+        rows: List[PoolRow] = []
+        for row in entry.get('rows', []):
+            names = {comp.get('id'): comp.get('name', "") for comp in row.get('competitors', [])}
+            rows.append(
+                PoolRow(number=int(row.get('id', len(rows) + 1)),
+                        event_id=row.get('eventId', ""),
+                        home_team=names.get("1", ""),
+                        away_team=names.get("2", ""),
+                        sport_id=row.get('sportId', ""),
+                        status=row.get('status', "")))
+        draws.append(
+            PoolDraw(game_type=game_type,
+                     draw_id=str(entry.get('id', "")),
+                     list_index=str(entry.get('listIndex', "")),
+                     name=entry.get('name', ""),
+                     status=entry.get('status', ""),
+                     close_time=parse_date(entry.get('closeTime', 0)),
+                     base_price=rules.get('basePrice', 0),
+                     min_stake=rules.get('minStake', 0),
+                     max_stake=rules.get('maxStake', 0),
+                     stake_interval=rules.get('stakeInterval', 0),
+                     rows=tuple(rows)))
+
+    return sorted(draws, key=lambda draw: draw.close_time)
+
+
+def score_outcome(score: Tuple[int, int]) -> str:
+    """The 1X2 outcome of a (home goals, away goals) score"""
+    home, away = score
+    if home > away:
+        return "1"
+    if home == away:
+        return "X"
+    return "2"
+
+
+class SystemBet:
+    """A system of pool game rows
+
+    Arguments:
+        selections: for each match, the picked outcomes
+        classify: maps an outcome to "1", "X" or "2" for the reduction limits
+        limits: (optional) reduce the system to the rows where the number of
+                each outcome class is within (minimum, maximum), e.g.
+                {"1": (4, 7), "2": (0, 3)}
+    """
+
+    def __init__(self,
+                 selections: Sequence[Sequence[Hashable]],
+                 classify: Callable[[Any], str] = str,
+                 limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        if not selections or not all(selections):
+            raise ValueError("Every match needs at least one selected outcome")
+        self.selections: Tuple[Tuple[Hashable, ...], ...] = tuple(
+            tuple(dict.fromkeys(outcomes)) for outcomes in selections)
+        self.limits = dict(limits or {})
+        self.classify = classify
+        # the picked goals of a Moniveto system, see SystemBet.multiscore()
+        self.score_selections: Optional[List[Tuple[List[int], List[int]]]] = None
+
+        # bits needed for the outcome index of each match
+        self.bits = max(1, max(len(outcomes) - 1 for outcomes in self.selections).bit_length())
+        self._classes = sorted(self.limits)
+        # for each match and selected outcome, the index of the limited class or -1
+        self._class_of = [[
+            self._classes.index(classify(outcome)) if classify(outcome) in self.limits else -1
+            for outcome in outcomes
+        ] for outcomes in self.selections]
+
+    @classmethod
+    def sport(cls, selections: Sequence[str], limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        """A Vakio system from strings of outcomes, e.g. ["1", "1X", "12X"]"""
+        rows = []
+        for selection in selections:
+            outcomes = [outcome for outcome in SPORT_OUTCOMES if outcome in selection.upper()]
+            if len(outcomes) != len(set(selection.upper())):
+                raise ValueError(f"Invalid Vakio selection {selection}")
+            rows.append(outcomes)
+        return cls(rows, limits=limits)
+
+    @classmethod
+    def multiscore(cls,
+                   selections: Sequence[Tuple[Sequence[int], Sequence[int]]],
+                   limits: Optional[Dict[str, Tuple[int, int]]] = None):
+        """A Moniveto system from the (home goals, away goals) picked for each match"""
+        rows = [[(home, away) for home in homes for away in aways] for homes, aways in selections]
+        system = cls(rows, classify=score_outcome, limits=limits)
+        system.score_selections = [(sorted(homes), sorted(aways)) for homes, aways in selections]
+        return system
+
+    @property
+    def reduced(self) -> bool:
+        """Whether the system is limited by the outcome classes"""
+        return bool(self.limits)
+
+    def _counts(self, weights: Optional[Sequence[Sequence[float]]] = None) -> float:
+        """Sum the weights of the rows within the limits
+
+        Runs over the counts of each limited class match by match,
+        the rows themselves are never expanded.
+        """
+        # maps the counts of the limited classes to the summed weight
+        states: Dict[Tuple[int, ...], float] = {tuple(0 for _ in self._classes): 1.0}
+        for match, outcomes in enumerate(self.selections):
+            next_states: Dict[Tuple[int, ...], float] = {}
+            for counts, total in states.items():
+                for option in range(len(outcomes)):
+                    weight = total if weights is None else total * weights[match][option]
+                    if not weight:
+                        continue
+                    limited = self._class_of[match][option]
+                    key = counts
+                    if limited >= 0:
+                        key = counts[:limited] + (counts[limited] + 1, ) + counts[limited + 1:]
+                        if key[limited] > self.limits[self._classes[limited]][1]:
+                            continue
+                    next_states[key] = next_states.get(key, 0.0) + weight
+            states = next_states
+
+        return sum(total for counts, total in states.items() if all(
+            self.limits[name][0] <= count for name, count in zip(self._classes, counts)))
+
+    def row_count(self) -> int:
+        """The number of rows the system plays"""
+        if not self.limits:
+            count = 1
+            for outcomes in self.selections:
+                count *= len(outcomes)
+            return count
+        return int(round(self._counts()))
+
+    def price(self, row_price: int) -> int:
+        """The price of the system in cents, when each row costs 'row_price'"""
+        return self.row_count() * row_price
+
+    def win_probability(self, probabilities: Sequence[Dict[Hashable, float]]) -> float:
+        """The probability that one of the rows is fully correct
+
+        Arguments:
+            probabilities: for each match, the probability of each outcome
+        """
+        if len(probabilities) != len(self.selections):
+            raise ValueError("Need the outcome probabilities for every match")
+        weights = [[match.get(outcome, 0.0) for outcome in outcomes]
+                   for match, outcomes in zip(probabilities, self.selections)]
+        return self._counts(weights)
+
+    def rows(self) -> Iterator[int]:
+        """Stream the rows of the system as packed integers
+
+        The outcome index of match i is in bits [i * bits, (i + 1) * bits),
+        see decode(). Partial rows breaking the limits are skipped as a
+        whole, so reduced systems cost only the rows that are played.
+        """
+        matches = len(self.selections)
+        sizes = [len(outcomes) for outcomes in self.selections]
+        class_of = self._class_of
+        maximums = [self.limits[name][1] for name in self._classes]
+        minimums = [self.limits[name][0] for name in self._classes]
+        # the limited outcomes still possible after each match, for pruning
+        possible_after = [[0] * len(self._classes) for _ in range(matches + 1)]
+        for match in range(matches - 1, -1, -1):
+            possible_after[match] = list(possible_after[match + 1])
+            for limited in set(class_of[match]):
+                if limited >= 0:
+                    possible_after[match][limited] += 1
+
+        counts = [0] * len(self._classes)
+        choice = [-1] * matches
+        match = 0
+        packed = 0
+        bits = self.bits
+        while match >= 0:
+            # undo the previous choice of this match
+            if choice[match] >= 0:
+                limited = class_of[match][choice[match]]
+                if limited >= 0:
+                    counts[limited] -= 1
+                packed &= ~(((1 << bits) - 1) << (match * bits))
+            choice[match] += 1
+            if choice[match] >= sizes[match]:
+                choice[match] = -1
+                match -= 1
+                continue
+
+            limited = class_of[match][choice[match]]
+            if limited >= 0:
+                counts[limited] += 1
+                if counts[limited] > maximums[limited]:
+                    continue
+            packed |= choice[match] << (match * bits)
+
+            if any(count + possible_after[match + 1][index] < minimums[index]
+                   for index, count in enumerate(counts)):
+                continue
+
+            if match == matches - 1:
+                yield packed
+            else:
+                match += 1
+
+    def decode(self, packed: int) -> Tuple[Hashable, ...]:
+        """The outcomes of a row streamed by rows()"""
+        mask = (1 << self.bits) - 1
+        return tuple(outcomes[(packed >> (match * self.bits)) & mask]
+                     for match, outcomes in enumerate(self.selections))
+
+
+def _selection_json(game_type: GameTypes, outcomes: Sequence[Hashable]) -> str:
+    """A single match of a board"""
+    if game_type == GameTypes.MULTISCORE:
+        homes = sorted({score[0] for score in outcomes})  # type: ignore
+        aways = sorted({score[1] for score in outcomes})  # type: ignore
+        return json.dumps({"homeScores": homes, "awayScores": aways})
+    return json.dumps({"outcomes": list(outcomes)})
+
+
+def iter_pool_payload(draw: PoolDraw, system: SystemBet, stake: int) -> Iterator[bytes]:
+    """Stream the json payload of a pool game wager in chunks
+
+    A full system is sent as a single board with several outcomes for
+    the matches. A reduced system is sent as a board per played row.
+
+    API payload:
+
+        {
+            "listIndex": "1",
+            "gameName": "SPORT",
+            "price": 40,
+            "boards": [
+                {
+                    "betType": "Regular",
+                    "stake": 10,
+                    "selections": [
+                        {"outcomes": ["1"]},
+                        {"outcomes": ["1", "X"]},
+                        ...
+                    ]
+                }
+            ]
+        }
+
+    Moniveto selections are {"homeScores": [0, 1], "awayScores": [2]}.
+    """
+    if len(system.selections) != len(draw.rows):
+        raise ValueError("The system has to pick outcomes for every match of the draw")
+
+    header = {"listIndex": draw.list_index, "gameName": draw.game_type.value}
+    yield (json.dumps(header)[:-1] + f', "price": {system.price(stake)}, "boards": [').encode()
+
+    board_prefix = f'{{"betType": "Regular", "stake": {stake}, "selections": ['
+
+    if not system.reduced:
+        if draw.game_type == GameTypes.MULTISCORE and system.score_selections is not None:
+            selections = [
+                json.dumps({"homeScores": homes, "awayScores": aways})
+                for homes, aways in system.score_selections
+            ]
+        else:
+            selections = [
+                _selection_json(draw.game_type, outcomes) for outcomes in system.selections
+            ]
+        yield (board_prefix + ", ".join(selections) + "]}").encode()
+    else:
+        # the json of each selected outcome is the same for every row
+        encoded = [[_selection_json(draw.game_type, [outcome])
+                    for outcome in outcomes]
+                   for outcomes in system.selections]
+        mask = (1 << system.bits) - 1
+        separator = ""
+        for packed in system.rows():
+            row = ", ".join(encoded[match][(packed >> (match * system.bits)) & mask]
+                            for match in range(len(encoded)))
+            yield (separator + board_prefix + row + "]}").encode()
+            separator = ", "
+
+    yield b"]}"
+
+
+def pool_payload(draw: PoolDraw, system: SystemBet, stake: int) -> bytes:
+    """The json payload of a pool game wager, see iter_pool_payload()"""
+    return b"".join(iter_pool_payload(draw, system, stake))
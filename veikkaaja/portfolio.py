@@ -0,0 +1,218 @@
+"""Size the stakes of simultaneous EBET bets
+
+Given the parsed games and the model probabilities of their outcomes,
+allocate the bankroll with a heuristic built on the Kelly criterion:
+
+    bankroll = client.get_balance()
+    portfolio = heuristic_kelly(games, probabilities, bankroll, kelly_fraction=0.5)
+    client.place_bets(portfolio.games, portfolio.bets)
+
+The outcomes of a single market are mutually exclusive, their Kelly
+stakes are solved exactly (Smoczynski & Tomkins, 2010): the outcomes are
+added in the order of their expected return while the expected return
+exceeds the reserve rate of the not bet outcomes.
+
+The simultaneous markets are not solved jointly, which would mean
+maximizing the expected log growth over every combination of their
+results. Instead:
+
+ - the markets of the same event are correlated (e.g. the 1X2 and the
+   handicap of the same match), and a market cannot be bet together
+   with the events in its 'excludedEvents'. The events linked this way
+   form a group and only the market with the best expected log growth
+   of each group is kept.
+ - the kept markets are treated as independent, each with its own
+   Kelly stakes. When the stakes add up to more than 'max_exposure' of
+   the bankroll, all of them are scaled down by the same factor.
+
+The stakes are then close to the joint Kelly stakes while they are a
+small part of the bankroll, and too large when the single market stakes
+add up to a large part of it, bet a fraction of Kelly ('kelly_fraction')
+or cap the exposure. 'expected_growth' of the result is the sum of the
+growth of the markets, as if they were independent.
+
+Finally, the stakes are rounded down to the 'stakeInterval' of each draw
+and bets below the 'minStake' are dropped, the stakes are capped to the
+'maxStake'.
+"""
+import math
+from typing import Any, Dict, List, Mapping, NamedTuple, Sequence, Union
+
+from veikkaaja.types import BetDecision, BetTarget, competitor_id
+
+Probabilities = Mapping[Union[BetTarget, int], float]
+
+
+class Portfolio(NamedTuple):
+    """The bets to place, 'games' and 'bets' are ready for VeikkausClient.place_bets()"""
+    games: List
+    bets: List[BetDecision]
+    # the model probability of each bet
+    probabilities: List[float]
+    # the expected log growth of the bankroll, before rounding the stakes
+    expected_growth: float
+    # the total stake in cents
+    exposure: int
+
+
+class _Market(NamedTuple):
+    """The Kelly stakes of a single market"""
+    growth: float
+    game: Any
+    targets: List[Union[BetTarget, int]]
+    probabilities: List[float]
+    odds: List[float]
+    fractions: List[float]
+
+
+def market_kelly(probabilities: Sequence[float], odds: Sequence[float]) -> List[float]:
+    """The Kelly fractions of the bankroll for the mutually exclusive outcomes
+
+    Arguments:
+        probabilities: the probability of each outcome
+        odds: the decimal odds of each outcome, e.g. 2.45
+    """
+    order = sorted((index for index in range(len(odds)) if odds[index] > 1.0),
+                   key=lambda index: probabilities[index] * odds[index],
+                   reverse=True)
+
+    fractions = [0.0] * len(odds)
+    chosen: List[int] = []
+    probability_left = 1.0
+    inverse_odds_left = 1.0
+    reserve = 1.0
+    for index in order:
+        if probabilities[index] * odds[index] <= reserve:
+            break
+        probability_left -= probabilities[index]
+        inverse_odds_left -= 1.0 / odds[index]
+        chosen.append(index)
+        if inverse_odds_left <= 0:
+            # the odds of the chosen outcomes cover every result, arbitrage
+            reserve = 0.0
+            break
+        reserve = max(0.0, probability_left / inverse_odds_left)
+
+    for index in chosen:
+        fractions[index] = max(0.0, probabilities[index] - reserve / odds[index])
+    return fractions
+
+
+def expected_growth(probabilities: Sequence[float], odds: Sequence[float],
+                    fractions: Sequence[float]) -> float:
+    """The expected log growth of the bankroll for the stakes on a single market"""
+    total = sum(fractions)
+    growth = 0.0
+    for probability, odd, fraction in zip(probabilities, odds, fractions):
+        wealth = 1.0 - total + fraction * odd
+        if probability > 0:
+            if wealth <= 0:
+                return -math.inf
+            growth += probability * math.log(wealth)
+
+    # the outcomes that were not bet on
+    rest = 1.0 - sum(probabilities)
+    if rest > 1e-12:
+        if total >= 1.0:
+            return -math.inf
+        growth += rest * math.log(1.0 - total)
+    return growth
+
+
+def round_stake(stake: float, min_stake: int, max_stake: int, stake_interval: int) -> int:
+    """Round the stake in cents down to the stake rules, 0 if it is too small"""
+    interval = max(1, stake_interval)
+    rounded = int(stake // interval) * interval
+    if max_stake:
+        rounded = min(rounded, max_stake - max_stake % interval)
+    if rounded < min_stake:
+        return 0
+    return rounded
+
+
+def _round_stake(stake: float, rule_set) -> int:
+    """Round the stake in cents to the draw's stake rules, 0 if it is too small"""
+    return round_stake(stake, rule_set.min_stake, rule_set.max_stake, rule_set.stake_interval)
+
+
+def _event_groups(games: Sequence) -> Dict[str, str]:
+    """The group of each event, the events linked by the games or their excluded events"""
+    parents: Dict[str, str] = {}
+
+    def find(event: str) -> str:
+        root = parents.setdefault(event, event)
+        while root != parents[root]:
+            root = parents[root]
+        while event != root:
+            event, parents[event] = parents[event], root
+        return root
+
+    for game in games:
+        event = find(str(game.event_id))
+        for excluded in game.excluded_events:
+            parents[find(excluded)] = event
+    return {event: find(event) for event in parents}
+
+
+def heuristic_kelly(games: Sequence,  # pylint: disable=too-many-locals
+                    probabilities: Sequence[Probabilities],
+                    bankroll: float,
+                    kelly_fraction: float = 1.0,
+                    max_exposure: float = 1.0) -> Portfolio:
+    """Allocate the bankroll over the games, not the joint Kelly optimum
+
+    The exact Kelly stakes of each market, the best market of each group
+    of linked events, scaled down together to 'max_exposure', see the
+    module documentation.
+
+    Arguments:
+        games: the parsed games (markets) to consider
+        probabilities: for each game, the model probability of each outcome
+                       keyed by a BetTarget or a competitor id
+        bankroll: the bankroll in euros, e.g. from VeikkausClient.get_balance()
+        kelly_fraction: bet this fraction of the full Kelly stakes
+        max_exposure: the stakes add up at most to this fraction of the bankroll
+    """
+    if len(games) != len(probabilities):
+        raise ValueError("Need the outcome probabilities for every game")
+
+    groups = _event_groups(games)
+    # the best market of each group of events
+    best: Dict[str, _Market] = {}
+    for game, model in zip(games, probabilities):
+        targets = list(model)
+        outcome_probabilities = list(model.values())
+        odds = [game.competitor_odds(competitor_id(target)) / 100 for target in targets]
+
+        fractions = market_kelly(outcome_probabilities, odds)
+        if not any(fractions):
+            continue
+        growth = expected_growth(outcome_probabilities, odds, fractions)
+
+        group = groups[str(game.event_id)]
+        if group not in best or growth > best[group].growth:
+            best[group] = _Market(growth, game, targets, outcome_probabilities, odds, fractions)
+
+    total = sum(sum(market.fractions) for market in best.values())
+    scale = kelly_fraction
+    if total * kelly_fraction > max_exposure:
+        scale = max_exposure / total
+
+    bankroll_cents = bankroll * 100
+    portfolio = Portfolio([], [], [], 0.0, 0)
+    growth = 0.0
+    exposure = 0
+    for market in best.values():
+        growth += expected_growth(market.probabilities, market.odds,
+                                  [fraction * scale for fraction in market.fractions])
+        for target, probability, fraction in zip(market.targets, market.probabilities,
+                                                 market.fractions):
+            stake = _round_stake(fraction * scale * bankroll_cents, market.game.draw.rule_set)
+            if stake <= 0:
+                continue
+            portfolio.games.append(market.game)
+            portfolio.bets.append(BetDecision(target, stake))
+            portfolio.probabilities.append(probability)
+            exposure += stake
+
+    return portfolio._replace(expected_growth=growth, exposure=exposure)
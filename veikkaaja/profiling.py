@@ -0,0 +1,229 @@
+"""Find the hot spots of the client without external tools
+
+While the Profiler is running, every VeikkausClient method is timed and
+a background thread samples the stacks of the threads that are inside a
+client method. The allocations are traced with tracemalloc:
+
+    with Profiler("profiles") as profiler:
+        client.upcoming_events(GameTypes.EBET)
+    print(profiler.report_directory)
+
+or for the whole program with the environment variable
+VEIKKAAJA_PROFILE=profiles (or =1 for the directory 'veikkaaja-profile').
+
+The reports are written to a new directory under 'profiles':
+
+    methods.txt   calls, time, samples and allocated memory of each method
+    cpu.folded    the sampled stacks in the folded format of flamegraph.pl
+                  and speedscope, e.g. 'veikkaus_client:upcoming_events;... 12'
+    memory.txt    the lines that allocated the most memory
+    cpu.pstats    with deterministic=True, the cProfile statistics
+                  for pstats or snakeviz
+"""
+import atexit
+import cProfile
+import functools
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter, defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, DefaultDict, Dict, List, Optional, Union
+
+from veikkaaja import logger
+from veikkaaja.veikkaus_client import VeikkausClient
+
+# the stack depth of the samples
+MAX_DEPTH = 64
+
+
+class MethodStats:
+    """The totals of a single client method"""
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+        # samples with the method in the stack
+        self.samples = 0
+        # the traced memory after the calls minus before, in bytes
+        self.allocated = 0
+
+
+class Profiler:
+    """Sample, time and trace the allocations of the client methods"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    _active: Optional['Profiler'] = None
+
+    def __init__(self,
+                 directory: Union[str, Path] = "veikkaaja-profile",
+                 interval: float = 0.001,
+                 memory: bool = True,
+                 deterministic: bool = False):
+        """
+        Arguments:
+            directory: where to write the reports
+            interval: seconds between the stack samples
+            memory: trace the allocations with tracemalloc
+            deterministic: also run cProfile for a pstats report, slows down the client
+        """
+        self.directory = Path(directory)
+        self.interval = interval
+        self.memory = memory
+        self.deterministic = deterministic
+        self.report_directory: Optional[Path] = None
+
+        self.methods: DefaultDict[str, MethodStats] = defaultdict(MethodStats)
+        self.stacks: Counter = Counter()
+        # thread id -> the client methods the thread is in
+        self._calls: Dict[int, List[str]] = {}
+        self._originals: Dict[str, Callable] = {}
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._cprofile: Optional[cProfile.Profile] = None
+        self._started_tracing = False
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def start(self):
+        """Wrap the client methods and start sampling"""
+        if Profiler._active is not None:
+            raise RuntimeError("Only one Profiler can run at a time")
+        Profiler._active = self
+
+        for name, function in list(vars(VeikkausClient).items()):
+            if name.startswith('__') or not callable(function) or isinstance(
+                    function, (staticmethod, classmethod, type)):
+                continue
+            self._originals[name] = function
+            setattr(VeikkausClient, name, self._wrap(name, function))
+
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        if self.deterministic:
+            self._cprofile = cProfile.Profile()
+            self._cprofile.enable()
+
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._sample, daemon=True)
+        self._sampler.start()
+
+    def stop(self) -> Optional[Path]:
+        """Restore the client methods and write the reports"""
+        if Profiler._active is not self:
+            return None
+
+        self._stop.set()
+        if self._sampler is not None:
+            self._sampler.join()
+        if self._cprofile is not None:
+            self._cprofile.disable()
+        for name, function in self._originals.items():
+            setattr(VeikkausClient, name, function)
+        self._originals.clear()
+
+        snapshot = tracemalloc.take_snapshot() if tracemalloc.is_tracing() else None
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        Profiler._active = None
+
+        self.report_directory = self._write_reports(snapshot)
+        logger.info("Wrote the profile to %s", self.report_directory)
+        return self.report_directory
+
+    def _wrap(self, name: str, function: Callable) -> Callable:
+        """Time the method and keep track of the methods each thread is in"""
+        calls = self._calls
+        stats = self.methods[name]
+        memory = self.memory
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            thread = threading.get_ident()
+            stack = calls.setdefault(thread, [])
+            stack.append(name)
+            traced = tracemalloc.get_traced_memory()[0] if memory else 0
+            started = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                stats.calls += 1
+                stats.seconds += time.perf_counter() - started
+                if memory:
+                    stats.allocated += tracemalloc.get_traced_memory()[0] - traced
+                stack.pop()
+
+        return wrapper
+
+    def _sample(self):
+        """Sample the stacks of the threads inside a client method"""
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()  # pylint: disable=protected-access
+            for thread, methods in list(self._calls.items()):
+                if thread == own or not methods or thread not in frames:
+                    continue
+                for name in set(methods):
+                    self.methods[name].samples += 1
+                self.stacks[_folded(frames[thread])] += 1
+
+    def _write_reports(self, snapshot: Optional[tracemalloc.Snapshot]) -> Path:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        directory = self.directory / f"profile-{stamp}-{os.getpid()}"
+        directory.mkdir(parents=True, exist_ok=True)
+
+        lines = [f"{'method':32} {'calls':>8} {'seconds':>10} {'samples':>8} {'allocated':>12}"]
+        for name, stats in sorted(self.methods.items(), key=lambda item: -item[1].seconds):
+            if stats.calls:
+                lines.append(f"{name:32} {stats.calls:8} {stats.seconds:10.4f} "
+                             f"{stats.samples:8} {stats.allocated:12}")
+        (directory / "methods.txt").write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+        (directory / "cpu.folded").write_text("".join(
+            f"{stack} {count}\n" for stack, count in self.stacks.most_common()),
+                                              encoding="utf-8")
+
+        if snapshot is not None:
+            statistics = snapshot.statistics('lineno')[:50]
+            (directory / "memory.txt").write_text("".join(f"{statistic}\n"
+                                                          for statistic in statistics),
+                                                  encoding="utf-8")
+
+        if self._cprofile is not None:
+            self._cprofile.dump_stats(str(directory / "cpu.pstats"))
+            self._cprofile = None
+        return directory
+
+
+def _folded(frame) -> str:
+    """The stack of the frame as 'module:function;module:function', outermost first"""
+    names: List[str] = []
+    while frame is not None and len(names) < MAX_DEPTH:
+        code = frame.f_code
+        # leave out the wrappers of the profiler
+        if code.co_filename != __file__:
+            names.append(f"{Path(code.co_filename).stem}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+def profile_from_environment() -> Optional[Profiler]:
+    """Start a Profiler for the whole program if VEIKKAAJA_PROFILE is set"""
+    value = os.environ.get('VEIKKAAJA_PROFILE', "")
+    if not value or value == "0":
+        return None
+    profiler = Profiler("veikkaaja-profile" if value == "1" else value)
+    profiler.start()
+    atexit.register(profiler.stop)
+    return profiler
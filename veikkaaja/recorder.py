@@ -0,0 +1,311 @@
+"""Record every API request and response into a compressed archive
+
+The recorder hooks into VeikkausClient.save_incoming_response(). The
+client thread only puts the request/response pair in a queue, with the
+bodies as the raw bytes, and a background thread decodes, compresses
+and appends them to the archive.
+
+    recorder = ArchiveRecorder("recordings")
+    client = VeikkausClient(recorder=recorder)
+    ...
+    recorder.close()
+
+    for record in ArchiveReader("recordings").records(endpoint="sport-open-games"):
+        print(record.timestamp, record.url, record.status)
+
+The archive is a directory of append-only segment files. Each segment is
+a series of independently compressed frames, each frame holding a batch
+of json records separated by newlines. A frame is gzip member, or zstd
+frame when the optional 'zstandard' package is installed and
+compression="zstd" is requested. Next to each segment, an index file
+lists the frames
+
+    <offset> <length> <first timestamp> <last timestamp> <record count> <endpoints>
+
+so that the reader can seek straight to the frames of a time range or
+an endpoint. Segments roll over once they grow past 'segment_size' bytes.
+"""
+import gzip
+import json
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+import requests
+
+from veikkaaja import logger
+
+try:
+    import zstandard  # type: ignore
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+SEGMENT_SUFFIXES = {'gzip': '.jsonl.gz', 'zstd': '.jsonl.zst'}
+
+
+class Record(NamedTuple):
+    """A single recorded request/response pair"""
+    # unix time when the request was sent
+    timestamp: float
+    # the request duration in seconds
+    elapsed: float
+    method: str
+    endpoint: str
+    url: str
+    request_body: Optional[str]
+    status: int
+    response_body: str
+
+    def json(self) -> Any:
+        """The parsed response body"""
+        return json.loads(self.response_body)
+
+
+class FrameIndex(NamedTuple):
+    """An entry in the index of a segment"""
+    offset: int
+    length: int
+    first_timestamp: float
+    last_timestamp: float
+    records: int
+    endpoints: List[str]
+
+
+def _compressor(compression: str):
+    if compression == 'gzip':
+        return lambda data: gzip.compress(data, compresslevel=6)
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdCompressor(level=3).compress
+    raise ValueError(f"Unknown compression {compression}")
+
+
+def _decompressor(compression: str):
+    if compression == 'gzip':
+        return gzip.decompress
+    if compression == 'zstd':
+        if zstandard is None:
+            raise RuntimeError("zstd compression requires the 'zstandard' package")
+        return zstandard.ZstdDecompressor().decompress
+    raise ValueError(f"Unknown compression {compression}")
+
+
+class ArchiveRecorder:
+    """Write request/response pairs to a rolling archive on a background thread"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 directory: Union[str, Path],
+                 *,
+                 compression: str = 'gzip',
+                 segment_size: int = 64 * 1024 * 1024,
+                 frame_records: int = 64,
+                 flush_interval: float = 1.0,
+                 queue_size: int = 10000):
+        """
+        Arguments:
+            directory: where to write the archive segments
+            compression: 'gzip' or 'zstd'
+            segment_size: start a new segment after this many bytes
+            frame_records: compress at most this many records into a frame
+            flush_interval: write the pending records at least this often, seconds
+            queue_size: records waiting for the writer, new records are
+                        dropped when the queue is full
+        """
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.compression = compression
+        self.segment_size = segment_size
+        self.frame_records = frame_records
+        self.flush_interval = flush_interval
+        self.dropped = 0
+
+        self._compress = _compressor(compression)
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._segment: Optional[Path] = None
+        self._thread = threading.Thread(target=self._run, name="veikkaaja-recorder", daemon=True)
+        self._thread.start()
+
+    def record(self, endpoint, response: requests.Response):
+        """Queue the request and response for writing, never blocks
+
+        The bodies are decoded on the writer thread, the response body
+        as its declared encoding, or utf-8 like the json of the API.
+        """
+        request = response.request
+        elapsed = response.elapsed.total_seconds()
+        record = Record(timestamp=time.time() - elapsed,
+                        elapsed=elapsed,
+                        method=request.method or "",
+                        endpoint=endpoint.endpoint,
+                        url=request.url or "",
+                        request_body=None,
+                        status=response.status_code,
+                        response_body="")
+        try:
+            self._queue.put_nowait((record, request.body, response.content, response.encoding))
+        except queue.Full:
+            self.dropped += 1
+
+    @staticmethod
+    def _decoded(queued: Tuple[Record, Any, bytes, Optional[str]]) -> Record:
+        """The record with its bodies decoded, on the writer thread"""
+        record, request_body, content, encoding = queued
+        if isinstance(request_body, bytes):
+            request_body = request_body.decode('utf-8', 'replace')
+        try:
+            response_body = content.decode(encoding or 'utf-8', 'replace')
+        except LookupError:
+            response_body = content.decode('utf-8', 'replace')
+        return record._replace(request_body=request_body, response_body=response_body)
+
+    def close(self):
+        """Write the pending records and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _next_segment(self) -> Path:
+        """A new segment, named by the time it was started"""
+        suffix = SEGMENT_SUFFIXES[self.compression]
+        name = time.strftime("%Y%m%d-%H%M%S", time.gmtime())
+        counter = 0
+        while True:
+            segment = self.directory / f"segment-{name}-{counter:04d}{suffix}"
+            if not segment.exists():
+                return segment
+            counter += 1
+
+    def _write_frame(self, records: List[Record]):
+        """Compress and append the records to the current segment"""
+        lines = "\n".join(json.dumps(record._asdict()) for record in records)
+        frame = self._compress(lines.encode())
+
+        if self._segment is None or self._segment.stat().st_size >= self.segment_size:
+            self._segment = self._next_segment()
+            self._segment.touch()
+
+        with self._segment.open('ab') as segment:
+            offset = segment.tell()
+            segment.write(frame)
+
+        # concurrent requests may finish in a different order than they were sent
+        timestamps = [record.timestamp for record in records]
+        endpoints = sorted({record.endpoint for record in records})
+        entry = (f"{offset} {len(frame)} {min(timestamps):.6f} "
+                 f"{max(timestamps):.6f} {len(records)} {','.join(endpoints)}\n")
+        with _index_path(self._segment).open('a', encoding='utf-8') as index:
+            index.write(entry)
+
+    def _run(self):
+        """Collect the queued records into frames"""
+        pending: List[Record] = []
+        deadline = time.monotonic() + self.flush_interval
+        running = True
+        while running:
+            try:
+                queued = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if queued is None:
+                    running = False
+                else:
+                    pending.append(self._decoded(queued))
+            except queue.Empty:
+                pass
+
+            if pending and (not running or len(pending) >= self.frame_records
+                            or time.monotonic() >= deadline):
+                try:
+                    self._write_frame(pending)
+                except OSError as error:
+                    logger.error("Could not write %s records to archive: %s", len(pending),
+                                 error)
+                pending = []
+            if time.monotonic() >= deadline:
+                deadline = time.monotonic() + self.flush_interval
+
+
+def _index_path(segment: Path) -> Path:
+    return segment.with_name(segment.name + ".idx")
+
+
+class ArchiveReader:
+    """Read the records of an archive written by ArchiveRecorder"""
+
+    def __init__(self, directory: Union[str, Path]):
+        self.directory = Path(directory)
+
+    def segments(self) -> List[Path]:
+        """The segments of the archive in the order they were written"""
+        return sorted(segment for suffix in SEGMENT_SUFFIXES.values()
+                      for segment in self.directory.glob(f"segment-*{suffix}"))
+
+    @staticmethod
+    def index(segment: Path) -> List[FrameIndex]:
+        """The frames of a single segment"""
+        frames = []
+        for line in _index_path(segment).read_text(encoding='utf-8').splitlines():
+            offset, length, first, last, records, endpoints = (line.split(" ", 5) + [""])[:6]
+            frames.append(
+                FrameIndex(int(offset), int(length), float(first), float(last), int(records),
+                           endpoints.split(",") if endpoints else []))
+        return frames
+
+    def records(self,
+                start: Optional[float] = None,
+                end: Optional[float] = None,
+                endpoint: Optional[str] = None) -> Iterator[Record]:
+        """Iterate the recorded pairs, optionally only for a time range or endpoint
+
+        Arguments:
+            start: (optional) unix time of the earliest record
+            end: (optional) unix time of the latest record
+            endpoint: (optional) only records whose endpoint starts with this
+        """
+        for segment in self.segments():
+            yield from self.segment_records(segment, start, end, endpoint)
+
+    @classmethod
+    def segment_records(cls,
+                        segment: Path,
+                        start: Optional[float] = None,
+                        end: Optional[float] = None,
+                        endpoint: Optional[str] = None) -> Iterator[Record]:
+        """Iterate the records of a single segment, see records()"""
+        compression = 'zstd' if segment.name.endswith(SEGMENT_SUFFIXES['zstd']) else 'gzip'
+        decompress = _decompressor(compression)
+
+        frames = [
+            frame for frame in cls.index(segment)
+            if (start is None or frame.last_timestamp >= start) and (
+                end is None or frame.first_timestamp <= end) and (
+                    endpoint is None or any(
+                        name.startswith(endpoint) for name in frame.endpoints))
+        ]
+        if not frames:
+            return
+
+        with segment.open('rb') as handle:
+            for frame in frames:
+                handle.seek(frame.offset)
+                data = decompress(handle.read(frame.length))
+                for line in data.decode().split("\n"):
+                    record = Record(**json.loads(line))
+                    if start is not None and record.timestamp < start:
+                        continue
+                    if end is not None and record.timestamp > end:
+                        continue
+                    if endpoint is not None and not record.endpoint.startswith(endpoint):
+                        continue
+                    yield record
+
+    def latest(self, endpoint: str) -> Optional[Record]:
+        """The most recent record for the endpoint"""
+        found = None
+        for record in self.records(endpoint=endpoint):
+            if found is None or record.timestamp >= found.timestamp:
+                found = record
+        return found
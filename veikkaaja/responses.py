@@ -1,7 +1,7 @@
 """Collection of the parsing functionality of different API responses"""
 from datetime import datetime
 from enum import Enum
-from typing import NamedTuple
+from typing import Any, Dict, List, NamedTuple, Tuple
 
 from veikkaaja import logger
 from veikkaaja.types import GameTypes, ParseableEnum
@@ -22,23 +22,24 @@ class Wager(NamedTuple):
     id: int
     product: GameTypes
 
+class MarketResult(NamedTuple):
+    """The result of a single market (row) of a closed EBET draw"""
+    draw_id: int
+    market: int
+    # the ids of the winning competitors
+    winners: Tuple[int, ...]
+    # the bets on a cancelled market are refunded
+    cancelled: bool
+
 class ResponseType(Enum):
     """Enumeration of each possible response from the veikkaus api"""
     TRANSACTION_LIST = 0
+    CLOSED_DRAWS = 1
 
 def parse_date(unix_date: str):
     """The API responses contain unix timestamp, parse it"""
     return datetime.fromtimestamp(int(unix_date) / 1000)
 
-def parse_response(response: dict, response_type: ResponseType):
-    """A common parsing entry point for all parsing functionality"""
-
-    if response_type == ResponseType.TRANSACTION_LIST:
-        return parse_transaction_list(response)
-
-    logger.warning("Response of type %s could not be parsed", response_type)
-    return None
-
 def parse_transaction_list(response: dict):
     """Parsing response to EndPoint.account_betting_history"""
 
@@ -55,3 +56,97 @@ def parse_transaction_list(response: dict):
         ))
 
     return wagers
+
+_WINNING = ('WIN', 'WON', 'WINNER')
+_OUTCOME_KEYS = ('result', 'outcome', 'status')
+_CANCELLED = ('CANCELLED', 'CANCELED', 'VOID', 'REFUNDED')
+
+def _marked(value: Any, marks: Tuple[str, ...]) -> bool:
+    return isinstance(value, str) and value.upper() in marks
+
+def parse_closed_draws(response: Any) -> List[MarketResult]:
+    """Parsing response to EndPoint.closed_games_by_day
+
+    There is no documentation or a saved response of the results endpoint,
+    so the parsing assumes that the closed draws look like the open draws of
+    EndPoint.games_info_endpoint, either as a list or under 'draws', and
+    that the outcome is marked on each competitor:
+
+        [{
+            "id": "2425549",
+            "status": "RESULTS_AVAILABLE",
+            "rows": [{
+                "id": "1",
+                "status": "...",
+                "competitors": [
+                    {"id": "1", "name": "Edinburgh C", "result": "WIN", ...},
+                    {"id": "2", "name": "Stranraer", "result": "LOSE", ...},
+                ]
+            }]
+        }]
+
+    A competitor has won if its 'result', 'outcome' or 'status' is 'WIN'
+    or 'WON', or if a row lists the 'winners' (or 'winningCompetitors').
+    A cancelled draw or row refunds the bets. The rows without a winner in
+    a known field are left out, so their bets stay unsettled instead of
+    lost, and a warning tells how many there were: the format is a guess,
+    check it against a recorded response before trusting the settlements.
+    """
+    draws = response.get('draws', []) if isinstance(response, dict) else response
+
+    results = []
+    unknown = 0
+    for draw in draws or []:
+        try:
+            draw_id = int(draw['id'])
+        except (KeyError, TypeError, ValueError):
+            logger.warning("Skipping a closed draw without an id")
+            continue
+        draw_cancelled = _marked(draw.get('status'), _CANCELLED)
+
+        for row in draw.get('rows', []):
+            try:
+                market = int(row['id'])
+            except (KeyError, TypeError, ValueError):
+                continue
+
+            winners = row.get('winners', row.get('winningCompetitors'))
+            if isinstance(winners, list):
+                winner_ids = tuple(int(winner['id'] if isinstance(winner, dict)
+                                       else winner) for winner in winners)
+            else:
+                winner_ids = tuple(
+                    int(comp['id']) for comp in row.get('competitors', [])
+                    if any(_marked(comp.get(key), _WINNING) for key in _OUTCOME_KEYS))
+
+            cancelled = draw_cancelled or _marked(row.get('status'), _CANCELLED)
+            if not winner_ids and not cancelled:
+                unknown += 1
+                continue
+            results.append(MarketResult(draw_id, market, winner_ids, cancelled))
+
+    if unknown:
+        logger.warning("%d closed markets without a known winner were left unsettled, "
+                       "the format of the results may have changed", unknown)
+    return results
+
+def results_by_market(results: List[MarketResult]) -> Dict[Tuple[int, int], MarketResult]:
+    """Index the results by (draw id, market id)"""
+    return {(result.draw_id, result.market): result for result in results}
+
+def parse_response(response: dict, response_type: ResponseType):
+    """A common parsing entry point for all parsing functionality
+
+    The endpoints declare their parsers in veikkaaja.endpoints.ENDPOINTS,
+    prefer EndPoint.parse().
+    """
+    parser = _PARSERS.get(response_type)
+    if parser is None:
+        logger.warning("Response of type %s could not be parsed", response_type)
+        return None
+    return parser(response)
+
+_PARSERS = {
+    ResponseType.TRANSACTION_LIST: parse_transaction_list,
+    ResponseType.CLOSED_DRAWS: parse_closed_draws,
+}
@@ -0,0 +1,269 @@
+"""Place bets just before the draws close
+
+The odds are the most informed just before the close time of a draw.
+The BetScheduler fires each bet 'lead' seconds before the close time:
+
+    with BetScheduler(client, lead=5.0, test=False) as scheduler:
+        scheduler.schedule(game, BetDecision(BetTarget.HOME, 100))
+        ...
+        # keep the odds up to date, the bet is not sent if its odds dropped
+        scheduler.update_snapshot(client.upcoming_events(GameTypes.EBET))
+
+The wager is serialized when the bet is scheduled, at the fire time only
+the odds are checked before the prebuilt body is posted. The timer thread
+sleeps until a couple of milliseconds before the fire time and busy-waits
+the rest on the high resolution clock. While bets are waiting, the
+session is kept warm with a light request every 'keepalive' seconds and
+once 'warmup' seconds before each fire time, so that the wager does not
+have to open a new connection. The keep-alive requests are sent from
+their own thread, a slow one never delays a fire time. A failing request
+or callback is logged and the timer thread keeps going.
+"""
+import heapq
+import itertools
+import threading
+import time
+from enum import Enum
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Set, Tuple
+
+from veikkaaja import logger
+from veikkaaja.payload import PreparedWager
+from veikkaaja.types import BetDecision, competitor_id
+
+
+class FireStatus(Enum):
+    """What happened to a scheduled bet at its fire time"""
+    SENT = "SENT"
+    # the API did not accept the wager
+    FAILED = "FAILED"
+    # the odds in the latest snapshot are below the accepted odds
+    ODDS_DROPPED = "ODDS_DROPPED"
+    # the game is no longer open
+    CLOSED = "CLOSED"
+
+
+class ScheduledBet(NamedTuple):
+    """A bet waiting for its fire time"""
+    game: Any
+    bet: BetDecision
+    # unix time
+    fire_at: float
+    # the lowest accepted odds in hundredths
+    min_odds: float
+    wager: PreparedWager
+
+
+class FiredBet(NamedTuple):
+    """The outcome of a scheduled bet"""
+    scheduled: ScheduledBet
+    status: FireStatus
+    # the odds at the fire time
+    odds: float
+    # how late the bet was triggered
+    lag_ms: float
+    # from the trigger to the response
+    elapsed_ms: float
+
+
+class BetScheduler:
+    """Fire prebuilt wagers at close time - lead"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    # busy-wait the last seconds before the fire time
+    SPIN = 0.002
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 client,
+                 *,
+                 lead: float = 5.0,
+                 test: bool = True,
+                 keepalive: Optional[float] = 30.0,
+                 warmup: Optional[float] = 1.0,
+                 on_fired: Optional[Callable[[FiredBet], None]] = None):
+        """
+        Arguments:
+            client: the VeikkausClient to send the wagers with
+            lead: by default, fire the bets this many seconds before the close time
+            test: whether to use the API test endpoint
+            keepalive: (optional) seconds between the requests keeping the session open
+            warmup: (optional) send a request this many seconds before each fire time
+            on_fired: (optional) called from the timer thread for each fired bet
+        """
+        self.client = client
+        self.lead = lead
+        self.test = test
+        self.keepalive = keepalive
+        self.warmup = warmup
+        self.on_fired = on_fired
+        self.fired: List[FiredBet] = []
+
+        # (perf_counter deadline, sequence, bet)
+        self._heap: List[Tuple[float, int, ScheduledBet]] = []
+        self._sequence = itertools.count()
+        self._cancelled: Set[str] = set()
+        self._latest: Dict[Tuple[Any, Any], Any] = {}
+        self._last_request = time.perf_counter()
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+        self._keep_alive_thread: Optional[threading.Thread] = None
+
+    def schedule(self,
+                 game,
+                 bet: BetDecision,
+                 lead: Optional[float] = None,
+                 min_odds: Optional[float] = None) -> ScheduledBet:
+        """Serialize the wager and schedule it
+
+        Arguments:
+            game: the game to bet on
+            bet: what to bet
+            lead: (optional) seconds before the close time, by default the scheduler's lead
+            min_odds: (optional) the lowest accepted odds, by default the current odds
+        """
+        lead = self.lead if lead is None else lead
+        fire_at = game.close_time.timestamp() - lead
+        if min_odds is None:
+            min_odds = game.competitor_odds(competitor_id(bet.target))
+        wager = self.client.payload_builder.build_bets([game], [bet])
+        scheduled = ScheduledBet(game, bet, fire_at, min_odds, wager)
+
+        deadline = time.perf_counter() + (fire_at - time.time())
+        with self._condition:
+            heapq.heappush(self._heap, (deadline, next(self._sequence), scheduled))
+            self._condition.notify()
+        return scheduled
+
+    def cancel(self, scheduled: ScheduledBet) -> bool:
+        """Do not fire the bet, False if it is not waiting"""
+        with self._condition:
+            waiting = any(entry[2] is scheduled for entry in self._heap)
+            if waiting:
+                self._cancelled.add(scheduled.wager.request_id)
+                self._condition.notify()
+            return waiting
+
+    def pending(self) -> int:
+        """The number of bets waiting"""
+        with self._condition:
+            return len(self._heap) - len(self._cancelled)
+
+    def update_snapshot(self, games):
+        """The latest odds and statuses to check the bets against"""
+        latest = {(game.row_id, game.market_id): game for game in games}
+        with self._condition:
+            self._latest.update(latest)
+
+    def start(self):
+        """Fire the bets on a background thread"""
+        with self._condition:
+            self._running = True
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the timer thread, the waiting bets are not fired"""
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._keep_alive_thread is not None:
+            self._keep_alive_thread.join()
+            self._keep_alive_thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def _wake_time(self, deadline: Optional[float], now: float) -> float:
+        """When the timer thread has to wake up next"""
+        if deadline is None:
+            return float('inf')
+        wake = deadline - self.SPIN
+        if self.keepalive is not None:
+            wake = min(wake, self._last_request + self.keepalive)
+        if self.warmup is not None and self._last_request < deadline - self.warmup and (
+                deadline - now > self.warmup / 2):
+            wake = min(wake, deadline - self.warmup)
+        return wake
+
+    def _run(self):
+        while True:
+            scheduled = None
+            with self._condition:
+                if not self._running:
+                    return
+                now = time.perf_counter()
+                deadline = self._heap[0][0] if self._heap else None
+                if deadline is not None and self._heap[0][2].wager.request_id in self._cancelled:
+                    self._cancelled.discard(heapq.heappop(self._heap)[2].wager.request_id)
+                    continue
+                if deadline is not None and deadline - now <= self.SPIN:
+                    deadline, _, scheduled = heapq.heappop(self._heap)
+                else:
+                    wake = self._wake_time(deadline, now)
+                    if wake > now:
+                        self._condition.wait(None if wake == float('inf') else wake - now)
+                        continue
+
+            if scheduled is None:
+                self._last_request = time.perf_counter()
+                if self._keep_alive_thread is None or not self._keep_alive_thread.is_alive():
+                    self._keep_alive_thread = threading.Thread(target=self._keep_alive,
+                                                               daemon=True)
+                    self._keep_alive_thread.start()
+                continue
+
+            self._fire(scheduled, deadline)
+
+    def _keep_alive(self):
+        """Send a light request, off the timer thread"""
+        try:
+            self.client.keep_alive()
+        except Exception:  # pylint: disable=broad-except
+            logger.exception("Keep-alive request failed")
+        self._last_request = time.perf_counter()
+
+    def _fire(self, scheduled: ScheduledBet, deadline: float) -> FiredBet:
+        """Check the odds and send the wager at the deadline"""
+        while time.perf_counter() < deadline:
+            pass
+        triggered = time.perf_counter()
+
+        game = scheduled.game
+        game = self._latest.get((game.row_id, game.market_id), game)
+        odds = game.competitor_odds(competitor_id(scheduled.bet.target))
+        if game.status not in ("OPEN", "") or time.time() >= game.close_time.timestamp():
+            status = FireStatus.CLOSED
+        elif odds < scheduled.min_odds:
+            status = FireStatus.ODDS_DROPPED
+        else:
+            try:
+                sent = self.client.send_wager(scheduled.wager, test=self.test)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Sending the scheduled bet %s failed",
+                                 scheduled.wager.request_id)
+                sent = False
+            status = FireStatus.SENT if sent else FireStatus.FAILED
+        finished = time.perf_counter()
+        if status in (FireStatus.SENT, FireStatus.FAILED):
+            self._last_request = finished
+
+        fired = FiredBet(scheduled, status, odds, (triggered - deadline) * 1000,
+                         (finished - triggered) * 1000)
+        logger.info("Scheduled bet %s on %s: %s, odds %s, lag %.3f ms, elapsed %.3f ms",
+                    scheduled.wager.request_id, game.list_index, status.value, odds,
+                    fired.lag_ms, fired.elapsed_ms)
+        self.fired.append(fired)
+        if self.on_fired is not None:
+            try:
+                self.on_fired(fired)
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("on_fired failed for %s", scheduled.wager.request_id)
+        return fired
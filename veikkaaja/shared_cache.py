@@ -0,0 +1,194 @@
+"""Share the API responses between the processes of a host
+
+When several tools on the same host poll the same endpoints, a
+SharedCache in a local SQLite file makes each distinct request once per
+freshness window, however many clients are polling:
+
+    cache = SharedCache("/tmp/veikkaaja-cache.sqlite", ttl=10.0)
+    client = VeikkausClient(cache=cache)
+    games = client.upcoming_events(GameTypes.EBET)
+
+The first process to find a stale entry takes a lease on it and makes
+the request, the other processes wait for the result instead of making
+the same request. Only GET requests to the public endpoints are cached,
+the account endpoints are always requested.
+
+Any picklable result can be shared the same way, e.g. the parsed games,
+which are pickled without their client:
+
+    games = cache.get_or_compute("ebet-games", lambda: client.upcoming_events(GameTypes.EBET))
+
+The values are pickled, so the cache file must only be writable by trusted
+processes.
+"""
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+import requests
+
+from veikkaaja import logger
+
+FRESH, CLAIMED, WAIT = "FRESH", "CLAIMED", "WAIT"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, stored_at REAL, value BLOB);
+CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT, expires REAL);
+"""
+
+
+class SharedCache:
+    """A cache with single-flight computation shared by processes"""
+
+    def __init__(self,
+                 path: Union[str, Path],
+                 ttl: float = 10.0,
+                 ttls: Optional[Dict[str, float]] = None,
+                 lease_timeout: float = 30.0,
+                 poll_interval: float = 0.01):
+        """
+        Arguments:
+            path: the SQLite file shared by the processes
+            ttl: seconds an entry stays fresh
+            ttls: (optional) the ttl of the endpoints starting with each prefix
+            lease_timeout: seconds before a lease of a crashed process is taken over
+            poll_interval: seconds between the checks while waiting for a lease
+        """
+        self.path = str(path)
+        self.ttl = ttl
+        self.ttls = ttls or {}
+        self.lease_timeout = lease_timeout
+        self.poll_interval = poll_interval
+        self._local = threading.local()
+        self._connection().executescript(_SCHEMA)
+
+    def _connection(self) -> sqlite3.Connection:
+        """A connection for the calling thread"""
+        # a forked process can not use the connections of its parent
+        pid, connection = getattr(self._local, 'connection', (None, None))
+        if connection is None or pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=10.0, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            self._local.connection = (os.getpid(), connection)
+        return connection
+
+    def ttl_of(self, endpoint: str, declared: Optional[float] = None) -> float:
+        """The freshness window of the endpoint
+
+        Arguments:
+            endpoint: the endpoint
+            declared: (optional) the ttl declared for the endpoint, used
+                      when none of the prefixes in 'ttls' match
+        """
+        for prefix, ttl in self.ttls.items():
+            if endpoint.startswith(prefix):
+                return ttl
+        return self.ttl if declared is None else declared
+
+    def _claim(self, key: str, ttl: float, owner: str) -> Tuple[str, Any]:
+        """Either the FRESH value, the lease CLAIMED for the owner, or WAIT for
+        another process holding the lease"""
+        connection = self._connection()
+        now = time.time()
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            row = connection.execute("SELECT stored_at, value FROM entries WHERE key = ?",
+                                     (key, )).fetchone()
+            if row is not None and now - row[0] < ttl:
+                return FRESH, pickle.loads(row[1])
+
+            lease = connection.execute("SELECT expires FROM leases WHERE key = ?",
+                                       (key, )).fetchone()
+            if lease is not None and lease[0] > now:
+                return WAIT, None
+
+            connection.execute("INSERT OR REPLACE INTO leases VALUES (?, ?, ?)",
+                               (key, owner, now + self.lease_timeout))
+            return CLAIMED, None
+        finally:
+            connection.execute("COMMIT")
+
+    def get_or_compute(self,
+                       key: str,
+                       compute: Callable[[], Any],
+                       ttl: Optional[float] = None) -> Any:
+        """The fresh value of the key, computed by a single caller
+
+        Arguments:
+            key: the cache key
+            compute: makes the value, a None value is returned but not stored
+            ttl: (optional) seconds the value stays fresh, by default the cache's ttl
+        """
+        ttl = self.ttl if ttl is None else ttl
+        owner = uuid.uuid4().hex
+        while True:
+            state, value = self._claim(key, ttl, owner)
+            if state == FRESH:
+                return value
+            if state == CLAIMED:
+                break
+            # another process is computing the value
+            time.sleep(self.poll_interval)
+
+        connection = self._connection()
+        try:
+            value = compute()
+        except BaseException:
+            connection.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+            raise
+
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if value is not None:
+                connection.execute("INSERT OR REPLACE INTO entries VALUES (?, ?, ?)",
+                                   (key, time.time(), pickle.dumps(value)))
+            connection.execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+        finally:
+            connection.execute("COMMIT")
+        return value
+
+    def response(self,
+                 url: str,
+                 endpoint: str,
+                 params: Any,
+                 fetch: Callable[[], Optional[requests.Response]],
+                 ttl: Optional[float] = None) -> Optional[requests.Response]:
+        """The response to a GET request, fetched once per freshness window
+
+        Arguments:
+            url: the url of the request
+            endpoint: the endpoint, for the ttl
+            params: the query parameters
+            fetch: makes the request
+            ttl: (optional) seconds the response stays fresh, by default ttl_of(endpoint)
+        """
+
+        def fetch_body() -> Optional[bytes]:
+            fetched = fetch()
+            return None if fetched is None else fetched.content
+
+        key = f"GET {url}?{json.dumps(params, sort_keys=True)}"
+        ttl = self.ttl_of(endpoint) if ttl is None else ttl
+        body = self.get_or_compute(key, fetch_body, ttl)
+        if body is None:
+            return None
+
+        response = requests.Response()
+        response.status_code = 200
+        response.url = url
+        response.encoding = 'utf-8'
+        response._content = body  # pylint: disable=protected-access
+        logger.debug("Shared response for %s", url)
+        return response
+
+    def clear(self):
+        """Remove every entry"""
+        connection = self._connection()
+        connection.execute("DELETE FROM entries")
+        connection.execute("DELETE FROM leases")
@@ -0,0 +1,375 @@
+"""Paper trading behind the VeikkausClient interface
+
+The SimulatedVeikkausClient has the API of the real client, but it never
+logs in and its wagers never leave the process:
+
+    client = SimulatedVeikkausClient.from_archive(ArchiveReader("archive"),
+                                                  balance=100000)
+    games = client.upcoming_events(GameTypes.EBET)   # the next snapshot
+    client.place_bets(games[:2], [BetDecision(BetTarget.HOME, 100)] * 2, test=False)
+
+The odds are replayed from recorded snapshots of the EBET feed, from
+lists of parsed games, or polled from a live client ('source'). Each
+call of upcoming_events() advances to the next snapshot and the time of
+the snapshot is the time of the simulation.
+
+The wagers are accepted in the payload format of EbetPayloadBuilder and
+checked like the API would check them: the draw has to be open and in
+the current snapshot, the stake has to follow the 'minStake',
+'maxStake' and 'stakeInterval' of the draw, the price has to be the sum
+of the stakes and fit in the balance. The selections of the payload
+only tell the 'listIndex' of the draw, so a bet goes to the first
+market (row) of the draw, see Game.primary. A wager is accepted only once for
+its 'requestId'.
+
+The accepted bets are settled after the close time of their draw, when
+the result of their market is known, from the given results, results
+added with add_results() or closed_games() of the source client. The
+balance, the betting history and the ledger and ticket monitor of the
+client follow the simulated wagers.
+"""
+import heapq
+import itertools
+import json
+from datetime import date, datetime
+from typing import (Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set,
+                    Tuple, Union)
+
+from veikkaaja import logger
+from veikkaaja.endpoints import EndPoint
+from veikkaaja.filters import GameFilter
+from veikkaaja.payload import PreparedWager
+from veikkaaja.recorder import ArchiveReader
+from veikkaaja.responses import MarketResult, TransActionType, Wager
+from veikkaaja.taxonomy import Taxonomy
+from veikkaaja.types import GameTypes
+from veikkaaja.veikkaus_client import Game, VeikkausClient, parse_ebet_draws
+
+# the time of a snapshot, None for the time of the call
+Snapshot = Tuple[Optional[datetime], List[Game]]
+
+
+class WagerRejected(Exception):
+    """The API would not have accepted the wager"""
+
+
+class SimulatedBet(NamedTuple):
+    """A bet accepted by the simulation, the amounts in cents"""
+    external_id: str
+    draw_id: int
+    market: int
+    competitor: int
+    stake: int
+    # in hundredths
+    odds: int
+    placed_at: datetime
+    close_time: datetime
+
+
+class SettledBet(NamedTuple):
+    """A simulated bet with its result"""
+    bet: SimulatedBet
+    # the won or refunded amount in cents
+    payout: int
+    cancelled: bool
+
+
+def _market_key(game: Game) -> Tuple[int, int]:
+    """(draw id, market id) of the game, the key of the results"""
+    return int(game.row_id), int(game.market_id or 0)
+
+
+class SimulatedVeikkausClient(VeikkausClient):
+    """Accept and settle the wagers locally, against replayed odds"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=super-init-not-called
+                 snapshots: Iterable[Union[List[Game], Snapshot]] = (),
+                 source: Optional[VeikkausClient] = None,
+                 results: Iterable[MarketResult] = (),
+                 balance: int = 100000):
+        """
+        Arguments:
+            snapshots: lists of games, or (time, games) tuples, one for each call
+                       of upcoming_events()
+            source: (optional) a client polled for the snapshots after the given
+                    ones, and for the results
+            results: (optional) the results of the closed markets
+            balance: the starting balance in cents
+        """
+        self.session = None
+        self.source = source
+        self.balance = balance
+        self.results: Dict[Tuple[int, int], MarketResult] = {}
+
+        self._snapshots: Iterator[Union[List[Game], Snapshot]] = iter(snapshots)
+        self._now: Optional[datetime] = None
+        # listIndex -> the games (markets) of the draw in the current snapshot
+        self._open: Dict[Union[str, int], List[Game]] = {}
+        # draw id -> close time, of every draw seen
+        self._close_times: Dict[int, datetime] = {}
+        self._request_ids: Set[str] = set()
+        self._serials = itertools.count(1)
+        # (close time, sequence, bet) of the bets before their close time
+        self._pending: List[Tuple[float, int, SimulatedBet]] = []
+        self._sequence = itertools.count()
+        # the closed bets waiting for the result of their market
+        self._closed: Dict[Tuple[int, int], List[SimulatedBet]] = {}
+        # external id -> [unsettled bets, payout] of each wager
+        self._wagers: Dict[str, List[int]] = {}
+        self.history: List[Wager] = []
+        self.settled: List[SettledBet] = []
+        self.add_results(results)
+
+    @classmethod
+    def from_archive(cls,
+                     reader: ArchiveReader,
+                     start: Optional[float] = None,
+                     end: Optional[float] = None,
+                     **kwargs) -> 'SimulatedVeikkausClient':
+        """Replay the EBET snapshots recorded with the ArchiveRecorder
+
+        Arguments:
+            reader: the archive of the recorded responses
+            start: (optional) unix time of the first snapshot
+            end: (optional) unix time of the last snapshot
+            kwargs: the other arguments of the client
+        """
+        endpoint = EndPoint.games_info_endpoint().endpoint
+        snapshots = ((datetime.fromtimestamp(record.timestamp), parse_ebet_draws(record.json()))
+                     for record in reader.records(start, end, endpoint)
+                     if record.status == 200 and record.endpoint == endpoint)
+        return cls(snapshots, **kwargs)
+
+    @property
+    def now(self) -> datetime:
+        """The time of the simulation, the time of the current snapshot"""
+        return datetime.now() if self._now is None else self._now
+
+    def _access_endpoint(self,
+                         endpoint: EndPoint,
+                         payload: Optional[Union[Dict[str, Any], bytes]] = None,
+                         method: Optional[str] = None):
+        """The simulation sends no requests"""
+        logger.debug("Not simulated: '%s'", endpoint.endpoint)
+
+    def login(self, account: str, password: str):
+        """The simulation has no session"""
+
+    def keep_alive(self) -> bool:
+        return True
+
+    def get_balance(self, balance="usableBalance"):
+        """The simulated balance in euros, the open bets are not included"""
+        if self.ledger is not None:
+            self.ledger.synced(self.balance)
+        if balance == "frozenBalance":
+            return 0
+        return self.balance / 100
+
+    # the real client returns the parsed responses.Wager too, despite its annotation
+    def get_betting_history(  # type: ignore[override]
+            self, maximum_results=50, sort_by='TXDATE') -> List[Wager]:
+        """The simulated transactions, the latest first"""
+        assert 0 <= maximum_results <= 50, "Queried result count should be between 0 and 50."
+        wagers = self.history[:-maximum_results - 1:-1] if maximum_results else []
+        if self.ledger is not None:
+            self.ledger.record_transactions(wagers)
+        return wagers
+
+    def upcoming_events(self, game_type: GameTypes,
+                        taxonomy: Optional[Taxonomy] = None,
+                        where: Optional[GameFilter] = None) -> List[Any]:
+        """Advance to the next snapshot of the EBET games
+
+        The last snapshot is returned again when there are no more
+        snapshots and no source client. The whole snapshot is open for
+        the bets, 'where' only filters the returned games.
+        """
+        if game_type != GameTypes.EBET:
+            logger.warning("Not simulated game type: %s", game_type.value)
+            return []
+
+        snapshot = next(self._snapshots, None)
+        if snapshot is None and self.source is not None:
+            snapshot = self.source.upcoming_events(game_type)
+        if snapshot is None:
+            games = [game for markets in self._open.values() for game in markets]
+        else:
+            now, games = snapshot if isinstance(snapshot, tuple) else (None, snapshot)
+            self._now = now
+            self._load(games)
+        if taxonomy is not None:
+            taxonomy.enrich(games)
+        self.settle()
+        if where is not None:
+            return [game for game in games if where.matches(game)]
+        return games
+
+    def _load(self, games: List[Game]):
+        """Make the games the current snapshot"""
+        self._open = {}
+        for game in games:
+            game.attach(self)
+            self._open.setdefault(game.list_index, []).append(game)
+            self._close_times[int(game.row_id)] = game.close_time
+
+    def closed_games(self, day: date) -> List[MarketResult]:
+        """The known results of the markets that closed on the day"""
+        if self.source is not None:
+            self.add_results(self.source.closed_games(day))
+        close_times = self._close_times
+        return [
+            result for result in self.results.values()
+            if result.draw_id in close_times and close_times[result.draw_id].date() == day
+        ]
+
+    def add_results(self, results: Iterable[MarketResult]) -> List[SettledBet]:
+        """Learn the results of the markets and settle the closed bets on them"""
+        for result in results:
+            self.results[(result.draw_id, result.market)] = result
+        return self.settle()
+
+    def send_wager(self, wager: PreparedWager, test=True) -> bool:
+        """Check the wager like the API, and when not testing, place its bets"""
+        try:
+            bets = self._check(wager)
+        except WagerRejected as error:
+            logger.warning("Rejected wager %s: %s", wager.request_id, error)
+            accepted = False
+        else:
+            accepted = True
+            if test or wager.request_id in self._request_ids:
+                # a test or a repeated wager moves no money
+                return accepted
+            self._place(wager, bets)
+
+        if self.ledger is not None and not test:
+            self.ledger.record_wager(wager.price, accepted)
+        return accepted
+
+    def _game(self, list_index: Union[str, int]) -> Game:
+        """The first market of the draw in the current snapshot, the one bet on"""
+        markets = self._open.get(list_index)
+        if not markets:
+            raise WagerRejected(f"unknown draw {list_index}")
+        game = next((game for game in markets if game.primary), None)
+        if game is None:
+            raise WagerRejected(f"the first market of draw {list_index} is not in the snapshot")
+        return game
+
+    def _check(self, wager: PreparedWager) -> List[Tuple[Game, int, int]]:
+        """The (game, competitor, stake) of each bet of a valid wager"""
+        if wager.request_id in self._request_ids:
+            # the API answers to a repeated request like to the first one
+            return []
+        try:
+            body = json.loads(wager.body)
+            boards = body['boards']
+            price = int(body['price'])
+        except (ValueError, KeyError, TypeError) as error:
+            raise WagerRejected(f"malformed payload: {error}") from error
+        if body.get('gameName') != GameTypes.EBET.value:
+            raise WagerRejected(f"not an EBET wager: {body.get('gameName')}")
+
+        now = self.now
+        bets = []
+        total = 0
+        for board in boards:
+            for selection in board.get('selections', []):
+                game = self._game(selection.get('listIndex'))
+                if game.draw.status != "OPEN" or game.status != "OPEN" \
+                        or now >= game.close_time:
+                    raise WagerRejected(f"draw {game.list_index} is closed")
+
+                stake = int(selection.get('stake', 0))
+                rules = game.draw.rule_set
+                if stake < rules.min_stake or stake > rules.max_stake \
+                        or (rules.stake_interval and stake % rules.stake_interval):
+                    raise WagerRejected(f"invalid stake {stake} for draw {game.list_index}")
+
+                for competitor in selection.get('competitors', []):
+                    competitor = int(competitor)
+                    if game.competitor_odds(competitor) <= 0:
+                        raise WagerRejected(
+                            f"no odds for {competitor} in draw {game.list_index}")
+                    bets.append((game, competitor, stake))
+                    total += stake
+
+        if not bets or total != price:
+            raise WagerRejected(f"price {price} is not the sum of the stakes {total}")
+        if price > self.balance:
+            raise WagerRejected(f"price {price} exceeds the balance {self.balance}")
+        return bets
+
+    def _place(self, wager: PreparedWager, bets: List[Tuple[Game, int, int]]):
+        """Take the price from the balance and wait for the results of the bets"""
+        self._request_ids.add(wager.request_id)
+        external_id = str(next(self._serials))
+        now = self.now
+        self.balance -= wager.price
+        self._wagers[external_id] = [len(bets), 0]
+        self.history.append(
+            Wager(result=TransActionType.BUY, amount=-wager.price, accounting_date=now,
+                  external_id=external_id, id=len(self.history), product=GameTypes.EBET))
+
+        draw_ids = []
+        for game, competitor, stake in bets:
+            draw_id, market = _market_key(game)
+            draw_ids.append(draw_id)
+            bet = SimulatedBet(external_id, draw_id, market, competitor, stake,
+                               int(game.competitor_odds(competitor)), now, game.close_time)
+            heapq.heappush(self._pending,
+                           (game.close_time.timestamp(), next(self._sequence), bet))
+
+        if self.tickets is not None:
+            self.tickets.placed(
+                wager.request_id, wager.price, {
+                    'externalId': external_id,
+                    'drawIds': draw_ids,
+                    'transactionTime': int(now.timestamp() * 1000),
+                    'drawEndDate': int(max(bet[0].close_time.timestamp()
+                                           for bet in bets) * 1000),
+                })
+
+    def settle(self, now: Optional[datetime] = None) -> List[SettledBet]:
+        """Settle the closed bets whose results are known
+
+        Arguments:
+            now: (optional) the time of the settlement, by default the time
+                 of the simulation
+        """
+        until = (self.now if now is None else now).timestamp()
+        pending, closed = self._pending, self._closed
+        while pending and pending[0][0] <= until:
+            bet = heapq.heappop(pending)[2]
+            closed.setdefault((bet.draw_id, bet.market), []).append(bet)
+
+        settled: List[SettledBet] = []
+        for key in [key for key in closed if key in self.results]:
+            result = self.results[key]
+            for bet in closed.pop(key):
+                if result.cancelled:
+                    payout = bet.stake
+                elif bet.competitor in result.winners:
+                    payout = bet.stake * bet.odds // 100
+                else:
+                    payout = 0
+                settled.append(SettledBet(bet, payout, result.cancelled))
+                self._settle_wager(bet.external_id, payout)
+        self.settled.extend(settled)
+        return settled
+
+    def _settle_wager(self, external_id: str, payout: int):
+        """Pay out a bet, the wager is in the history once all its bets are settled"""
+        self.balance += payout
+        state = self._wagers[external_id]
+        state[0] -= 1
+        state[1] += payout
+        if state[0] == 0:
+            del self._wagers[external_id]
+            result = TransActionType.WIN if state[1] else TransActionType.LOSS
+            self.history.append(
+                Wager(result=result, amount=state[1], accounting_date=self.now,
+                      external_id=external_id, id=len(self.history), product=GameTypes.EBET))
@@ -0,0 +1,399 @@
+"""Save the games to a binary snapshot that is ready to use when mapped
+
+After a restart, the games of the last snapshot are available before
+the client has logged in and parsed the feed:
+
+    games = LiveGames(client, "ebet.snapshot")
+    games.games       # the saved games, mapped from the file
+    games.refresh()   # the live feed, also saved for the next start
+
+The snapshot holds the games in fixed-width columns and the strings in a
+single table, so loading it is mapping the file and creating the column
+views. The competitors of the games read their ids, names and odds
+straight from the mapped file, nothing is parsed.
+
+The file is little-endian and laid out as:
+
+    header       HEADER: magic, version, created, and the row counts
+    draws        a column for each of DRAW_COLUMNS, a row for each draw
+    markets      a column for each of MARKET_COLUMNS, a row for each game
+    competitors  a column for each of COMPETITOR_COLUMNS
+    strings      'string_count + 1' offsets ('Q') into the utf-8 text that follows
+
+Each column is a packed array of its typecode starting at a multiple of
+8 bytes. The string columns hold indices to the string table. Other tools
+can read the columns with e.g. numpy.frombuffer().
+"""
+import mmap
+import os
+import struct
+import sys
+import time
+from array import array
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from veikkaaja import logger
+from veikkaaja.types import GameTypes
+from veikkaaja.veikkaus_client import Competitors, Draw, EBETType, Game, RuleSet
+
+MAGIC = b"VKSNAP\x00\x01"
+VERSION = 4
+# magic, version, created (unix time), draws, markets, competitors, strings
+HEADER = struct.Struct("<8sIdQQQQ")
+
+# the draw columns, the times in milliseconds like in the API
+DRAW_COLUMNS = (
+    ('draw_id', 'q'),
+    ('list_index', 'I'),
+    ('status', 'I'),
+    ('open_time', 'q'),
+    ('close_time', 'q'),
+    ('draw_time', 'q'),
+    ('results_available_time', 'q'),
+    ('base_price', 'q'),
+    ('max_price', 'q'),
+    ('stake_interval', 'q'),
+    ('min_stake', 'q'),
+    ('max_stake', 'q'),
+    ('min_system_level', 'q'),
+    ('max_system_level', 'q'),
+    ('odds_type', 'I'),
+    ('primary_market', 'I'),
+)
+# a row for each game, 'draw' is the row of its draw
+MARKET_COLUMNS = (
+    ('draw', 'I'),
+    ('market_id', 'I'),
+    ('event_id', 'I'),
+    ('status', 'I'),
+    ('sport_id', 'I'),
+    ('draw_type', 'I'),
+    ('league', 'I'),
+    ('handicap', 'I'),
+    ('excluded_events', 'I'),
+    ('first', 'I'),
+    ('count', 'I'),
+)
+COMPETITOR_COLUMNS = (
+    ('id', 'H'),
+    ('name', 'I'),
+    ('odds', 'I'),
+)
+
+
+def _padded(size: int) -> int:
+    return (size + 7) & ~7
+
+
+def _milliseconds(moment: datetime) -> int:
+    return round(moment.timestamp() * 1000)
+
+
+def _datetime(milliseconds: int) -> datetime:
+    """The time like responses.parse_date() parses it"""
+    return datetime.fromtimestamp(milliseconds / 1000)
+
+
+class _Strings:
+    """Encode the strings to their index in the table"""
+
+    def __init__(self):
+        self.table: List[str] = []
+        self._codes: Dict[str, int] = {}
+
+    def code(self, value: Any) -> int:
+        """The index of the value as a string, None is an empty string"""
+        text = "" if value is None else str(value)
+        code = self._codes.get(text)
+        if code is None:
+            code = self._codes[text] = len(self.table)
+            self.table.append(text)
+        return code
+
+
+def write_snapshot(path: Union[str, Path], games: Sequence[Game],
+                   created: Optional[float] = None):
+    """Save the games, e.g. the result of upcoming_events(GameTypes.EBET)
+
+    The file is replaced atomically, a process that has mapped the
+    previous snapshot keeps reading it.
+
+    Arguments:
+        path: the snapshot file
+        games: the games to save
+        created: (optional) unix time of the games, by default now
+    """
+    # pylint: disable=too-many-locals
+    strings = _Strings()
+    draws = {column: array(typecode) for column, typecode in DRAW_COLUMNS}
+    markets = {column: array(typecode) for column, typecode in MARKET_COLUMNS}
+    competitors = {column: array(typecode) for column, typecode in COMPETITOR_COLUMNS}
+
+    draw_rows: Dict[int, int] = {}
+    for game in games:
+        draw = game.draw
+        row = draw_rows.get(id(draw))
+        if row is None:
+            row = draw_rows[id(draw)] = len(draws['draw_id'])
+            rules = draw.rule_set
+            draw_values = (draw.draw_id or 0, strings.code(draw.list_index),
+                      strings.code(draw.status), _milliseconds(draw.open_time),
+                      _milliseconds(draw.close_time), _milliseconds(draw.draw_time),
+                      _milliseconds(draw.results_available_time), rules.base_price,
+                      rules.max_price, rules.stake_interval, rules.min_stake,
+                      rules.max_stake, rules.min_system_level, rules.max_system_level,
+                      strings.code(rules.odds_type), strings.code(draw.primary_market))
+            for (column, _), value in zip(DRAW_COLUMNS, draw_values):
+                draws[column].append(value)
+
+        first = len(competitors['id'])
+        for competitor, name, odds in zip(game.competitor_ids, game.competitor_names,
+                                          game.odds):
+            competitors['id'].append(competitor)
+            competitors['name'].append(strings.code(name))
+            competitors['odds'].append(odds)
+
+        values = (row, strings.code(game.market_id), strings.code(game.event_id),
+                  strings.code(game.status), strings.code(game.sport_id),
+                  strings.code(None if game.draw_type is None else game.draw_type.value),
+                  strings.code(game.league), strings.code(game.handicap),
+                  strings.code(",".join(game.excluded_events)), first,
+                  len(competitors['id']) - first)
+        for (column, _), value in zip(MARKET_COLUMNS, values):
+            markets[column].append(value)
+
+    text = [string.encode('utf-8') for string in strings.table]
+    offsets = array('Q', [0])
+    for encoded in text:
+        offsets.append(offsets[-1] + len(encoded))
+
+    chunks = [HEADER.pack(MAGIC, VERSION,
+                          time.time() if created is None else created,
+                          len(draws['draw_id']), len(markets['draw']),
+                          len(competitors['id']), len(strings.table))]
+    for table in (draws, markets, competitors):
+        for data in table.values():
+            if sys.byteorder != 'little':
+                data.byteswap()
+            chunks.append(data.tobytes())
+    if sys.byteorder != 'little':
+        offsets.byteswap()
+    chunks.append(offsets.tobytes())
+    chunks.append(b"".join(text))
+
+    path = Path(path)
+    temporary = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    with open(temporary, 'wb') as snapshot:
+        for chunk in chunks:
+            snapshot.write(chunk)
+            snapshot.write(b"\x00" * (_padded(len(chunk)) - len(chunk)))
+    os.replace(temporary, path)
+
+
+class _StringColumn:
+    """Strings of the table decoded on access"""
+
+    def __init__(self, codes: memoryview, table: 'StringTable'):
+        self.codes = codes
+        self.table = table
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.table[code] for code in self.codes[index]]
+        return self.table[self.codes[index]]
+
+
+class StringTable:
+    """The string table of a mapped snapshot"""
+
+    def __init__(self, offsets: memoryview, text: memoryview):
+        self.offsets = offsets
+        self.text = text
+        self._decoded: Dict[int, str] = {}
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        string = self._decoded.get(code)
+        if string is None:
+            string = self._decoded[code] = str(
+                self.text[self.offsets[code]:self.offsets[code + 1]], 'utf-8')
+        return string
+
+
+class GameSnapshot(Sequence):
+    """The games of a snapshot file, read-only and mapped to memory
+
+    The games are created on first access. The columns are available as
+    memoryviews in 'draws', 'markets' and 'competitors'.
+    """
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self, path: Union[str, Path], client=None):
+        """
+        Arguments:
+            path: the snapshot file
+            client: (optional) the client for placing bets on the games
+        """
+        # pylint: disable=too-many-locals
+        self.path = Path(path)
+        self.client = client
+        with open(self.path, 'rb') as snapshot:
+            self._map = mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(self._map)
+        if len(view) < HEADER.size:
+            raise ValueError(f"{self.path} is not a snapshot")
+        magic, version, created, draw_count, market_count, competitor_count, string_count = \
+            HEADER.unpack_from(view)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path} is not a snapshot of version {VERSION}")
+        if sys.byteorder != 'little':
+            raise ValueError("The snapshots are only mapped on little-endian machines")
+        self.created = created
+
+        offset = _padded(HEADER.size)
+        self._views: List[memoryview] = [view]
+
+        def column(typecode: Any, count: int) -> memoryview:
+            nonlocal offset
+            size = struct.calcsize(typecode) * count
+            if offset + size > len(view):
+                raise ValueError(f"{self.path} is truncated")
+            columns = view[offset:offset + size].cast(typecode)
+            self._views.append(columns)
+            offset = _padded(offset + size)
+            return columns
+
+        self.draws = {name: column(typecode, draw_count) for name, typecode in DRAW_COLUMNS}
+        self.markets = {
+            name: column(typecode, market_count)
+            for name, typecode in MARKET_COLUMNS
+        }
+        self.competitors = {
+            name: column(typecode, competitor_count)
+            for name, typecode in COMPETITOR_COLUMNS
+        }
+        offsets = column('Q', string_count + 1)
+        text = view[offset:offset + offsets[-1]]
+        self._views.append(text)
+        self.strings = StringTable(offsets, text)
+
+        self._competitors = Competitors.__new__(Competitors)
+        self._competitors.ids = self.competitors['id']
+        self._competitors.odds = self.competitors['odds']
+        self._competitors.names = _StringColumn(  # type: ignore
+            self.competitors['name'], self.strings)
+        self._draws: List[Optional[Draw]] = [None] * draw_count
+        self._games: List[Optional[Game]] = [None] * market_count
+        self._rule_sets: Dict[Tuple[int, ...], RuleSet] = {}
+
+    def __len__(self):
+        return len(self._games)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[position] for position in range(*index.indices(len(self)))]
+        game = self._games[index]
+        if game is None:
+            game = self._games[index] = self._game(index if index >= 0 else len(self) + index)
+        return game
+
+    def __iter__(self) -> Iterator[Game]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def _draw(self, row: int) -> Draw:
+        draw = self._draws[row]
+        if draw is None:
+            columns, strings = self.draws, self.strings
+            key = tuple(columns[name][row] for name, _ in DRAW_COLUMNS[7:14])
+            rules = self._rule_sets.get(key)
+            if rules is None:
+                rules = self._rule_sets[key] = RuleSet._make(
+                    key + (strings[columns['odds_type'][row]], ))
+            draw = self._draws[row] = Draw(
+                draw_id=columns['draw_id'][row],
+                list_index=strings[columns['list_index'][row]],
+                status=strings[columns['status'][row]],
+                open_time=_datetime(columns['open_time'][row]),
+                close_time=_datetime(columns['close_time'][row]),
+                draw_time=_datetime(columns['draw_time'][row]),
+                results_available_time=_datetime(columns['results_available_time'][row]),
+                rule_set=rules,
+                primary_market=strings[columns['primary_market'][row]])
+        return draw
+
+    def _game(self, index: int) -> Game:
+        columns, strings = self.markets, self.strings
+        game = Game(self.client, self._draw(columns['draw'][index]), self._competitors,
+                    columns['first'][index], columns['count'][index])
+        game.market_id = strings[columns['market_id'][index]]
+        game.event_id = strings[columns['event_id'][index]]
+        game.status = strings[columns['status'][index]]
+        game.sport_id = strings[columns['sport_id'][index]]
+        draw_type = strings[columns['draw_type'][index]]
+        game.draw_type = EBETType.parse(draw_type) if draw_type else None
+        game.league = strings[columns['league'][index]]
+        game.handicap = strings[columns['handicap'][index]]
+        excluded_events = strings[columns['excluded_events'][index]]
+        game.excluded_events = tuple(excluded_events.split(",")) if excluded_events else ()
+        return game
+
+    def close(self):
+        """Unmap the file, the games of the snapshot can no longer be used"""
+        self._competitors = None
+        self._games = [None] * len(self._games)
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class LiveGames:
+    """The snapshot games at startup, the live games after a refresh"""
+
+    def __init__(self, client, path: Union[str, Path], game_type: GameTypes = GameTypes.EBET):
+        """
+        Arguments:
+            client: the client fetching the live games
+            path: the snapshot file, loaded now if it exists and saved on each refresh
+            game_type: the games to fetch
+        """
+        self.client = client
+        self.path = Path(path)
+        self.game_type = game_type
+        self.games: Sequence[Game] = []
+        # unix time of the games
+        self.updated = 0.0
+        if self.path.exists():
+            try:
+                snapshot = GameSnapshot(self.path, client)
+            except ValueError as error:
+                logger.warning("Not loading the snapshot: %s", error)
+            else:
+                self.games, self.updated = snapshot, snapshot.created
+
+    def refresh(self) -> bool:
+        """Fetch the live games and save them, False if the request failed"""
+        games = self.client.upcoming_events(self.game_type)
+        if not games:
+            return False
+        updated = time.time()
+        write_snapshot(self.path, games, created=updated)
+        # replacing the reference is atomic, readers keep the games they have
+        self.games, self.updated = games, updated
+        return True
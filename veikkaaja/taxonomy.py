@@ -0,0 +1,186 @@
+"""Crawl the sports taxonomy for joining leagues to games
+
+The draws from EndPoint.games_info_endpoint do not tell in which league
+the game is played. Instead of querying VeikkausClient.event_info() for
+every game, the crawler walks the sports taxonomy
+
+    sport_types -> sport_categories -> sport_tournaments -> sport_tournament_info
+
+once, and indexes the events of each tournament by the event id.
+
+    crawler = TaxonomyCrawler(client)
+    taxonomy = crawler.crawl()
+    taxonomy.save("taxonomy.json")
+
+    games = client.upcoming_events(GameTypes.EBET, taxonomy=taxonomy)
+"""
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Union
+
+import requests
+
+from veikkaaja import logger
+
+
+class League(NamedTuple):
+    """Where in the sports taxonomy an event belongs to"""
+    sport_id: str
+    sport: str
+    category_id: str
+    category: str
+    tournament_id: str
+    tournament: str
+
+
+class Taxonomy:
+    """A snapshot of the sports taxonomy
+
+    The snapshot is a tree of sports, categories and tournaments,
+    where each tournament lists the ids of its events:
+
+        {
+            "crawled_at": 1636746180.0,
+            "sports": [
+                {
+                    "id": "1",
+                    "name": "Jalkapallo",
+                    "categories": [
+                        {
+                            "id": "2",
+                            "name": "Englanti",
+                            "tournaments": [
+                                {
+                                    "id": "1",
+                                    "name": "Valioliiga",
+                                    "events": ["99925698", ...]
+                                }
+                            ]
+                        }
+                    ]
+                }
+            ]
+        }
+    """
+
+    def __init__(self, sports: List[Dict[str, Any]], crawled_at: float = 0.0):
+        self.sports = sports
+        self.crawled_at = crawled_at
+        self.events: Dict[str, League] = {}
+
+        for sport in sports:
+            for category in sport.get('categories', []):
+                for tournament in category.get('tournaments', []):
+                    league = League(sport['id'], sport['name'], category['id'],
+                                    category['name'], tournament['id'], tournament['name'])
+                    for event_id in tournament.get('events', []):
+                        self.events[event_id] = league
+
+    def __len__(self):
+        return len(self.events)
+
+    def __repr__(self):
+        return f"{self.__class__.__name__}: {len(self.sports)} sports, {len(self)} events"
+
+    def league_of(self, event_id: Union[str, int]) -> Optional[League]:
+        """The league of the event or None if the event is not known"""
+        return self.events.get(str(event_id))
+
+    def enrich(self, games: Iterable) -> int:
+        """Fill the league for each game whose event is in the taxonomy
+
+        Returns:
+            the number of games the league was found for
+        """
+        found = 0
+        events = self.events
+        for game in games:
+            league = events.get(str(game.event_id))
+            if league is not None:
+                game.league = league.tournament
+                found += 1
+        return found
+
+    def save(self, path: Union[str, Path]):
+        """Write the snapshot to disk as json"""
+        Path(path).write_text(json.dumps({
+            "crawled_at": self.crawled_at,
+            "sports": self.sports
+        }),
+                               encoding="utf-8")
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> 'Taxonomy':
+        """Read a snapshot written by Taxonomy.save()"""
+        data = json.loads(Path(path).read_text(encoding="utf-8"))
+        return cls(data.get('sports', []), data.get('crawled_at', 0.0))
+
+
+class TaxonomyCrawler:
+    """Concurrently walk the sports taxonomy of the API"""
+
+    def __init__(self,
+                 client,
+                 max_workers: int = 8,
+                 sport_ids: Optional[Sequence[Union[str, int]]] = None):
+        """
+        Arguments:
+            client: an authenticated VeikkausClient
+            max_workers: number of requests sent concurrently
+            sport_ids: (optional) crawl only these sports
+        """
+        self.client = client
+        self.max_workers = max_workers
+        self.sport_ids = None if sport_ids is None else {str(sport) for sport in sport_ids}
+
+    def _fetch(self, method, *args) -> Optional[Dict[str, Any]]:
+        """Query a single node of the taxonomy, failed nodes are skipped"""
+        try:
+            data = method(*args)
+        except requests.RequestException as error:
+            logger.warning("Skipping taxonomy node %s: %s", args, error)
+            return None
+        return data if isinstance(data, dict) else None
+
+    def crawl(self) -> Taxonomy:
+        """Query the whole taxonomy, one level at a time"""
+        client = self.client
+
+        sports = [{
+            'id': sport['id'],
+            'name': sport['name'],
+            'categories': []
+        } for sport in client.sport_types()
+                  if self.sport_ids is None or sport['id'] in self.sport_ids]
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+
+            results = executor.map(lambda sport: self._fetch(
+                client.sport_categories, sport['id']), sports)
+            categories = []
+            for sport, data in zip(sports, results):
+                for category in (data or {}).get('categories', []):
+                    node = {'id': category['id'], 'name': category['name'], 'tournaments': []}
+                    sport['categories'].append(node)
+                    categories.append((sport, node))
+
+            results = executor.map(lambda item: self._fetch(
+                client.sport_tournaments, item[0]['id'], item[1]['id']), categories)
+            tournaments = []
+            for (sport, category), data in zip(categories, results):
+                for tournament in (data or {}).get('tournaments', []):
+                    node = {'id': tournament['id'], 'name': tournament['name'], 'events': []}
+                    category['tournaments'].append(node)
+                    tournaments.append((sport, category, node))
+
+            results = executor.map(lambda item: self._fetch(
+                client.sport_tournament_info, item[0]['id'], item[1]['id'], item[2]['id']),
+                                   tournaments)
+            for (_, _, tournament), data in zip(tournaments, results):
+                tournament['events'] = [event['id'] for event in (data or {}).get('events', [])]
+
+        taxonomy = Taxonomy(sports, crawled_at=time.time())
+        logger.info("Crawled %s", taxonomy)
+        return taxonomy
@@ -0,0 +1,336 @@
+"""Follow the placed wagers until they are settled
+
+The TicketMonitor keeps the open tickets of the client and checks them
+in batches, instead of polling each ticket separately:
+
+    monitor = TicketMonitor(client, on_settled=print)
+    client.place_bets(games, bets, test=False)   # tracked automatically
+    monitor.run(stop)
+
+A ticket is not checked before the results of all of its draws should be
+available ('resultsAvailableTime' of the draws). After that it is checked
+with a backoff, 'min_interval' seconds doubling up to 'max_interval'.
+A check of any number of due tickets is a single betting history
+request, and the details of at most 'detail_batch' tickets that the
+history does not settle.
+
+A check only sees the latest 50 transactions of the history. A ticket
+that neither the history nor its details settle within 'expire_after'
+seconds of its results time is given up with an EXPIRED event, so that
+the open tickets do not pile up when the history moves past them.
+
+The history is expected to list the purchase (BUY) of each ticket and
+the WIN and LOSS transactions with the same 'externalId'. A ticket is
+linked to a purchase of the same price made within 'LINK_WINDOW' of
+placing it, the older purchases (e.g. manual bets, or the bets of another
+process) are left alone. The ticket details are
+expected to have a 'status' like WON, LOST or CANCELLED, and the won
+amount in 'winAmount' or 'win'.
+"""
+import threading
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+from typing import (Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Sequence,
+                    Tuple)
+
+from veikkaaja import logger
+from veikkaaja.payload import new_request_id
+from veikkaaja.responses import TransActionType, Wager, parse_date
+
+
+class TicketOutcome(Enum):
+    """How a ticket was settled"""
+    WON = "WON"
+    LOST = "LOST"
+    # the stake was refunded
+    CANCELLED = "CANCELLED"
+    # not settled in time by the history or the details, the result is unknown
+    EXPIRED = "EXPIRED"
+
+
+class Ticket:
+    """A placed wager waiting for its results"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 request_id: str,
+                 price: int,
+                 draw_ids: Tuple[int, ...],
+                 placed_at: datetime,
+                 results_at: datetime,
+                 *,
+                 external_id: Optional[str] = None):
+        """
+        Arguments:
+            request_id: the requestId of the wager
+            price: the price in cents
+            draw_ids: the draws of the bets
+            placed_at: when the wager was accepted
+            results_at: when the results of all the draws should be available
+            external_id: (optional) the id of the ticket in the betting history
+        """
+        self.request_id = request_id
+        self.price = price
+        self.draw_ids = draw_ids
+        self.placed_at = placed_at
+        self.results_at = results_at
+        self.external_id = external_id
+        # the checks after the results time
+        self.checks = 0
+        # unix time of the next check
+        self.next_check = results_at.timestamp()
+
+    def __repr__(self):
+        return (f"{self.__class__.__name__}({self.external_id or self.request_id}, "
+                f"{self.price / 100} €, results {self.results_at:%d.%m.%Y %H:%M})")
+
+
+class TicketSettled(NamedTuple):
+    """A ticket got its result"""
+    ticket: Ticket
+    outcome: TicketOutcome
+    # the won or refunded amount in cents
+    amount: int
+    settled_at: datetime
+
+
+# the most the purchase time may differ from the time the ticket was placed
+LINK_WINDOW = timedelta(minutes=5)
+
+_OUTCOMES = {
+    'WON': TicketOutcome.WON,
+    'WIN': TicketOutcome.WON,
+    'LOST': TicketOutcome.LOST,
+    'LOSS': TicketOutcome.LOST,
+    'CANCELLED': TicketOutcome.CANCELLED,
+    'CANCELED': TicketOutcome.CANCELLED,
+    'VOID': TicketOutcome.CANCELLED,
+    'REFUNDED': TicketOutcome.CANCELLED,
+}
+
+
+class TicketMonitor:
+    """The open tickets of a client, checked in batches"""
+
+    # pylint: disable=too-many-instance-attributes
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 client,
+                 on_settled: Optional[Callable[[TicketSettled], Any]] = None,
+                 *,
+                 min_interval: float = 60.0,
+                 max_interval: float = 1800.0,
+                 detail_batch: int = 5,
+                 results_delay: float = 7200.0,
+                 expire_after: Optional[float] = 7 * 24 * 3600.0):
+        """Attach the monitor to the client, its real wagers are tracked
+
+        Arguments:
+            client: the VeikkausClient
+            on_settled: (optional) called with each settled ticket
+            min_interval: seconds between the checks of a ticket after its results time
+            max_interval: the longest backoff between the checks
+            detail_batch: the most ticket details requested per check
+            results_delay: seconds from the close of a draw to its results, for the
+                           draws whose results time is not known
+            expire_after: (optional) seconds after the results time to give up a ticket,
+                          None to check the tickets until they are settled
+        """
+        self.client = client
+        self.on_settled = on_settled
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.detail_batch = detail_batch
+        self.results_delay = results_delay
+        self.expire_after = expire_after
+        self.settled: List[TicketSettled] = []
+
+        self._open: Dict[str, Ticket] = {}
+        # draw id -> results available time, from the observed games
+        self._results_times: Dict[int, datetime] = {}
+        # the purchases already linked to a ticket
+        self._linked: Dict[str, Ticket] = {}
+        self._lock = threading.RLock()
+        client.tickets = self
+
+    @property
+    def open_tickets(self) -> List[Ticket]:
+        """The tickets waiting for their results"""
+        with self._lock:
+            return list(self._open.values())
+
+    def observe(self, games: Iterable[Any]):
+        """Learn the results times of the draws of the games"""
+        with self._lock:
+            for game in games:
+                self._results_times[game.draw.draw_id] = game.draw.results_available_time
+
+    def track(self,
+              request_id: str,
+              price: int,
+              draw_ids: Sequence[int],
+              close_time: Optional[datetime] = None,
+              placed_at: Optional[datetime] = None) -> Ticket:
+        """Follow a placed wager
+
+        Arguments:
+            request_id: the requestId of the wager, a new id if empty
+            price: the price in cents
+            draw_ids: the draws of the bets
+            close_time: (optional) the latest close time of the draws, for the draws
+                        not observed
+            placed_at: (optional) when the wager was accepted, by default now
+        """
+        request_id = request_id or new_request_id()
+        placed_at = datetime.now() if placed_at is None else placed_at
+        fallback = (close_time or placed_at) + timedelta(seconds=self.results_delay)
+        with self._lock:
+            results_at = max((self._results_times.get(draw_id, fallback)
+                              for draw_id in draw_ids), default=fallback)
+            ticket = Ticket(request_id, price, tuple(draw_ids), placed_at, results_at)
+            self._open[request_id] = ticket
+        logger.info("Tracking %s", ticket)
+        return ticket
+
+    def placed(self, request_id: str, price: int, response: Dict[str, Any]) -> Ticket:
+        """Follow a wager accepted by the API, from the response to the wager"""
+        close_time = response.get('drawEndDate')
+        placed_at = response.get('transactionTime')
+        external_id = response.get('externalId') or response.get('serialNumber')
+        draw_ids = [int(draw) for draw in response.get('drawIds', [])]
+        ticket = self.track(request_id, price, draw_ids,
+                            None if close_time is None else parse_date(close_time),
+                            None if placed_at is None else parse_date(placed_at))
+        if external_id:
+            self._link(ticket, str(external_id))
+        return ticket
+
+    def next_check(self) -> Optional[float]:
+        """Unix time of the next due check, None without open tickets"""
+        with self._lock:
+            return min((ticket.next_check for ticket in self._open.values()), default=None)
+
+    def check(self, now: Optional[float] = None) -> List[TicketSettled]:
+        """Check the due tickets, a single history request for all of them"""
+        now = time.time() if now is None else now
+        expired = self.expire(now)
+        with self._lock:
+            due = [ticket for ticket in self._open.values() if ticket.next_check <= now]
+        if not due:
+            return expired
+
+        # the client passes the history to the ledger too
+        events = expired + self.record_history(
+            self.client.get_betting_history(maximum_results=50))
+
+        with self._lock:
+            waiting = [ticket for ticket in due if ticket.request_id in self._open]
+        for ticket in [ticket for ticket in waiting if ticket.external_id][:self.detail_batch]:
+            event = self._settle_from_details(ticket)
+            if event is not None:
+                events.append(event)
+                waiting.remove(ticket)
+
+        for ticket in waiting:
+            ticket.next_check = now + min(self.max_interval,
+                                          self.min_interval * 2**ticket.checks)
+            ticket.checks += 1
+        return events
+
+    def expire(self, now: Optional[float] = None) -> List[TicketSettled]:
+        """Give up the tickets open 'expire_after' seconds past their results time"""
+        if self.expire_after is None:
+            return []
+        now = time.time() if now is None else now
+        with self._lock:
+            expired = [
+                ticket for ticket in self._open.values()
+                if now - ticket.results_at.timestamp() >= self.expire_after
+            ]
+            for ticket in expired:
+                logger.warning("%s was not settled in time, giving up", ticket)
+            events = [self._settle(ticket, TicketOutcome.EXPIRED, 0) for ticket in expired]
+        self._emit(events)
+        return events
+
+    def record_history(self, wagers: Iterable[Wager]) -> List[TicketSettled]:
+        """Link the purchases to the tickets and settle the tickets with results"""
+        wagers = sorted(wagers, key=lambda wager: wager.accounting_date)
+        events = []
+        with self._lock:
+            for wager in wagers:
+                if wager.result == TransActionType.BUY and wager.external_id not in self._linked:
+                    ticket = self._unlinked(abs(wager.amount), wager.accounting_date)
+                    if ticket is not None:
+                        self._link(ticket, wager.external_id)
+
+            for wager in wagers:
+                ticket = self._linked.get(wager.external_id)
+                if ticket is None or ticket.request_id not in self._open:
+                    continue
+                if wager.result == TransActionType.WIN:
+                    events.append(self._settle(ticket, TicketOutcome.WON, abs(wager.amount)))
+                elif wager.result == TransActionType.LOSS:
+                    events.append(self._settle(ticket, TicketOutcome.LOST, 0))
+        self._emit(events)
+        return events
+
+    def _unlinked(self, price: int, bought_at: datetime) -> Optional[Ticket]:
+        """The earliest ticket with the price and no purchase yet, placed about when bought"""
+        # the accounting time may differ slightly from the time of the response
+        candidates = [
+            ticket for ticket in self._open.values()
+            if ticket.external_id is None and ticket.price == price
+            and abs(ticket.placed_at - bought_at) <= LINK_WINDOW
+        ]
+        return min(candidates, key=lambda ticket: ticket.placed_at, default=None)
+
+    def _link(self, ticket: Ticket, external_id: str):
+        ticket.external_id = external_id
+        self._linked[external_id] = ticket
+
+    def _settle_from_details(self, ticket: Ticket) -> Optional[TicketSettled]:
+        details = self.client.get_bet_event_information(ticket.external_id)
+        if not isinstance(details, dict):
+            return None
+        outcome = _OUTCOMES.get(str(details.get('status', "")).upper())
+        if outcome is None:
+            return None
+        amount = int(details.get('winAmount') or details.get('win') or 0)
+        if outcome == TicketOutcome.CANCELLED:
+            amount = amount or ticket.price
+        with self._lock:
+            event = self._settle(ticket, outcome, amount)
+        self._emit([event])
+        return event
+
+    def _settle(self, ticket: Ticket, outcome: TicketOutcome, amount: int) -> TicketSettled:
+        self._open.pop(ticket.request_id, None)
+        event = TicketSettled(ticket, outcome, amount, datetime.now())
+        self.settled.append(event)
+        logger.info("%s settled: %s %s €", ticket, outcome.value, amount / 100)
+        return event
+
+    def _emit(self, events: List[TicketSettled]):
+        if self.on_settled is not None:
+            for event in events:
+                self.on_settled(event)
+
+    def run(self, stop: Optional[threading.Event] = None, idle: float = 60.0):
+        """Check the tickets when they are due until 'stop' is set
+
+        Arguments:
+            stop: (optional) set to return
+            idle: seconds to wait when there are no open tickets
+        """
+        stop = threading.Event() if stop is None else stop
+        while not stop.is_set():
+            try:
+                self.check()
+            except Exception:  # pylint: disable=broad-except
+                logger.exception("Checking the tickets failed")
+            next_check = self.next_check()
+            wait = idle if next_check is None else next_check - time.time()
+            stop.wait(max(1.0, min(wait, idle)))
@@ -1,5 +1,6 @@
 """Collection of types"""
 from enum import Enum
+from typing import NamedTuple, Union
 
 
 class ParseableEnum(Enum):
@@ -26,3 +27,36 @@ class GameTypes(ParseableEnum):
     TRIFECTA = "TRIFECTA"  # Supertripla
     EBET = "EBET"  # Pitkäveto
     RAVI = "RAVI"  # Moniveikkaus
+
+
+class BetTarget(Enum):
+    """Currently only 1x2 supported"""
+    HOME = "HOME"
+    X = "X"
+    AWAY = "AWAY"
+
+
+class BetDecision(NamedTuple):
+    """What to bet on a market
+
+    The target is either a 1x2 BetTarget or the id of a competitor,
+    e.g. a player of an outright market, see Game.competitor_ids.
+    """
+    # what to be
+    target: Union[BetTarget, int]
+    # how much to bet in cents
+    amount: int
+
+
+# The competitor ids the API uses for the 1x2 bet targets
+COMPETITOR_IDS = {BetTarget.HOME: 1, BetTarget.X: 3, BetTarget.AWAY: 2}
+
+
+def competitor_id(target: Union[BetTarget, int]) -> int:
+    """The competitor id sent to the API for the bet target"""
+    if isinstance(target, int):
+        return target
+    try:
+        return COMPETITOR_IDS[target]
+    except KeyError:
+        raise TypeError(f"invalid bet target {target}") from None
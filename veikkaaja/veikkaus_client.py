@@ -1,31 +1,41 @@
 """Main veikkaus client module"""
+# pylint: disable=too-many-lines
+import itertools
 import json
+import logging
 import os
-from datetime import datetime
+import time
+from array import array
+from datetime import date, datetime
 from enum import Enum
-from typing import Any, Dict, List, NamedTuple, Union
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
 
 import requests
+from requests.adapters import HTTPAdapter
 
 from veikkaaja import logger
-from veikkaaja.endpoints import EndPoint
-from veikkaaja.responses import ResponseType, parse_response
-from veikkaaja.types import GameTypes, ParseableEnum
+from veikkaaja.endpoints import EndPoint, RequestGate
+from veikkaaja.filters import GameFilter
+from veikkaaja.ledger import AccountLedger
+from veikkaaja.payload import EbetPayloadBuilder, PreparedWager, check_primary
+from veikkaaja.pool_games import PoolDraw, SystemBet, parse_pool_draws, pool_payload
+from veikkaaja.recorder import ArchiveRecorder
+from veikkaaja.responses import MarketResult, parse_date
+from veikkaaja.shared_cache import SharedCache
+from veikkaaja.taxonomy import Taxonomy
+from veikkaaja.tickets import TicketMonitor
+# BetTarget and BetDecision used to live here, keep them importable
+from veikkaaja.types import (  # pylint: disable=unused-import
+    BetDecision, BetTarget, GameTypes, ParseableEnum, competitor_id)
 
 
-class BetTarget(Enum):
-    """Currently only 1x2 supported"""
-    HOME = "HOME"
-    X = "X"
-    AWAY = "AWAY"
+_REQUEST_COUNTER = itertools.count(1)
 
 
-class BetDecision(NamedTuple):
-    """Currently only 1x2 supported"""
-    # what to be
-    target: BetTarget
-    # how much to bet in cents
-    amount: int
+def next_request_id() -> str:
+    """An id for following a single API request in the logs"""
+    return f"{os.getpid():x}-{next(_REQUEST_COUNTER)}"
+
 
 class EBETType(ParseableEnum):
     """
@@ -38,44 +48,299 @@ class EBETType(ParseableEnum):
     OVER_UNDER = "OVER_UNDER"
     OUTRIGHT_SHORT_TERM = "OUTRIGHT_SHORT_TERM"
 
+class RuleSet(NamedTuple):
+    """The stake rules of a draw, the same rules are shared by many draws"""
+    base_price: int = 0
+    max_price: int = 0
+    stake_interval: int = 0
+    min_stake: int = 0
+    max_stake: int = 0
+    min_system_level: int = 0
+    max_system_level: int = 0
+    odds_type: str = ""
+
+    @classmethod
+    def parse(cls, rules: Dict[str, Any], known: Dict[tuple, 'RuleSet']) -> 'RuleSet':
+        """Parse 'gameRuleSet' of a draw, reusing the equal rule set from 'known'"""
+        key = (rules.get('basePrice', 0), rules.get('maxPrice', 0),
+               rules.get('stakeInterval', 0), rules.get('minStake', 0),
+               rules.get('maxStake', 0), rules.get('minSystemLevel', 0),
+               rules.get('maxSystemLevel', 0), rules.get('oddsType', ""))
+        rule_set = known.get(key)
+        if rule_set is None:
+            rule_set = known[key] = cls(*key)
+        return rule_set
+
+
+class Draw(NamedTuple):
+    """Draw level information, shared by all the markets (rows) of the draw"""
+    draw_id: int = 0
+    list_index: Union[str, int] = 0
+    status: str = ""
+    open_time: datetime = datetime.fromtimestamp(0)
+    close_time: datetime = datetime.fromtimestamp(0)
+    draw_time: datetime = datetime.fromtimestamp(0)
+    results_available_time: datetime = datetime.fromtimestamp(0)
+    rule_set: RuleSet = RuleSet()
+    # the id of the first market (row), the one a wager on the list index bets on
+    primary_market: str = ""
+
+
+class Competitors:
+    """The competitors of all the markets of a feed in flat arrays
+
+    A market refers to its competitors by the position of its first
+    competitor and the number of competitors.
+    """
+    __slots__ = ('ids', 'names', 'odds')
+
+    def __init__(self):
+        self.ids = array('H')
+        self.names: List[str] = []
+        # in hundredths, e.g. 245 for odds of 2.45
+        self.odds = array('I')
+
+    def __len__(self):
+        return len(self.ids)
+
+    def append(self, competitor: Dict[str, Any]):
+        """Add a competitor from the API response"""
+        self.ids.append(int(competitor.get('id', 0)))
+        self.names.append(competitor.get('name', ""))
+        self.odds.append(int((competitor.get('odds') or {}).get('odds') or 0))
+
+
+_NO_COMPETITORS = Competitors()
+_NO_DRAW = Draw()
+
+
 class Game:
-    """A class for holding EBET event information"""
+    """A class for holding EBET event information
+
+    Each Game is a single market (a row of a draw), e.g. the 1X2 or the
+    handicap market of a match. The draw information is shared by the
+    markets of the same draw and the competitors are stored in the flat
+    arrays shared by all the markets of the parsed feed.
+    """
 
     # pylint:disable=too-many-instance-attributes
     # This is intended just as a wrapper to hold the
     # data in the API response
-
-    home_team = ""
-    away_team = ""
-    home_odds = 0.0
-    away_odds = 0.0
-    draw_odds = 0.0
-    event_id = 0
-    row_id = 0
-    # TODO: removed from the response, consider storing hte gametype
-    # e.g. EBET here
-    draw_type: Union[EBETType, None] = None
-    status = ""
-    list_index = 0
-    close_time = datetime.fromtimestamp(0)
-    league = ""
-    sport_id = 0
-    min_stake = 0
-
-    def __init__(self, client: 'VeikkausClient'):
-        """"""
-        self._client: VeikkausClient = client
+    __slots__ = ('_client', 'draw', 'market_id', 'event_id', 'status', 'sport_id',
+                 'draw_type', 'league', 'handicap', 'excluded_events', '_competitors', '_first',
+                 '_count')
+
+    def __init__(self,
+                 client: Optional['VeikkausClient'],
+                 draw: Draw = _NO_DRAW,
+                 competitors: Competitors = _NO_COMPETITORS,
+                 first: int = 0,
+                 count: int = 0):
+        """
+        Arguments:
+            client: the client used for placing bets on this game,
+                    None for games parsed without a client
+            draw: the draw the market belongs to
+            competitors: the competitor arrays of the feed
+            first: position of the first competitor of this market in 'competitors'
+            count: the number of competitors of this market
+        """
+        self._client = client
+        self.draw = draw
+        # the row id within the draw
+        self.market_id = ""
+        self.event_id: Union[str, int] = 0
+        self.status = ""
+        self.sport_id: Union[str, int] = 0
+        # TODO: removed from the response, consider storing hte gametype
+        # e.g. EBET here
+        self.draw_type: Union[EBETType, None] = None
+        self.league = ""
+        # the line of a handicap or over/under market, e.g. "2.00"
+        self.handicap = ""
+        # the events that cannot be bet together with this market
+        self.excluded_events: Tuple[str, ...] = ()
+        self._competitors = competitors
+        self._first = first
+        self._count = count
+
+    @property
+    def row_id(self) -> int:
+        """The id of the draw"""
+        return self.draw.draw_id
+
+    @property
+    def list_index(self) -> Union[str, int]:
+        """The list index of the draw, used when betting"""
+        return self.draw.list_index
+
+    @property
+    def close_time(self) -> datetime:
+        """When the betting closes"""
+        return self.draw.close_time
+
+    @property
+    def min_stake(self) -> int:
+        """Minimum stake in cents"""
+        return self.draw.rule_set.min_stake
+
+    @property
+    def competitor_ids(self) -> List[int]:
+        """The ids of the competitors, used as bet targets"""
+        return self._competitors.ids[self._first:self._first + self._count].tolist()
+
+    @property
+    def competitor_names(self) -> List[str]:
+        """The names of the competitors"""
+        return self._competitors.names[self._first:self._first + self._count]
+
+    @property
+    def odds(self) -> List[int]:
+        """The odds of the competitors in hundredths"""
+        return self._competitors.odds[self._first:self._first + self._count].tolist()
+
+    @property
+    def primary(self) -> bool:
+        """Whether this is the market a wager on the list index of the draw bets on
+
+        The wager selections name only the list index of the draw, not the
+        market (row), so only the first market of a draw can be bet.
+        """
+        return not self.draw.primary_market or str(self.market_id) == self.draw.primary_market
+
+    @property
+    def competitor_slice(self) -> Tuple[Competitors, int, int]:
+        """The shared competitor arrays, the position and the number of this market's competitors"""
+        return self._competitors, self._first, self._count
+
+    def _position(self, competitor: int) -> int:
+        """Position of the competitor in the competitor arrays or -1"""
+        ids = self._competitors.ids
+        # the competitors are usually listed in the order of their ids
+        position = self._first + competitor - 1
+        if competitor <= self._count and ids[position] == competitor:
+            return position
+        for position in range(self._first, self._first + self._count):
+            if ids[position] == competitor:
+                return position
+        return -1
+
+    def competitor_odds(self, competitor: int) -> float:
+        """The odds of the competitor, 0.0 if the market has no such competitor"""
+        position = self._position(competitor)
+        return float(self._competitors.odds[position]) if position >= 0 else 0.0
+
+    def competitor_name(self, competitor: int) -> str:
+        """The name of the competitor, empty if the market has no such competitor"""
+        position = self._position(competitor)
+        return self._competitors.names[position] if position >= 0 else ""
+
+    @property
+    def home_team(self) -> str:
+        """Name of the home team"""
+        return self.competitor_name(competitor_id(BetTarget.HOME))
+
+    @property
+    def away_team(self) -> str:
+        """Name of the away team"""
+        return self.competitor_name(competitor_id(BetTarget.AWAY))
+
+    @property
+    def home_odds(self) -> float:
+        """Odds of a home win in hundredths"""
+        return self.competitor_odds(competitor_id(BetTarget.HOME))
+
+    @property
+    def away_odds(self) -> float:
+        """Odds of an away win in hundredths"""
+        return self.competitor_odds(competitor_id(BetTarget.AWAY))
+
+    @property
+    def draw_odds(self) -> float:
+        """Odds of a draw in hundredths"""
+        return self.competitor_odds(competitor_id(BetTarget.X))
+
+    def attach(self, client: 'VeikkausClient'):
+        """Set the client used for placing bets, e.g. after unpickling"""
+        self._client = client
 
     def place_bet(self, bet: BetDecision):
         """Given amount in cents, bet for target."""
+        if self._client is None:
+            raise ValueError("The game has no client, attach() one before betting")
         self._client.place_bet(self, bet)
 
+    def __getstate__(self):
+        """The client holds the session, it is not pickled with the game"""
+        return {slot: getattr(self, slot) for slot in self.__slots__ if slot != '_client'}
+
+    def __setstate__(self, state: Dict[str, Any]):
+        self._client = None
+        for slot, value in state.items():
+            setattr(self, slot, value)
+
     def __repr__(self):
         """Make nicer output"""
         close_str = self.close_time.strftime("%d.%m.%Y %H:%M")
         return f"{self.__class__.__name__:} type: 'EBET' listindex: {self.list_index} {close_str} {self.league}: {self.home_team:15} - {self.away_team:15} id: {self.row_id} event_id: {self.event_id} status: {self.status}, odds: ({self.home_odds:6} - {self.draw_odds:6} - {self.away_odds:6} min_stake: {self.min_stake})"  #pylint:disable=line-too-long
 
 
+def parse_ebet_draws(data: Iterable[Any],
+                     client: Optional['VeikkausClient'] = None,
+                     where: Optional[GameFilter] = None) -> List[Game]:
+    """Parse the EBET draws into a Game for each market, see VeikkausClient.parse_draws
+
+    Arguments:
+        data: the response of EndPoint.games_info_endpoint
+        client: (optional) the client used for placing bets on the games
+        where: (optional) parse only the markets matching the filter
+    """
+    games = []
+    competitors = Competitors()
+    rule_sets: Dict[tuple, RuleSet] = {}
+    for entry in data:
+        if where is not None and not where.accepts_draw(entry):
+            continue
+
+        # parsed with the first accepted market
+        draw: Optional[Draw] = None
+        for row in entry.get('rows', []):
+            if where is not None and not where.accepts_row(row):
+                continue
+
+            if draw is None:
+                draw = Draw(draw_id=entry.get('id'),
+                            list_index=entry.get('listIndex'),
+                            status=entry.get('status'),
+                            open_time=parse_date(entry.get('openTime', 0)),
+                            close_time=parse_date(entry.get('closeTime', 0)),
+                            draw_time=parse_date(entry.get('drawTime', 0)),
+                            results_available_time=parse_date(
+                                entry.get('resultsAvailableTime', 0)),
+                            rule_set=RuleSet.parse(entry.get('gameRuleSet', {}), rule_sets),
+                            primary_market=str(entry['rows'][0].get('id', "")))
+
+            first = len(competitors)
+            handicap = ""
+            for comp in row.get('competitors', []):
+                competitors.append(comp)
+                # the line of the market is given with the first competitor
+                handicap = handicap or comp.get('handicap', "")
+
+            game = Game(client, draw, competitors, first, len(competitors) - first)
+            game.handicap = handicap
+            game.market_id = row.get('id')
+            game.event_id = row.get('eventId')
+            game.excluded_events = tuple(str(event) for event in row.get('excludedEvents', ()))
+            game.status = row.get('status')
+            game.sport_id = row.get('sportId')
+            game.draw_type = EBETType.parse(row.get('type'))
+            games.append(game)
+
+    games = sorted(games, key=lambda game: game.draw.close_time)
+    return games
+
+
 class EventInfo:
     """A wrapper to keep information of the EBET draws"""
     league = ""
@@ -102,7 +367,7 @@ class Wager(NamedTuple):
     product: GameTypes
 
 
-class VeikkausClient:
+class VeikkausClient:  # pylint: disable=too-many-public-methods
     """The main client that holds on the API session"""
 
     API_HEADERS = {
@@ -111,7 +376,35 @@ class VeikkausClient:
         "X-ESA-API-Key": "ROBOT"
     }
 
-    def __init__(self, account="", password=""):
+    # shared by all clients, the builder only caches encoded list indices
+    payload_builder = EbetPayloadBuilder()
+
+    # records the requests and responses when set
+    recorder: Optional[ArchiveRecorder] = None
+
+    # the local account balance, set by AccountLedger(client)
+    ledger: Optional[AccountLedger] = None
+
+    # follows the placed wagers, set by TicketMonitor(client)
+    tickets: Optional[TicketMonitor] = None
+
+    # shares the public responses with the other processes when set
+    cache: Optional[SharedCache] = None
+
+    # limits the requests in flight and orders them by priority when set
+    gate: Optional[RequestGate] = None
+
+    # the connection pool of the session when shared with other clients
+    adapter: Optional[HTTPAdapter] = None
+
+    def __init__(self,  # pylint: disable=too-many-arguments
+                 account="",
+                 password="",
+                 *,
+                 recorder: Optional[ArchiveRecorder] = None,
+                 cache: Optional[SharedCache] = None,
+                 gate: Optional[RequestGate] = None,
+                 adapter: Optional[HTTPAdapter] = None):
         """
         Arguments:
             account (str):  Name of the account or empty if empty
@@ -119,7 +412,19 @@ class VeikkausClient:
                             environment variable.
             password (str): account password. If empty, loaded from
                             VEIKKAUS_PASSWORD environment variable
+            recorder:       (optional) write every request and response
+                            to a compressed archive
+            cache:          (optional) make the public GET requests once per
+                            freshness window for all the processes of the host
+            gate:           (optional) limit the requests in flight, sending
+                            the waiting requests in the order of their priority
+            adapter:        (optional) send the requests over this connection
+                            pool, e.g. shared by the clients of a ClientPool
         """
+        self.recorder = recorder
+        self.cache = cache
+        self.gate = gate
+        self.adapter = adapter
 
         acc_password = password
         if not acc_password:
@@ -137,62 +442,136 @@ class VeikkausClient:
 
     def _access_endpoint(self,
                          endpoint: EndPoint,
-                         payload: Dict[str, Any] = None,
-                         method="GET") -> Union[requests.Response, None]:
+                         payload: Union[Dict[str, Any], bytes] = None,
+                         method: Optional[str] = None) -> Union[requests.Response, None]:
         """
         A common wrapper for sending and logging API requests
 
+        The declared policy of the endpoint decides whether the response is
+        shared through the cache, how the request is retried and its place
+        in the queue of the gate.
+
         Arguments:
             endpoint: the url of the endpoint
-            payload: dictionary of the query parameters
-            method: GET or POST
+            payload: dictionary of the query parameters, or for POST requests
+                     an already serialized json body
+            method: (optional) GET or POST, by default the method of the endpoint
         """
         payload = {} if payload is None else payload
+        method = endpoint.method if method is None else method
 
         if not self.session:
             logger.warning("No active session for accessing '%s'.", endpoint.endpoint)
             return None
 
-        # log sending out a request
-        payload_text = f"\n{json.dumps(payload, indent=4)}" if payload else ""
-        logger.info("\033[93mSending\033[0m %s %s", method, endpoint.url)
-        logger.debug("payload is:\n%s", payload_text)
+        if self.cache is not None and method == "GET" and endpoint.cacheable:
+            return self.cache.response(
+                endpoint.url, endpoint.endpoint, payload,
+                lambda: self._send_request(endpoint, payload, method),
+                ttl=self.cache.ttl_of(endpoint.endpoint, endpoint.ttl))
+
+        return self._send_request(endpoint, payload, method)
+
+    def _send_request(self,
+                      endpoint: EndPoint,
+                      payload: Union[Dict[str, Any], bytes],
+                      method: str) -> Union[requests.Response, None]:
+        """Send and log a request, retrying as the endpoint declares, see _access_endpoint()
+
+        Each attempt goes through the gate separately, the backoff between
+        the attempts does not hold a place in the gate.
+        """
+        request_id = next_request_id()
+        log_info: Dict[str, Any] = {'request_id': request_id, 'method': method, 'url': endpoint.url}
+
+        # log sending out a request, the payload only when debugging
+        logger.info("Sending %s %s", method, endpoint.url,
+                    extra=dict(log_info, event='sending'))
+        if logger.isEnabledFor(logging.DEBUG):
+            payload_text = ""
+            if isinstance(payload, bytes):
+                payload_text = f"\n{payload.decode()}"
+            elif payload:
+                payload_text = f"\n{json.dumps(payload, indent=4)}"
+            logger.debug("payload is:\n%s", payload_text, extra=log_info)
 
         self.save_outgoing_request(endpoint, payload)
 
-        if method == "GET":
-            response = self.session.get(
-                endpoint.url, headers=self.API_HEADERS, params=payload)
-        elif method == "POST":
-            response = self.session.post(
-                endpoint.url, headers=self.API_HEADERS, json=payload)
-        else:
-            raise RuntimeError(f"Unsupported method {method}")
+        started = time.perf_counter()
+        retry = endpoint.retry
+        for attempt in range(retry.attempts):
+            if attempt:
+                time.sleep(retry.delay(attempt))
+                logger.warning("Retrying %s %s, attempt %s", method, endpoint.url,
+                               attempt + 1, extra=dict(log_info, event='retry'))
+            try:
+                response = self._send_admitted(endpoint, payload, method)
+            except requests.ConnectionError:
+                if attempt + 1 == retry.attempts:
+                    raise
+                continue
+            if response.status_code not in retry.statuses:
+                break
+        log_info['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 3)
+        log_info['status'] = response.status_code
 
         self.save_incoming_response(endpoint, response)
 
         if response.status_code != 200:
             # log out the error
-            logger.error("\033[91mRequest failed\033[0m %s, %s. URL: %s",
-                         response.status_code, response.reason, response.url)
+            logger.error("Request failed %s, %s. URL: %s",
+                         response.status_code, response.reason, response.url,
+                         extra=dict(log_info, event='request_failed'))
 
             # RED debug log entry
             if response.content:
-                logger.debug("\033[91mInvalid request:\033[0m\n%s", response.content)
+                logger.debug("Invalid request:\n%s", response.content,
+                             extra=dict(log_info, event='request_failed'))
             return None
 
         # green dedub log entry, the responses are quite large
-        logger.info("\033[92mResponse OK\033[0m from %s", endpoint.endpoint)
-        logger.debug("\033[92mReceived:\033[0m\n%s",
-                     json.dumps(response.json(), indent=4))
+        logger.info("Response OK from %s", endpoint.endpoint,
+                    extra=dict(log_info, event='response_ok'))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Received:\n%s", json.dumps(response.json(), indent=4),
+                         extra=dict(log_info, event='response_ok'))
 
         return response
 
-    def save_outgoing_request(self, endpoint: EndPoint, payload: Dict[Any, Any]):
+    def _send_admitted(self,
+                       endpoint: EndPoint,
+                       payload: Union[Dict[str, Any], bytes],
+                       method: str) -> requests.Response:
+        """Send a single attempt once the gate admits it"""
+        if self.gate is None:
+            return self._send_once(endpoint, payload, method)
+        with self.gate.admit(endpoint.priority):
+            return self._send_once(endpoint, payload, method)
+
+    def _send_once(self,
+                   endpoint: EndPoint,
+                   payload: Union[Dict[str, Any], bytes],
+                   method: str) -> requests.Response:
+        """Send the request on the session"""
+        if method == "GET":
+            return self.session.get(endpoint.url, headers=self.API_HEADERS, params=payload)
+        if method == "POST" and isinstance(payload, bytes):
+            return self.session.post(endpoint.url, headers=self.API_HEADERS, data=payload)
+        if method == "POST":
+            return self.session.post(endpoint.url, headers=self.API_HEADERS, json=payload)
+        raise RuntimeError(f"Unsupported method {method}")
+
+    def save_outgoing_request(self, endpoint: EndPoint,
+                              payload: Union[Dict[Any, Any], bytes]):
         """For testing, add and interface for saving the outgoing messages."""
 
     def save_incoming_response(self, endpoint: EndPoint, response: requests.Response):
-        """For testing, add and interface for saving the incoming responses."""
+        """For testing, add and interface for saving the incoming responses.
+
+        By default, the response is passed on to the recorder, if one is set.
+        """
+        if self.recorder is not None:
+            self.recorder.record(endpoint, response)
 
     def login(self, account: str, password: str):
         """
@@ -203,9 +582,12 @@ class VeikkausClient:
         """
         login_payload = {"type": "STANDARD_LOGIN", "login": account, "password": password}
         logger.info("Trying to log in...")
-        logger.info("\033[93mSending\033[0m %s %s", "GET",
-                    EndPoint.login_endpoint().endpoint)
+        logger.info("Sending %s %s", "POST", EndPoint.login_endpoint().endpoint,
+                    extra={'event': 'sending'})
         session = requests.Session()
+        if self.adapter is not None:
+            session.mount("https://", self.adapter)
+            session.mount("http://", self.adapter)
         response = session.post(
             EndPoint.login_endpoint(),
             data=json.dumps(login_payload),
@@ -215,7 +597,7 @@ class VeikkausClient:
             logger.error("Cannot login")
             return None
 
-        logger.info("\033[92mResponse OK\033[0m Succesfully logged in!")
+        logger.info("Response OK Succesfully logged in!", extra={'event': 'response_ok'})
         return session
 
     def get_balance(self, balance="usableBalance"):
@@ -233,6 +615,8 @@ class VeikkausClient:
             return 0
 
         cash = response.json().get('balances', {}).get('CASH', {})
+        if self.ledger is not None:
+            self.ledger.synced(cash.get('usableBalance', 0))
         logger.info("Account has balance: total: %s €, frozen: %s €, usable: %s €",
                     cash.get('balance', 0) / 100,
                     cash.get('frozenBalance', 0) / 100,
@@ -241,6 +625,10 @@ class VeikkausClient:
         # return the requested balance
         return cash.get(balance, 0) / 100
 
+    def keep_alive(self) -> bool:
+        """Send a light request to keep the session and its connection open"""
+        return self._access_endpoint(EndPoint.account_info_endpoint(), method="GET") is not None
+
     def get_betting_history(self, maximum_results=50, sort_by='TXDATE') -> List[Wager]:
         """Return the betting history
 
@@ -255,37 +643,55 @@ class VeikkausClient:
         assert 0 <= maximum_results <= 50, "Queried result count should be between 0 and 50."
 
         payload = {'size': maximum_results, 'sort-by': sort_by}
-        response = self._access_endpoint(
-            EndPoint.account_betting_history(), method="GET", payload=payload)
+        endpoint = EndPoint.account_betting_history()
+        response = self._access_endpoint(endpoint, method="GET", payload=payload)
 
         if response is None:
             return []
 
-        return parse_response(response.json(), ResponseType.TRANSACTION_LIST)
+        wagers = endpoint.parse(response.json())
+        if self.ledger is not None:
+            self.ledger.record_transactions(wagers)
+        return wagers
 
-    def get_bet_event_information(self, event: Wager):
+    def get_bet_event_information(self, event: Union[Wager, str]) -> Dict[str, Any]:
         """Return the more thorough information
         for the bet with the argument id. Wager can
         be obtained from the results of get_betting_history()
 
         Arguments:
             event: the wager, one of the results of from the results of
-                        get_betting_history()
+                        get_betting_history(), or its external id
         """
+        external_id = event if isinstance(event, str) else event.external_id
         response = self._access_endpoint(
-            EndPoint.wager_information(event.external_id), method="GET")
+            EndPoint.wager_information(external_id), method="GET")
 
         if response is None:
-            return []
+            return {}
 
-        return []
+        return response.json()
+
+    def upcoming_events(self, game_type: GameTypes,
+                        taxonomy: Optional[Taxonomy] = None,
+                        where: Optional[GameFilter] = None) -> List[Any]:
+        """Get upcoming games
 
-    def upcoming_events(self, game_type: GameTypes) -> List[Game]:
-        """Get upcoming games"""
+        Arguments:
+            game_type: which games to query
+            taxonomy: (optional) a crawled sports taxonomy,
+                      used to fill the league of each game
+            where: (optional) return only the EBET markets matching the filter,
+                   the other markets are skipped before they are parsed
+
+        Returns:
+            a Game for each EBET market, or a PoolDraw for each
+            SPORT (Vakio) and MULTISCORE (Moniveto) draw
+        """
 
         payload = {'game-names': game_type.value}
         response = self._access_endpoint(
-            EndPoint.games_info_endpoint(), payload=payload, method="GET")
+            EndPoint.games_info_endpoint(game_type), payload=payload, method="GET")
 
         if not response:
             return []
@@ -293,13 +699,21 @@ class VeikkausClient:
         data = response.json()
 
         if game_type == GameTypes.EBET:
-            return self.parse_draws(data)
+            games = self.parse_draws(data, where)
+            if taxonomy is not None:
+                taxonomy.enrich(games)
+            return games
+
+        if game_type in (GameTypes.SPORT, GameTypes.MULTISCORE):
+            return parse_pool_draws(data, game_type)
 
         logger.warning("Not yet implemented game type: %s", game_type.value)
         return []
 
-    def parse_draws(self, data: Dict):
+    def parse_draws(self, data: Dict, where: Optional[GameFilter] = None):
         """
+        Parse the markets of the draws, only those matching 'where' when given
+
         API response:
 
             "draws": [
@@ -374,34 +788,7 @@ class VeikkausClient:
 
         """
 
-        games = []
-        for entry in data:
-
-            game = Game(self)
-            game.row_id = entry.get('id')
-            game.list_index = entry.get('listIndex')
-            game.status = entry.get('status')
-            game.close_time = datetime.fromtimestamp(entry.get('closeTime', 0) / 1000)
-            game.min_stake = entry.get('gameRuleSet', {}).get('minStake', 0)
-            for row in entry.get('rows', []):
-
-                game.event_id = row.get('eventId')
-                game.status = row.get('status')
-                game.sport_id = row.get('sportId')
-                game.draw_type = EBETType.parse(row.get('type'))
-                for comp in row.get('competitors', []):
-                    if comp.get('id') == "1":
-                        game.home_team = comp.get('name')
-                        game.home_odds = float(comp.get('odds').get('odds'))
-                    if comp.get('id') == "2":
-                        game.away_team = comp.get('name')
-                        game.away_odds = float(comp.get('odds').get('odds'))
-                    if comp.get('id') == "3":
-                        game.draw_odds = float(comp.get('odds').get('odds'))
-                games.append(game)
-
-        games = sorted(games, key=lambda game: game.close_time)
-        return games
+        return parse_ebet_draws(data, self, where)
 
     def sport_types(self) -> List[Dict[str, str]]:
         """query available sport type ids:
@@ -651,6 +1038,20 @@ class VeikkausClient:
 
         return event
 
+    def closed_games(self, day: date) -> List[MarketResult]:
+        """The results of the EBET markets that were closed on the day
+
+        Arguments:
+            day: the day of the results
+        """
+        endpoint = EndPoint.closed_games_by_day(day)
+        response = self._access_endpoint(endpoint, method="GET")
+
+        if not response:
+            return []
+
+        return endpoint.parse(response.json())
+
     def place_bet(self, game: Game, bet: BetDecision, test=True) -> bool:
         """Place a bet, bet amount in cents
 
@@ -661,17 +1062,73 @@ class VeikkausClient:
                     which does not actually place the bet, just checks
                     that it could have been placed
         """
+        return self.place_bets([game], [bet], test=test)
+
+    def place_bets(self, games: List[Game], bets: List[BetDecision], test=True) -> bool:
+        """Place several bets with a single wager, bet amounts in cents
+
+        Only the first market of each draw can be bet, see Game.primary,
+        a ValueError is raised for the other markets.
+
+        Arguments:
+            games: the draws to place the bets for
+            bets: what to bet for each of the games
+            test: (optional) whether to use the API test endpoint
+        """
+        if self.tickets is not None and not test:
+            self.tickets.observe(games)
+        return self.send_wager(self.payload_builder.build_bets(games, bets), test=test)
+
+    def send_wager(self, wager: PreparedWager, test=True) -> bool:
+        """Send a wager prepared with EbetPayloadBuilder
+
+        A real wager is sent once, not retried: a wager that timed out may
+        still have been placed, check the betting history before sending
+        it again. Sending it again reuses its 'requestId'.
+
+        Arguments:
+            wager: the serialized wager
+            test: (optional) whether to use the API test endpoint
+        """
         endpoint = EndPoint.place_wager_endpoint()
         if test:
             endpoint = EndPoint.place_wager_test_endpoint()
 
-        payload = self.ebet_payload([game], [bet])
+        response = self._access_endpoint(endpoint, payload=wager.body, method="POST")
+        if self.ledger is not None and not test:
+            self.ledger.record_wager(wager.price, bool(response))
+
+        if not response:
+            return False
+
+        if self.tickets is not None and not test:
+            self.tickets.placed(wager.request_id, wager.price, response.json())
+        return True
 
-        response = self._access_endpoint(endpoint, payload=payload, method="POST")
+    def place_system_bet(self, draw: PoolDraw, system: SystemBet, stake: int,
+                         test=True) -> bool:
+        """Place a Vakio or Moniveto system bet
+
+        Arguments:
+            draw: the pool game draw to bet on
+            system: the picked outcomes for each match of the draw
+            stake: the stake of each row in cents
+            test: (optional) whether to use the API test endpoint
+        """
+        endpoint = EndPoint.place_wager_endpoint()
+        if test:
+            endpoint = EndPoint.place_wager_test_endpoint()
+
+        response = self._access_endpoint(
+            endpoint, payload=pool_payload(draw, system, stake), method="POST")
+        if self.ledger is not None and not test:
+            self.ledger.record_wager(system.price(stake), bool(response))
 
         if not response:
             return False
 
+        if self.tickets is not None and not test:
+            self.tickets.placed("", system.price(stake), response.json())
         return True
 
     @staticmethod
@@ -720,15 +1177,7 @@ class VeikkausClient:
             ]
         """
         assert len(games) == len(bets), "Number of games has to match number of bets"
-
-        def selected_play(target: BetTarget):
-            if target == BetTarget.HOME:
-                return 1
-            if target == BetTarget.X:
-                return 3
-            if target == BetTarget.AWAY:
-                return 2
-            raise TypeError(f"invalid bet target {target.value}")
+        check_primary(games)
 
         # calculate the total price by summing all bets together
         total_price = sum(map(lambda bet: bet.amount, bets))
@@ -743,11 +1192,11 @@ class VeikkausClient:
         for game, bet in zip(games, bets):
             data = {
                 "betType": "normal",
-                "stake": total_price,
+                "stake": bet.amount,
                 "selections": [
                     {
                         "listIndex": game.list_index,
-                        "competitors": [selected_play(bet.target)],
+                        "competitors": [competitor_id(bet.target)],
                         "stake": bet.amount
                     }
                 ]